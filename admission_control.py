@@ -0,0 +1,263 @@
+"""
+Control de admisión delante del agente
+Token bucket por usuario/sesión y por dependencia, colas de espera acotadas con plazo y contadores para ver dónde está el cuello de botella
+"""
+
+import contextlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+# Mensajes por segundo sostenidos y ráfaga por usuario/sesión. 0 (por defecto) desactiva el límite:
+# chat() lanza AdmissionRejected al excederlo, así que solo debe fijarse donde el llamador lo maneja
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "0"))
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "5"))
+# Buckets de usuario que se recuerdan (LRU); uno olvidado vuelve con la ráfaga completa
+ADMISSION_MAX_USERS = int(os.getenv("ADMISSION_MAX_USERS", "10000"))
+
+RECHAZO_TASA, RECHAZO_COLA, RECHAZO_ESPERA = "tasa", "cola_llena", "espera"
+
+
+class AdmissionRejected(Exception):
+    """La petición no entra: límite de tasa, cola llena o plazo de espera vencido"""
+
+    def __init__(self, recurso: str, motivo: str, reintento_en: float):
+        super().__init__(f"{recurso} saturado ({motivo}); reintenta en {reintento_en:.0f}s")
+        self.recurso = recurso
+        self.motivo = motivo
+        self.reintento_en = reintento_en
+
+# ============================================================================
+# 1. LIMITADORES
+# ============================================================================
+
+
+class TokenBucket:
+    """`tasa` fichas por segundo hasta `rafaga`; tomar() no bloquea"""
+
+    def __init__(self, tasa: float, rafaga: float):
+        self.tasa = tasa
+        self.rafaga = max(1.0, rafaga)
+        self._fichas = self.rafaga
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self, n: float = 1.0) -> float:
+        """0 si había fichas (y las consume); si no, segundos hasta que las haya"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._fichas = min(self.rafaga, self._fichas + (ahora - self._t) * self.tasa)
+            self._t = ahora
+            if self._fichas >= n:
+                self._fichas -= n
+                return 0.0
+            return (n - self._fichas) / self.tasa
+
+
+@dataclass(frozen=True)
+class ConfigRecurso:
+    concurrencia: int
+    cola: int
+    espera: float          # segundos máximos en la cola
+    tasa: float = 0.0      # llamadas por segundo a la dependencia (0 = sin límite)
+    rafaga: float = 1.0
+
+
+def config_recurso(nombre: str, concurrencia: int, cola: int, espera: float, tasa: float = 0.0) -> ConfigRecurso:
+    """Valores por defecto sobreescribibles con ADMISSION_<NOMBRE>_{CONCURRENCY,QUEUE,WAIT,RATE,BURST}"""
+    prefijo = f"ADMISSION_{nombre.upper()}_"
+    tasa = float(os.getenv(prefijo + "RATE", str(tasa)))
+    return ConfigRecurso(
+        concurrencia=int(os.getenv(prefijo + "CONCURRENCY", str(concurrencia))),
+        cola=int(os.getenv(prefijo + "QUEUE", str(cola))),
+        espera=float(os.getenv(prefijo + "WAIT", str(espera))),
+        tasa=tasa,
+        rafaga=float(os.getenv(prefijo + "BURST", str(max(1.0, tasa)))),
+    )
+
+
+# llm: el agente ReAct (DeepSeek, varias llamadas por mensaje); rag: embedding + Weaviate + DeepSeek
+# de consulta_bancaria_rag; myrlux: HTTP a MyrluxBack en fallos de caché
+RECURSOS = {
+    "llm": config_recurso("llm", concurrencia=8, cola=16, espera=5.0),
+    "rag": config_recurso("rag", concurrencia=16, cola=32, espera=10.0),
+    "myrlux": config_recurso("myrlux", concurrencia=16, cola=64, espera=5.0, tasa=50.0),
+}
+
+
+class Compuerta:
+    """Concurrencia acotada con cola FIFO acotada y plazo de espera.
+
+    Cuando la cola está llena se rechaza al instante (load shedding) en vez de
+    acumular esperas que igual vencerían; el que espera más de `espera`
+    segundos sale con AdmissionRejected. El reintento sugerido se estima con
+    la duración media de las llamadas admitidas.
+    """
+
+    def __init__(self, nombre: str, config: ConfigRecurso):
+        self.nombre = nombre
+        self.config = config
+        self.bucket = TokenBucket(config.tasa, config.rafaga) if config.tasa > 0 else None
+        self._cond = threading.Condition()
+        self.en_curso = 0
+        self.en_cola = 0
+        self.max_en_cola = 0
+        self.admitidas = 0
+        self.rechazadas = {RECHAZO_TASA: 0, RECHAZO_COLA: 0, RECHAZO_ESPERA: 0}
+        self.espera_total = 0.0
+        self._duracion_media = 1.0
+
+    def _reintento(self) -> float:
+        return self._duracion_media * (self.en_cola + 1) / max(1, self.config.concurrencia)
+
+    def _rechazar(self, motivo: str, reintento: float):
+        self.rechazadas[motivo] += 1
+        raise AdmissionRejected(self.nombre, motivo, reintento)
+
+    @contextlib.contextmanager
+    def ocupar(self, espera: Optional[float] = None) -> Iterator[None]:
+        """Un cupo durante el bloque; espera=0 no hace cola (para el event loop)"""
+        self._entrar(self.config.espera if espera is None else espera)
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            self._salir(time.monotonic() - inicio)
+
+    def _entrar(self, espera: float):
+        with self._cond:
+            if self.bucket is not None:
+                faltan = self.bucket.tomar()
+                if faltan:
+                    self._rechazar(RECHAZO_TASA, faltan)
+            # Sin adelantarse a los que ya esperan
+            if self.en_curso < self.config.concurrencia and not self.en_cola:
+                self.en_curso += 1
+                self.admitidas += 1
+                return
+            if espera <= 0 or self.en_cola >= self.config.cola:
+                self._rechazar(RECHAZO_COLA, self._reintento())
+            self.en_cola += 1
+            self.max_en_cola = max(self.max_en_cola, self.en_cola)
+            inicio = time.monotonic()
+            limite = inicio + espera
+            try:
+                while self.en_curso >= self.config.concurrencia:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._rechazar(RECHAZO_ESPERA, self._reintento())
+                    self._cond.wait(restante)
+            finally:
+                self.en_cola -= 1
+                self.espera_total += time.monotonic() - inicio
+            self.en_curso += 1
+            self.admitidas += 1
+
+    def _salir(self, duracion: float):
+        with self._cond:
+            self.en_curso -= 1
+            self._duracion_media = 0.9 * self._duracion_media + 0.1 * duracion
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "en_curso": self.en_curso, "en_cola": self.en_cola, "max_en_cola": self.max_en_cola,
+                "concurrencia": self.config.concurrencia, "cola": self.config.cola,
+                "admitidas": self.admitidas, **{f"rechazadas_{m}": n for m, n in self.rechazadas.items()},
+                "espera_media": self.espera_total / self.admitidas if self.admitidas else 0.0,
+            }
+
+# ============================================================================
+# 2. CONTROLADOR
+# ============================================================================
+
+
+class AdmissionController:
+    """Límites por usuario/sesión y una compuerta por dependencia.
+
+    admitir_usuario() se llama al recibir un mensaje; recurso() envuelve cada
+    llamada a una dependencia cara. Con activo=False (ADMISSION_CONTROL=false)
+    todo pasa sin límites ni contadores.
+    """
+
+    def __init__(self, recursos: Optional[Dict[str, ConfigRecurso]] = None, tasa_usuario: float = ADMISSION_USER_RATE,
+                 rafaga_usuario: float = ADMISSION_USER_BURST, max_usuarios: int = ADMISSION_MAX_USERS,
+                 activo: bool = ADMISSION_CONTROL):
+        self.activo = activo
+        self.compuertas = {nombre: Compuerta(nombre, config) for nombre, config in (recursos or RECURSOS).items()}
+        self.tasa_usuario = tasa_usuario
+        self.rafaga_usuario = rafaga_usuario
+        self.max_usuarios = max_usuarios
+        self._usuarios: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.usuarios_admitidos = 0
+        self.usuarios_rechazados = 0
+
+    def admitir_usuario(self, clave: str):
+        """AdmissionRejected si el usuario/sesión superó su tasa de mensajes"""
+        if not self.activo or self.tasa_usuario <= 0:
+            return
+        with self._lock:
+            bucket = self._usuarios.pop(clave, None) or TokenBucket(self.tasa_usuario, self.rafaga_usuario)
+            self._usuarios[clave] = bucket
+            while len(self._usuarios) > self.max_usuarios:
+                self._usuarios.popitem(last=False)
+        faltan = bucket.tomar()
+        with self._lock:
+            if faltan:
+                self.usuarios_rechazados += 1
+            else:
+                self.usuarios_admitidos += 1
+        if faltan:
+            raise AdmissionRejected("usuario", RECHAZO_TASA, faltan)
+
+    def recurso(self, nombre: str, espera: Optional[float] = None):
+        """Context manager que ocupa un cupo de la dependencia (o nada si no está limitada)"""
+        compuerta = self.compuertas.get(nombre)
+        if not self.activo or compuerta is None:
+            return contextlib.nullcontext()
+        return compuerta.ocupar(espera)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            usuarios = {"activos": len(self._usuarios), "admitidos": self.usuarios_admitidos,
+                        "rechazados": self.usuarios_rechazados}
+        return {"usuarios": usuarios, **{nombre: c.stats() for nombre, c in self.compuertas.items()}}
+
+    def exportar_prometheus(self, prefijo: str = "banking_agent") -> str:
+        """Profundidad de cola, cupos ocupados, admitidas y rechazadas por recurso y motivo"""
+        stats = {nombre: c.stats() for nombre, c in self.compuertas.items()}
+        lineas = []
+        for metrica, tipo, campo, ayuda in (
+            ("admission_queue_depth", "gauge", "en_cola", "Peticiones esperando cupo"),
+            ("admission_in_flight", "gauge", "en_curso", "Cupos ocupados"),
+            ("admission_admitted_total", "counter", "admitidas", "Llamadas admitidas"),
+        ):
+            lineas += [f"# HELP {prefijo}_{metrica} {ayuda}", f"# TYPE {prefijo}_{metrica} {tipo}"]
+            lineas += [f'{prefijo}_{metrica}{{recurso="{nombre}"}} {s[campo]}' for nombre, s in stats.items()]
+        lineas += [f"# HELP {prefijo}_admission_rejected_total Peticiones rechazadas o degradadas",
+                   f"# TYPE {prefijo}_admission_rejected_total counter"]
+        for nombre, s in stats.items():
+            lineas += [f'{prefijo}_admission_rejected_total{{recurso="{nombre}",motivo="{motivo}"}} '
+                       f'{s[f"rechazadas_{motivo}"]}' for motivo in (RECHAZO_TASA, RECHAZO_COLA, RECHAZO_ESPERA)]
+        lineas.append(f'{prefijo}_admission_rejected_total{{recurso="usuario",motivo="{RECHAZO_TASA}"}} '
+                      f'{self.usuarios_rechazados}')
+        return "\n".join(lineas) + "\n"
+
+
+_controlador: Optional[AdmissionController] = None
+_controlador_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Controlador compartido del proceso (todas las sesiones compiten por los mismos cupos)"""
+    global _controlador
+    with _controlador_lock:
+        if _controlador is None:
+            _controlador = AdmissionController()
+        return _controlador
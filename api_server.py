@@ -0,0 +1,378 @@
+"""
+API HTTP asíncrona del agente bancario
+Expone chat (JSON y SSE) y las herramientas individuales con memoria por sesión y límite de concurrencia
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+
+from admission_control import AdmissionRejected, get_admission_controller
+from conversation_store import get_conversation_store
+from health_monitor import get_health_monitor
+from intelligent_agent import BankingIntelligentAgent, get_shared_tools
+from shared_resources import get_shared_rag_system
+from telemetry import en_contexto, get_telemetry
+
+logger = logging.getLogger(__name__)
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+# Turnos de chat en curso a la vez (cada uno ocupa un hilo del pool mientras espera al LLM)
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "32"))
+# Espera máxima por un lugar antes de responder 503
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "10"))
+API_MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000"))
+API_SESSION_TTL = float(os.getenv("API_SESSION_TTL", "1800"))
+# Firma de los session_id emitidos; el mismo valor en todos los workers para reanudar entre ellos
+# (sin definirla, cada proceso usa una aleatoria y las sesiones no sobreviven a un reinicio)
+API_SESSION_SECRET = os.getenv("API_SESSION_SECRET", "")
+
+# ============================================================================
+# 1. SESIONES
+# ============================================================================
+
+
+class SesionInvalida(Exception):
+    """session_id que este servidor no emitió (o firmado con otro secreto)"""
+
+
+class SessionStore:
+    """session_id -> agente propio (memoria e historial) sobre los recursos compartidos.
+
+    LRU acotada por número de sesiones y por inactividad. Cada sesión tiene un
+    asyncio.Lock: sus turnos se procesan en orden aunque lleguen a la vez.
+    Con CONVERSATION_STORE, una sesión que salió de la LRU (o que empezó en
+    otro worker) se reanuda del disco al volver a pedirla. Los session_id
+    llevan una firma HMAC: un cliente solo puede reanudar los que recibió,
+    no elegir uno ajeno.
+    """
+
+    def __init__(self, fabrica: Callable[[str], BankingIntelligentAgent], executor: ThreadPoolExecutor,
+                 max_sesiones: int = API_MAX_SESSIONS, ttl: float = API_SESSION_TTL,
+                 secreto: str = API_SESSION_SECRET):
+        self.fabrica = fabrica
+        self.executor = executor
+        self.max_sesiones = max_sesiones
+        self.ttl = ttl
+        self._secreto = (secreto or secrets.token_hex(32)).encode()
+        self._sesiones: "OrderedDict[str, Tuple[BankingIntelligentAgent, asyncio.Lock, float]]" = OrderedDict()
+        self._construyendo: Dict[str, "asyncio.Future[BankingIntelligentAgent]"] = {}
+
+    def _firma(self, base: str) -> str:
+        return hmac.new(self._secreto, base.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def nuevo_id(self) -> str:
+        base = uuid.uuid4().hex
+        return f"{base}.{self._firma(base)}"
+
+    def valido(self, session_id: str) -> bool:
+        base, _, firma = session_id.rpartition(".")
+        return bool(base) and hmac.compare_digest(firma, self._firma(base))
+
+    def _expirar(self, ahora: float):
+        while self._sesiones:
+            session_id, (_, _, ultimo) = next(iter(self._sesiones.items()))
+            if ahora - ultimo < self.ttl and len(self._sesiones) <= self.max_sesiones:
+                break
+            del self._sesiones[session_id]
+
+    async def obtener(self, session_id: Optional[str]) -> Tuple[str, BankingIntelligentAgent, asyncio.Lock]:
+        """Sesión existente o una nueva (si session_id es None o ya expiró); SesionInvalida si no es nuestro"""
+        if session_id is None:
+            session_id = self.nuevo_id()
+        elif not self.valido(session_id):
+            raise SesionInvalida(session_id)
+        entrada = self._sesiones.pop(session_id, None)
+        if entrada is None:
+            # Construir el agente carga la memoria de SQLite: fuera del event loop, una vez por sesión
+            pendiente = self._construyendo.get(session_id)
+            if pendiente is None:
+                pendiente = asyncio.get_running_loop().run_in_executor(
+                    self.executor, en_contexto(lambda: self.fabrica(session_id)))
+                self._construyendo[session_id] = pendiente
+                pendiente.add_done_callback(lambda _: self._construyendo.pop(session_id, None))
+            agente = await asyncio.shield(pendiente)
+            # Otra petición de la misma sesión pudo registrarla mientras tanto
+            entrada = self._sesiones.pop(session_id, None) or (agente, asyncio.Lock(), 0.0)
+        agente, lock, _ = entrada
+        ahora = time.monotonic()
+        self._sesiones[session_id] = (agente, lock, ahora)
+        self._expirar(ahora)
+        return session_id, agente, lock
+
+    def cerrar(self, session_id: str) -> bool:
+        return self._sesiones.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sesiones)
+
+# ============================================================================
+# 2. MODELOS
+# ============================================================================
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(..., min_length=1, max_length=4000)
+    session_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    session_id: str
+    response: str
+    latencia: float
+
+
+class ToolRequest(BaseModel):
+    input: str = Field(..., max_length=4000)
+
+
+class ToolResponse(BaseModel):
+    tool: str
+    response: str
+    latencia: float
+
+# ============================================================================
+# 3. APLICACIÓN
+# ============================================================================
+
+
+def _evento(tipo: str, datos: Dict[str, Any]) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+async def _iterar_en_hilo(fragmentos: Callable[[], Iterator[str]],
+                          executor: ThreadPoolExecutor) -> AsyncIterator[str]:
+    """Consume un generador síncrono en un solo hilo del pool y entrega sus elementos al event loop.
+
+    Todo el generador corre en el mismo hilo (y contexto): la traza de
+    telemetría que abre chat_stream se cierra en el contexto donde se abrió.
+    """
+    loop = asyncio.get_running_loop()
+    cola: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+
+    def producir():
+        try:
+            for fragmento in fragmentos():
+                loop.call_soon_threadsafe(cola.put_nowait, ("dato", fragmento))
+        except Exception as e:
+            loop.call_soon_threadsafe(cola.put_nowait, ("error", e))
+        finally:
+            loop.call_soon_threadsafe(cola.put_nowait, ("fin", None))
+
+    loop.run_in_executor(executor, en_contexto(producir))
+    while True:
+        tipo, valor = await cola.get()
+        if tipo == "fin":
+            return
+        if tipo == "error":
+            raise valor
+        yield valor
+
+
+def _async_nativo(tool) -> bool:
+    """La herramienta implementa su propio _arun (no el de LangChain, que delega en un hilo)"""
+    from langchain_core.tools import Tool
+
+    if isinstance(tool, Tool):
+        return tool.coroutine is not None
+    return "_arun" in type(tool).__dict__
+
+
+def create_app(rag_factory: Optional[Callable[[], Any]] = None,
+               max_concurrencia: int = API_MAX_CONCURRENCY,
+               espera_maxima: float = API_QUEUE_TIMEOUT) -> FastAPI:
+    """Aplicación FastAPI; rag_factory permite servir sobre otro sistema RAG (p. ej. en benchmarks)"""
+    rag_system = get_shared_rag_system(rag_factory)
+    tools = get_shared_tools(rag_system)
+    conversaciones = get_conversation_store()
+    # Pool propio: el agente y las herramientas síncronas bloquean mientras esperan E/S
+    executor = ThreadPoolExecutor(max_workers=max_concurrencia, thread_name_prefix="api-chat")
+    sesiones = SessionStore(lambda session_id: BankingIntelligentAgent(
+        rag_system, tools=tools, session_id=session_id, conversaciones=conversaciones), executor)
+    cupos = asyncio.Semaphore(max_concurrencia)
+    contadores = {"en_curso": 0, "rechazadas": 0}
+    telemetria = get_telemetry()
+    admision = get_admission_controller()
+    # Solo con RAG_MICRO_BATCH=true
+    batch_stats = getattr(rag_system, "batch_stats", None)
+    app = FastAPI(title="Asistente Bancario Inteligente", version="1.0")
+
+    def _rechazo(e: AdmissionRejected) -> HTTPException:
+        return HTTPException(status_code=429, detail=str(e),
+                             headers={"Retry-After": str(max(1, round(e.reintento_en)))})
+
+    async def _ocupar_cupo():
+        try:
+            await asyncio.wait_for(cupos.acquire(), timeout=espera_maxima)
+        except asyncio.TimeoutError:
+            contadores["rechazadas"] += 1
+            raise HTTPException(status_code=503, detail="Servidor saturado, intenta de nuevo",
+                                headers={"Retry-After": "1"})
+        contadores["en_curso"] += 1
+
+    def _liberar_cupo():
+        contadores["en_curso"] -= 1
+        cupos.release()
+
+    async def _sesion(session_id: Optional[str]) -> Tuple[str, BankingIntelligentAgent, asyncio.Lock]:
+        try:
+            return await sesiones.obtener(session_id)
+        except SesionInvalida:
+            raise HTTPException(status_code=403, detail="session_id inválido")
+
+    @app.on_event("shutdown")
+    def _cerrar_pool():
+        executor.shutdown(wait=False)
+
+    @app.post("/chat", response_model=ChatResponse)
+    async def chat(peticion: ChatRequest):
+        session_id, agente, lock = await _sesion(peticion.session_id)
+        # Primero el turno de la sesión y luego el cupo: una ráfaga de una sola sesión espera en su
+        # lock sin ocupar cupos que otras sesiones podrían usar
+        async with lock:
+            await _ocupar_cupo()
+            try:
+                inicio = time.perf_counter()
+                respuesta = await asyncio.get_running_loop().run_in_executor(
+                    executor, en_contexto(lambda: agente.chat(peticion.message))
+                )
+                return ChatResponse(session_id=session_id, response=respuesta,
+                                    latencia=time.perf_counter() - inicio)
+            except AdmissionRejected as e:
+                raise _rechazo(e)
+            finally:
+                _liberar_cupo()
+
+    @app.post("/chat/stream")
+    async def chat_stream(peticion: ChatRequest):
+        """Server-sent events: un evento `token` por fragmento y `done` al final"""
+        session_id, agente, lock = await _sesion(peticion.session_id)
+        try:
+            # Solo decide la admisión; la respuesta se genera al iterar
+            flujo = agente.chat_stream(peticion.message)
+        except AdmissionRejected as e:
+            raise _rechazo(e)
+        # Lock de la sesión antes que el cupo (como en /chat); ambos se sueltan al terminar la respuesta
+        await lock.acquire()
+        try:
+            await _ocupar_cupo()
+        except BaseException:
+            # 503 o cliente desconectado mientras esperaba: el lock no debe quedar tomado
+            lock.release()
+            raise
+
+        liberados = False
+
+        def _liberar():
+            nonlocal liberados
+            if not liberados:
+                liberados = True
+                _liberar_cupo()
+                lock.release()
+
+        async def eventos() -> AsyncIterator[str]:
+            # El finally corre al terminar y también cuando el servidor cierra el generador porque el
+            # cliente se desconectó; la tarea de fondo no se ejecuta en ese caso en todas las versiones
+            try:
+                inicio = time.perf_counter()
+                yield _evento("session", {"session_id": session_id})
+                try:
+                    async for fragmento in _iterar_en_hilo(lambda: flujo, executor):
+                        yield _evento("token", {"text": fragmento})
+                except Exception as e:
+                    yield _evento("error", {"detail": str(e)})
+                yield _evento("done", {"latencia": time.perf_counter() - inicio})
+            finally:
+                _liberar()
+
+        # La tarea de fondo solo cubre un generador que no llegó a arrancar; _liberar es idempotente
+        return StreamingResponse(eventos(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                                 background=BackgroundTask(_liberar))
+
+    @app.delete("/sessions/{session_id}")
+    async def cerrar_sesion(session_id: str):
+        if not sesiones.valido(session_id):
+            raise HTTPException(status_code=403, detail="session_id inválido")
+        en_disco = conversaciones.borrar(session_id) if conversaciones is not None else False
+        if not sesiones.cerrar(session_id) and not en_disco:
+            raise HTTPException(status_code=404, detail="Sesión no encontrada")
+        return {"session_id": session_id, "cerrada": True}
+
+    @app.get("/tools")
+    async def listar_herramientas():
+        # Solo nombres: no construye herramientas que nadie ha usado
+        return {"tools": list(tools)}
+
+    @app.post("/tools/{nombre}", response_model=ToolResponse)
+    async def ejecutar_herramienta(nombre: str, peticion: ToolRequest):
+        if nombre not in tools:
+            raise HTTPException(status_code=404, detail=f"Herramienta '{nombre}' no existe")
+        tool = tools[nombre]
+        await _ocupar_cupo()
+        try:
+            inicio = time.perf_counter()
+            if _async_nativo(tool):
+                # MyrluxBack con httpx async: no ocupa hilo
+                respuesta = await tool._arun(peticion.input)
+            else:
+                # El _arun por defecto de LangChain usaría el executor por defecto del loop, no este pool
+                respuesta = await asyncio.get_running_loop().run_in_executor(
+                    executor, en_contexto(lambda: tool._run(peticion.input)))
+            return ToolResponse(tool=nombre, response=str(respuesta), latencia=time.perf_counter() - inicio)
+        finally:
+            _liberar_cupo()
+
+    @app.get("/health")
+    async def salud():
+        estados = get_health_monitor().snapshot()
+        return {
+            "status": "ok",
+            "sesiones": len(sesiones),
+            "conversaciones": conversaciones.stats() if conversaciones is not None else {},
+            "admision": admision.stats(),
+            **contadores,
+            "dependencias": {nombre: {"estado": e.estado, "circuito": e.circuito, "detalle": e.detalle}
+                             for nombre, e in estados.items()},
+            "lotes": batch_stats() if batch_stats else {},
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metricas():
+        texto = telemetria.exportar_prometheus() + admision.exportar_prometheus()
+        if batch_stats:
+            from micro_batcher import metricas_prometheus
+            texto += metricas_prometheus(batch_stats())
+        return PlainTextResponse(texto, media_type="text/plain; version=0.0.4")
+
+    return app
+
+# ============================================================================
+# 4. MAIN - EJECUCIÓN
+# ============================================================================
+
+
+def main():
+    """Servidor uvicorn (un worker: RAG, herramientas y sesiones viven en este proceso)"""
+    import uvicorn
+
+    uvicorn.run(create_app(), host=API_HOST, port=API_PORT, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
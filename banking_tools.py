@@ -0,0 +1,458 @@
+"""
+Herramientas del agente bancario
+Consultas a MyrluxBack, RAG bancario, calculadora financiera, clima y conversión de monedas
+"""
+
+import os
+from datetime import datetime
+from typing import Any, List, Optional
+
+import httpx
+import numpy as np
+from langchain_core.tools import BaseTool
+
+# Cliente HTTP con pool de conexiones para MyrluxBack
+from myrlux_client import MYRLUX_BASE_URL, MyrluxAPIError, MyrluxHTTPClient, get_myrlux_client
+from response_cache import TTLCache
+from semantic_cache import SemanticCache, get_semantic_cache
+from local_index import RAG_RETRIEVAL, get_local_retriever
+from rendering import NOTA_TASA_CRUZADA, renderizar, renderizar_estudiante, renderizar_lista_estudiantes
+import financial_engine
+from currency_rates import RateStore, get_rate_store
+from health_monitor import DependencyUnavailable, HealthMonitor, get_health_monitor
+from admission_control import AdmissionController, AdmissionRejected, get_admission_controller
+from telemetry import get_telemetry, instrumentar_herramienta
+
+# ============================================================================
+# 1. HERRAMIENTAS INTEGRADAS CON TU SISTEMA
+# ============================================================================
+
+# Caché compartida entre sesiones: un mismo estudiante cuesta un acceso a dict
+_student_cache = TTLCache(
+    max_entries=int(os.getenv("MYRLUX_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("MYRLUX_CACHE_TTL", "300")),
+    nombre="consultar_estudiante",
+)
+# La lista completa cambia más seguido que un registro individual
+MYRLUX_LIST_CACHE_TTL = float(os.getenv("MYRLUX_LIST_CACHE_TTL", "30"))
+# Filas mostradas al listar 'todos' (limitar para no saturar)
+MYRLUX_LIST_PREVIEW_SIZE = int(os.getenv("MYRLUX_LIST_PREVIEW_SIZE", "10"))
+
+@instrumentar_herramienta
+class MyrluxStudentTool(BaseTool):
+    """Herramienta para consultar estudiantes en tu backend Java"""
+    name = "consultar_estudiante"
+    description = """Consulta información de estudiantes del sistema MyrluxBack.
+    Parámetros: id_estudiante (número) o 'todos' para listar todos"""
+    base_url: str = MYRLUX_BASE_URL
+    client: Optional[MyrluxHTTPClient] = None
+    cache: Optional[TTLCache] = None
+    salud: Optional[HealthMonitor] = None
+    admision: Optional[AdmissionController] = None
+    
+    def __init__(self, client: Optional[MyrluxHTTPClient] = None, cache: Optional[TTLCache] = None,
+                 salud: Optional[HealthMonitor] = None, admision: Optional[AdmissionController] = None):
+        super().__init__()
+        # Cliente compartido: las sesiones reutilizan las conexiones keep-alive
+        self.client = client or get_myrlux_client()
+        self.base_url = self.client.base_url
+        self.cache = cache if cache is not None else _student_cache
+        # Con el circuito abierto se responde al instante en vez de esperar el timeout
+        self.salud = salud or get_health_monitor()
+        # Tasa y concurrencia hacia MyrluxBack compartidas por todas las sesiones
+        self.admision = admision or get_admission_controller()
+    
+    def _ruta_consulta(self, consulta: str) -> Optional[str]:
+        """Traduce la consulta a la ruta del API (None si el ID no es válido)"""
+        if consulta.lower() == "todos":
+            return "/lista/alumno"
+        try:
+            student_id = int(consulta)
+        except ValueError:
+            return None
+        return f"/obtener/alumno/{student_id}"
+    
+    def _ttl(self, ruta: str) -> Optional[float]:
+        return MYRLUX_LIST_CACHE_TTL if ruta == "/lista/alumno" else None
+    
+    def _cargar(self, ruta: str):
+        # Solo se llega aquí en un fallo de caché: las respuestas cacheadas se sirven aunque esté caído
+        self.salud.verificar("myrlux")
+        try:
+            with self.admision.recurso("myrlux"), get_telemetry().span("myrlux.http", ruta=ruta):
+                if ruta == "/lista/alumno":
+                    datos = self.client.get_list_preview(ruta, limite=MYRLUX_LIST_PREVIEW_SIZE)
+                else:
+                    datos = self.client.get_json(ruta)
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            self.salud.registrar_fallo("myrlux", type(e).__name__)
+            raise
+        self.salud.registrar_exito("myrlux")
+        return datos
+    
+    async def _acargar(self, ruta: str):
+        self.salud.verificar("myrlux")
+        try:
+            # Sin cola: esperar un cupo bloquearía el event loop
+            with self.admision.recurso("myrlux", espera=0), get_telemetry().span("myrlux.http", ruta=ruta):
+                if ruta == "/lista/alumno":
+                    datos = await self.client.aget_list_preview(ruta, limite=MYRLUX_LIST_PREVIEW_SIZE)
+                else:
+                    datos = await self.client.aget_json(ruta)
+        except (httpx.ConnectError, httpx.TimeoutException) as e:
+            self.salud.registrar_fallo("myrlux", type(e).__name__)
+            raise
+        self.salud.registrar_exito("myrlux")
+        return datos
+    
+    def _formatear_respuesta(self, consulta: str, datos) -> str:
+        """Convierte el JSON de MyrluxBack en texto para el usuario"""
+        if consulta.lower() == "todos":
+            # Solo llegan las primeras filas; el total viene del servidor o del conteo en streaming
+            estudiantes, total = datos
+            if not estudiantes:
+                return "No hay estudiantes registrados en el sistema."
+            
+            return renderizar_lista_estudiantes(estudiantes, total)
+        
+        return renderizar_estudiante(datos)
+    
+    def _formatear_error(self, consulta: str, status_code: int) -> str:
+        if consulta.lower() == "todos":
+            return f"Error obteniendo estudiantes: {status_code}"
+        if status_code == 404:
+            return f"No se encontró estudiante con ID {int(consulta)}"
+        return f"Error consultando estudiante: {status_code}"
+    
+    def _run(self, consulta: str) -> str:
+        try:
+            ruta = self._ruta_consulta(consulta)
+            if ruta is None:
+                return "Por favor proporciona un ID válido o escribe 'todos'"
+            
+            datos = self.cache.get_or_load(
+                (self.base_url, ruta), lambda: self._cargar(ruta), ttl=self._ttl(ruta)
+            )
+            return self._formatear_respuesta(consulta, datos)
+        
+        except MyrluxAPIError as e:
+            return self._formatear_error(consulta, e.status_code)
+        except DependencyUnavailable as e:
+            return f"❌ MyrluxBack no disponible; próximo reintento en {e.estado.reintento_en():.0f}s"
+        except AdmissionRejected as e:
+            return f"⏳ MyrluxBack saturado; intenta de nuevo en {max(1, round(e.reintento_en))}s"
+        except httpx.ConnectError:
+            return "❌ No se pudo conectar con MyrluxBack. ¿Está ejecutándose en puerto 11002?"
+        except httpx.TimeoutException:
+            return "⏱️ Timeout consultando MyrluxBack"
+        except Exception as e:
+            return f"Error inesperado: {str(e)}"
+    
+    async def _arun(self, consulta: str) -> str:
+        """Versión async: no bloquea el event loop mientras MyrluxBack responde"""
+        try:
+            ruta = self._ruta_consulta(consulta)
+            if ruta is None:
+                return "Por favor proporciona un ID válido o escribe 'todos'"
+            
+            datos = await self.cache.aget_or_load(
+                (self.base_url, ruta), lambda: self._acargar(ruta), ttl=self._ttl(ruta)
+            )
+            return self._formatear_respuesta(consulta, datos)
+        
+        except MyrluxAPIError as e:
+            return self._formatear_error(consulta, e.status_code)
+        except DependencyUnavailable as e:
+            return f"❌ MyrluxBack no disponible; próximo reintento en {e.estado.reintento_en():.0f}s"
+        except AdmissionRejected as e:
+            return f"⏳ MyrluxBack saturado; intenta de nuevo en {max(1, round(e.reintento_en))}s"
+        except httpx.ConnectError:
+            return "❌ No se pudo conectar con MyrluxBack. ¿Está ejecutándose en puerto 11002?"
+        except httpx.TimeoutException:
+            return "⏱️ Timeout consultando MyrluxBack"
+        except Exception as e:
+            return f"Error inesperado: {str(e)}"
+    
+    def invalidate(self, student_id: Optional[int] = None) -> int:
+        """Invalida la caché de un estudiante (y la lista) o, sin ID, todo este host"""
+        if student_id is None:
+            return self.cache.invalidate_where(lambda key: key[0] == self.base_url)
+        eliminadas = int(self.cache.invalidate((self.base_url, f"/obtener/alumno/{int(student_id)}")))
+        eliminadas += int(self.cache.invalidate((self.base_url, "/lista/alumno")))
+        return eliminadas
+
+@instrumentar_herramienta
+class BankingRAGTool(BaseTool):
+    """Herramienta que usa tu sistema RAG bancario existente.
+
+    La compresión de contexto (context_packer, RAG_CONTEXT_TOKENS) solo se
+    aplica cuando responde el índice local (RAG_LOCAL_INDEX): por Weaviate,
+    rag_query del sistema externo arma su propio prompt con los fragmentos
+    completos.
+    """
+    name = "consulta_bancaria_rag"
+    description = """Responde preguntas sobre productos y servicios bancarios usando
+    el sistema RAG. Ejemplos: cuentas de ahorro, préstamos, tarjetas de crédito"""
+    rag_system: Any = None
+    cache: Optional[SemanticCache] = None
+    salud: Optional[HealthMonitor] = None
+    admision: Optional[AdmissionController] = None
+    
+    def __init__(self, rag_system, cache: Optional[SemanticCache] = None, salud: Optional[HealthMonitor] = None,
+                 admision: Optional[AdmissionController] = None):
+        super().__init__()
+        self.rag_system = rag_system
+        # Preguntas casi idénticas reutilizan la respuesta (sin embedding+Weaviate+DeepSeek)
+        self.cache = cache if cache is not None else get_semantic_cache(rag_system)
+        self.salud = salud or get_health_monitor()
+        self.admision = admision or get_admission_controller()
+    
+    def _consultar(self, pregunta: str):
+        # Solo los fallos de caché ocupan cupo de la dependencia
+        with self.admision.recurso("rag"):
+            return self._consultar_sin_cupo(pregunta)
+    
+    def _consultar_sin_cupo(self, pregunta: str):
+        # Índice local (RAG_LOCAL_INDEX): siempre con RAG_RETRIEVAL=local, o si Weaviate está caído
+        local = get_local_retriever(self.rag_system)
+        if local is not None and (RAG_RETRIEVAL == "local" or not self.salud.disponible("weaviate")):
+            self.salud.verificar("deepseek")
+            with get_telemetry().span("rag.local_query"):
+                resultado = local.rag_query(pregunta, k=3)
+            usadas = ("deepseek",)
+        else:
+            self.salud.verificar("weaviate", "deepseek")
+            # Sin compresión de contexto: el prompt lo arma rag_query del sistema externo
+            # Solo en fallos de caché semántica: separa embedding+Weaviate+DeepSeek del formateo
+            with get_telemetry().span("rag.query"):
+                resultado = self.rag_system.rag_query(pregunta, k=3)
+            usadas = ("weaviate", "deepseek")
+        # Una consulta real que funcionó cierra el circuito aunque la sonda no pase. Los fallos no se
+        # reportan: rag_query no dice si falló Weaviate o la generación, y eso lo decide la sonda
+        for nombre in usadas:
+            self.salud.registrar_exito(nombre)
+        return resultado
+    
+    def _run(self, pregunta: str) -> str:
+        try:
+            resultado = self.cache.get_or_compute(pregunta, lambda: self._consultar(pregunta))
+            
+            partes = ["🏦 Consulta Bancaria:\n\n", resultado["response"]]
+            if resultado["sources"]:
+                partes.append(f"\n\n📋 Fuentes consultadas: {len(resultado['sources'])} documentos")
+            return "".join(partes)
+            
+        except DependencyUnavailable as e:
+            return f"❌ Servicio RAG no disponible ({e}); próximo reintento en {e.estado.reintento_en():.0f}s"
+        except AdmissionRejected as e:
+            return f"⏳ Servicio RAG saturado; intenta de nuevo en {max(1, round(e.reintento_en))}s"
+        except Exception as e:
+            return f"Error en consulta bancaria: {str(e)}"
+
+@instrumentar_herramienta
+class FinancialCalculatorTool(BaseTool):
+    """Calculadora financiera avanzada (motor vectorizado en financial_engine)"""
+    name = "calculadora_financiera"
+    description = """Realiza cálculos financieros. Ejemplos:
+    - 'prestamo 50000 18 24' (monto, tasa%, meses)
+    - 'ahorro 1000 3.5 12' (deposito mensual, tasa%, meses)
+    - 'interes 10000 5 2' (capital, tasa%, años)
+    - 'tabla 50000 18 24' (tabla de amortización mes a mes)
+    - 'escenarios 50000,100000 12,18 12,24,36' (montos, tasas%, plazos: todas las combinaciones)"""
+    
+    # Filas máximas que se muestran de tablas y grillas (el cálculo siempre es completo)
+    max_filas: int = 24
+    
+    @staticmethod
+    def _lista(valor: str, tipo=float) -> List:
+        valores = [tipo(v) for v in valor.split(",") if v]
+        if not valores:
+            raise ValueError("lista vacía")
+        return valores
+    
+    def _run(self, calculo: str) -> str:
+        try:
+            partes = calculo.lower().split()
+            tipo = partes[0]
+            
+            if tipo == "prestamo" and len(partes) >= 4:
+                monto = float(partes[1])
+                tasa_anual = float(partes[2])
+                meses = int(partes[3])
+                if meses < 1:
+                    raise ValueError("plazo inválido")
+                
+                # Calcular pago mensual
+                calculo_prestamo = financial_engine.calcular_prestamo(monto, tasa_anual, meses)
+                pago_mensual = float(calculo_prestamo["pago_mensual"])
+                total_pagado = float(calculo_prestamo["total_pagado"])
+                intereses = float(calculo_prestamo["intereses"])
+                
+                return renderizar("prestamo", monto=monto, tasa_anual=tasa_anual, meses=meses,
+                                  pago_mensual=pago_mensual, total_pagado=total_pagado, intereses=intereses)
+            
+            elif tipo == "ahorro" and len(partes) >= 4:
+                deposito_mensual = float(partes[1])
+                tasa_anual = float(partes[2])
+                meses = int(partes[3])
+                
+                # Calcular valor futuro
+                calculo_ahorro = financial_engine.calcular_ahorro(deposito_mensual, tasa_anual, meses)
+                valor_futuro = float(calculo_ahorro["valor_futuro"])
+                total_depositado = float(calculo_ahorro["total_depositado"])
+                ganancias = float(calculo_ahorro["ganancias"])
+                
+                return renderizar("ahorro", deposito_mensual=deposito_mensual, tasa_anual=tasa_anual, meses=meses,
+                                  total_depositado=total_depositado, valor_futuro=valor_futuro, ganancias=ganancias)
+            
+            elif tipo == "interes" and len(partes) >= 4:
+                capital = float(partes[1])
+                tasa_anual = float(partes[2])
+                años = float(partes[3])
+                
+                # Interés simple y compuesto
+                calculo_interes = financial_engine.calcular_interes(capital, tasa_anual, años)
+                interes_simple = float(calculo_interes["interes_simple"])
+                interes_compuesto = float(calculo_interes["interes_compuesto"])
+                
+                return renderizar("interes", capital=capital, tasa_anual=tasa_anual, anios=años,
+                                  interes_simple=interes_simple, monto_simple=capital + interes_simple,
+                                  interes_compuesto=interes_compuesto, monto_compuesto=capital + interes_compuesto)
+            
+            elif tipo == "tabla" and len(partes) >= 4:
+                return self._tabla_amortizacion(float(partes[1]), float(partes[2]), int(partes[3]))
+            
+            elif tipo == "escenarios" and len(partes) >= 4:
+                return self._escenarios(
+                    self._lista(partes[1]), self._lista(partes[2]), self._lista(partes[3], int)
+                )
+            
+            else:
+                return """Formato incorrecto. Ejemplos válidos:
+• prestamo 50000 18 24 (monto, tasa%, meses)
+• ahorro 1000 3.5 12 (depósito mensual, tasa%, meses)  
+• interes 10000 5 2 (capital, tasa%, años)
+• tabla 50000 18 24 (tabla de amortización)
+• escenarios 50000,100000 12,18 12,24,36 (montos, tasas%, plazos)"""
+                
+        except ValueError:
+            return "Error: Verifica que los números sean válidos"
+        except Exception as e:
+            return f"Error en cálculo: {str(e)}"
+    
+    def _tabla_amortizacion(self, monto: float, tasa_anual: float, meses: int) -> str:
+        """Tabla mes a mes; si es larga se muestran el inicio y el final"""
+        if meses < 1:
+            raise ValueError("plazo inválido")
+        tabla = financial_engine.tabla_amortizacion(monto, tasa_anual, meses)
+        filas = list(range(meses))
+        if meses > self.max_filas:
+            mitad = self.max_filas // 2
+            filas = filas[:mitad] + [None] + filas[-mitad:]
+        
+        lineas = [
+            "📅 Tabla de Amortización:\n",
+            f"Monto: ${monto:,.2f} | Tasa anual: {tasa_anual}% | Plazo: {meses} meses\n",
+            "| Mes | Pago | Interés | Capital | Saldo |",
+            "|---:|---:|---:|---:|---:|",
+        ]
+        for i in filas:
+            if i is None:
+                lineas.append("| … | … | … | … | … |")
+                continue
+            lineas.append(
+                f"| {i + 1} | ${tabla['pago'][0, i]:,.2f} | ${tabla['interes'][0, i]:,.2f}"
+                f" | ${tabla['capital'][0, i]:,.2f} | ${tabla['saldo'][0, i]:,.2f} |"
+            )
+        lineas.append(f"\nIntereses totales: ${tabla['interes'].sum():,.2f}")
+        return "\n".join(lineas)
+    
+    def _escenarios(self, montos: List[float], tasas: List[float], plazos: List[int]) -> str:
+        """Grilla monto × tasa × plazo ordenada por pago mensual"""
+        if min(plazos) < 1:
+            raise ValueError("plazo inválido")
+        grilla = financial_engine.grilla_escenarios(montos, tasas, plazos)
+        total = len(grilla["pago_mensual"])
+        orden = np.argsort(grilla["pago_mensual"], kind="stable")[:self.max_filas]
+        
+        lineas = [
+            f"📊 Escenarios de Préstamo ({total} combinaciones):\n",
+            "| Monto | Tasa | Meses | Pago mensual | Total | Intereses |",
+            "|---:|---:|---:|---:|---:|---:|",
+        ]
+        for i in orden:
+            lineas.append(
+                f"| ${grilla['monto'][i]:,.2f} | {grilla['tasa_anual'][i]}% | {grilla['meses'][i]}"
+                f" | ${grilla['pago_mensual'][i]:,.2f} | ${grilla['total_pagado'][i]:,.2f}"
+                f" | ${grilla['intereses'][i]:,.2f} |"
+            )
+        if total > len(orden):
+            lineas.append(f"\n... y {total - len(orden)} escenarios más (ordenados por pago mensual).")
+        return "\n".join(lineas)
+
+# Para demostración, usamos datos simulados
+# En producción usarías OpenWeatherMap API
+CLIMAS_SIMULADOS = {
+    "mexico": {"temp": 22, "desc": "Soleado", "humedad": 60},
+    "guadalajara": {"temp": 25, "desc": "Parcialmente nublado", "humedad": 55},
+    "monterrey": {"temp": 28, "desc": "Despejado", "humedad": 45},
+    "cancun": {"temp": 30, "desc": "Soleado", "humedad": 75},
+    "veracruz": {"temp": 26, "desc": "Nublado", "humedad": 80}
+}
+
+@instrumentar_herramienta
+class WeatherTool(BaseTool):
+    """Consulta información del clima"""
+    name = "consultar_clima"
+    description = "Consulta el clima actual de una ciudad"
+    
+    def _run(self, ciudad: str) -> str:
+        try:
+            ciudad_lower = ciudad.lower()
+            clima = CLIMAS_SIMULADOS.get(ciudad_lower, {
+                "temp": 24, "desc": "Información no disponible", "humedad": 65
+            })
+            
+            return renderizar("clima", ciudad=ciudad.title(), hora=datetime.now().strftime('%H:%M'), **clima)
+            
+        except Exception as e:
+            return f"Error consultando clima: {str(e)}"
+
+@instrumentar_herramienta
+class CurrencyConverterTool(BaseTool):
+    """Conversor de monedas"""
+    name = "conversion_moneda"
+    description = """Convierte entre monedas. Formato: 'cantidad moneda_origen a moneda_destino'
+    Ejemplo: '100 USD a MXN' o '500 MXN a USD'"""
+    store: Optional[RateStore] = None
+    
+    def __init__(self, store: Optional[RateStore] = None):
+        super().__init__()
+        self.store = store or get_rate_store()
+    
+    def _run(self, conversion: str) -> str:
+        try:
+            # Parsear entrada
+            partes = conversion.split()
+            if len(partes) < 4 or partes[2].lower() != 'a':
+                return "Formato: 'cantidad moneda_origen a moneda_destino' (ej: '100 USD a MXN')"
+            
+            cantidad = float(partes[0])
+            moneda_origen = partes[1].upper()
+            moneda_destino = partes[3].upper()
+            
+            # Tasas directas, inversas y cruzadas ya resueltas en el snapshot vigente
+            conversion_calculada = self.store.convertir(cantidad, moneda_origen, moneda_destino)
+            if conversion_calculada is None:
+                return f"No hay tasa de conversión disponible para {moneda_origen} → {moneda_destino}"
+            
+            resultado_conversion, tasa, cruzada = conversion_calculada
+            
+            return renderizar("conversion", cantidad=cantidad, origen=moneda_origen, resultado=resultado_conversion,
+                              destino=moneda_destino, tasa=tasa, nota=NOTA_TASA_CRUZADA if cruzada else "",
+                              actualizado=self.store.snapshot.actualizado.strftime('%Y-%m-%d %H:%M'))
+            
+        except ValueError:
+            return "Error: La cantidad debe ser un número válido"
+        except Exception as e:
+            return f"Error en conversión: {str(e)}"
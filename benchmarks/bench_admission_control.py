@@ -0,0 +1,142 @@
+"""
+Benchmark: ráfaga de usuarios sobre el agente, sin y con control de admisión
+
+Llegadas de Poisson a --rate mensajes/s durante --seconds, repartidas entre
+--users sesiones; cada mensaje es una pregunta abierta que va al agente
+LLM. El RAG falso tarda --llm-latency s por llamada y el semáforo de
+SharedRAGSystem (RAG_MAX_CONCURRENCY) fija la capacidad del "DeepSeek":
+con --rate por encima de ella la cola crece sin límite si nadie la corta.
+--abusive sesiones extra mandan --abusive-rate mensajes/s cada una.
+Cada modo corre en su propio proceso (ADMISSION_CONTROL=false/true); el
+límite por sesión, apagado por defecto, se fija aquí en 0.5 msg/s con
+ráfaga de 5 salvo que ADMISSION_USER_RATE/BURST digan otra cosa.
+
+Se reporta latencia p50/p95/p99 por desenlace: agente (pasó por el LLM),
+degradada (cola del LLM llena -> respuesta determinista de
+_handle_without_agent) y rechazada (la sesión superó su tasa), más la
+cola máxima observada por recurso.
+
+Uso:
+    python benchmarks/bench_admission_control.py --rate 40 --seconds 10
+    ADMISSION_LLM_CONCURRENCY=4 ADMISSION_LLM_QUEUE=8 python benchmarks/bench_admission_control.py
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PREGUNTAS = [
+    "¿qué me recomiendas para ahorrar para mi retiro?",
+    "explícame cómo funciona el buró de crédito",
+    "quiero invertir mis ahorros, qué opciones hay",
+    "¿conviene pagar el mínimo de mi tarjeta?",
+    "¿cómo mejoro mi historial crediticio?",
+]
+
+
+def correr(args) -> dict:
+    from fake_rag import FakeBankingRAG
+    from shared_resources import get_shared_rag_system
+    from admission_control import AdmissionRejected, get_admission_controller
+    from intelligent_agent import create_shared_agent
+
+    get_shared_rag_system(lambda: FakeBankingRAG(modelo_mb=1, carga_s=0, latencia_s=args.llm_latency))
+    agentes = [create_shared_agent(f"usuario-{i}") for i in range(args.users + args.abusive)]
+    # Calentamiento: LangChain importado, agentes y herramientas construidos
+    agentes[0].chat(PREGUNTAS[0])
+    for agente in agentes:
+        agente.agent
+
+    resultados, lock = [], threading.Lock()
+
+    def atender(agente, pregunta: str, llegada: float):
+        degradadas = agente.routing_counts["shed"]
+        try:
+            agente.chat(pregunta)
+            desenlace = "degradada" if agente.routing_counts["shed"] > degradadas else "agente"
+        except AdmissionRejected:
+            desenlace = "rechazada"
+        with lock:
+            resultados.append((desenlace, time.perf_counter() - llegada))
+
+    rng = random.Random(0)
+    llegadas = []
+    for i in range(args.users):
+        t = rng.expovariate(args.rate / args.users)
+        while t < args.seconds:
+            llegadas.append((t, i))
+            t += rng.expovariate(args.rate / args.users)
+    for i in range(args.users, args.users + args.abusive):
+        llegadas += [(k / args.abusive_rate, i) for k in range(int(args.seconds * args.abusive_rate))]
+    llegadas.sort()
+
+    # Pool amplio: el servidor acepta todo lo que llega; solo la admisión lo acota
+    with ThreadPoolExecutor(max_workers=1024) as pool:
+        inicio = time.perf_counter()
+        for t, i in llegadas:
+            espera = inicio + t - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            pool.submit(atender, agentes[i], rng.choice(PREGUNTAS), time.perf_counter())
+    duracion = time.perf_counter() - inicio
+    return {"resultados": resultados, "duracion": duracion, "admision": get_admission_controller().stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=40.0, help="mensajes por segundo ofrecidos")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--abusive", type=int, default=2, help="sesiones que exceden su tasa")
+    parser.add_argument("--abusive-rate", type=float, default=5.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--modo", choices=["sin", "con"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        # El agente es verbose; redirect_stdout no es seguro por hilo, así que se redirige todo el proceso
+        with contextlib.redirect_stdout(io.StringIO()):
+            datos = correr(args)
+        print(json.dumps(datos))
+        return
+
+    capacidad = int(os.getenv("RAG_MAX_CONCURRENCY", "4")) / args.llm_latency
+    print(f"Ofrecido: {args.rate:g} msg/s x {args.seconds:g}s ({args.users} sesiones + {args.abusive} a "
+          f"{args.abusive_rate:g} msg/s)  capacidad del LLM: {capacidad:g} llamadas/s\n")
+    print(f"{'admisión':<9} {'desenlace':<10} {'n':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'máx s':>7}")
+    for modo in ("sin", "con"):
+        entorno = {"ADMISSION_USER_RATE": "0.5", "ADMISSION_USER_BURST": "5", **os.environ,
+                   "ADMISSION_CONTROL": "true" if modo == "con" else "false", "HEALTH_MONITOR": "false"}
+        salida = subprocess.run([sys.executable, __file__, "--modo", modo, *sys.argv[1:]], env=entorno,
+                                capture_output=True, text=True, check=True).stdout
+        datos = json.loads(salida.strip().splitlines()[-1])
+        por_desenlace = {}
+        for desenlace, latencia in datos["resultados"]:
+            por_desenlace.setdefault(desenlace, []).append(latencia)
+        for desenlace in ("agente", "degradada", "rechazada"):
+            latencias = np.asarray(por_desenlace.get(desenlace, []))
+            if not len(latencias):
+                continue
+            print(f"{modo if desenlace == 'agente' else '':<9} {desenlace:<10} {len(latencias):>6} "
+                  f"{np.median(latencias):>7.2f} {np.percentile(latencias, 95):>7.2f} "
+                  f"{np.percentile(latencias, 99):>7.2f} {latencias.max():>7.2f}")
+        colas = {nombre: s["max_en_cola"] for nombre, s in datos["admision"].items() if "max_en_cola" in s}
+        if modo == "con":
+            print(f"{'':<9} cola máxima por recurso: {colas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark: reproducción de conversaciones grabadas sobre BankingIntelligentAgent
+
+Reproduce un archivo JSONL de turnos ({"sesion": ..., "mensaje": ...},
+ver conversaciones/banca_demo.jsonl) contra el agente con dobles locales
+deterministas: MyrluxBack simulado (stub_myrlux) y el RAG falso
+(fake_rag.FakeBankingRAG, con latencia configurable de rag_query,
+query_deepseek y embeddings). Cada sesión grabada se reproduce --repeat
+veces como sesiones independientes, --concurrency a la vez, cada una con
+sus turnos en orden. Reporta throughput, latencia p50/p95/p99 por mensaje,
+rutas (router/paralelo/agente/respaldo), tiempo por herramienta desde la
+telemetría y RSS por sesión.
+
+Con --json guarda el resultado (con el commit y si el árbol tenía
+cambios); --compare BASE.json imprime la diferencia contra otra corrida.
+--rev REV (repetible) corre el benchmark sobre otros commits, cada uno en
+un git worktree temporal y en su propio proceso, con estos mismos dobles
+y conversaciones, y compara cada uno contra el primero.
+
+Uso:
+    python benchmarks/bench_agent_replay.py --repeat 4 --concurrency 8 --llm-latency 0.05
+    python benchmarks/bench_agent_replay.py --json base.json && python benchmarks/bench_agent_replay.py --compare base.json
+    python benchmarks/bench_agent_replay.py --rev HEAD~5 --rev HEAD
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+# BENCH_REPO: árbol cuyo agente se mide (--rev lo apunta a un worktree de otro commit)
+RAIZ = os.environ.get("BENCH_REPO") or os.path.dirname(BENCH)
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, BENCH)
+
+CONVERSACIONES = os.path.join(BENCH, "conversaciones", "banca_demo.jsonl")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for linea in status:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def percentil(valores, q: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] if ordenados else float("nan")
+
+
+def cargar_conversaciones(ruta: str) -> "OrderedDict[str, List[str]]":
+    sesiones: "OrderedDict[str, List[str]]" = OrderedDict()
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                turno = json.loads(linea)
+                sesiones.setdefault(turno["sesion"], []).append(turno["mensaje"])
+    return sesiones
+
+
+def commit_actual(raiz: str) -> Dict[str, object]:
+    def git(*args) -> str:
+        return subprocess.run(["git", "-C", raiz, *args], capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or "desconocido",
+            "asunto": git("log", "-1", "--format=%s"),
+            "cambios_sin_commit": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+# ============================================================================
+# 1. REPRODUCCIÓN
+# ============================================================================
+
+
+def reproducir(args) -> dict:
+    from stub_myrlux import StubMyrluxServer
+
+    with StubMyrluxServer(total_estudiantes=args.students) as myrlux:
+        # Los módulos leen la URL de MyrluxBack al importarse
+        os.environ["MYRLUX_API_URL"] = myrlux.base_url
+        # Se mide el agente, no el control de admisión (el calentamiento excede cualquier tasa por sesión)
+        os.environ.setdefault("ADMISSION_CONTROL", "false")
+        from fake_rag import FakeBankingRAG
+        import intelligent_agent
+
+        try:
+            from telemetry import get_telemetry
+        except ImportError:  # commits anteriores a la telemetría
+            get_telemetry = None
+
+        rag = FakeBankingRAG(modelo_mb=args.model_mb, carga_s=0.0, latencia_s=args.llm_latency,
+                             latencia_embed_s=args.embed_latency)
+        if hasattr(intelligent_agent, "create_shared_agent"):
+            from shared_resources import get_shared_rag_system
+
+            get_shared_rag_system(lambda: rag)
+            crear = intelligent_agent.create_shared_agent
+        else:
+            def crear():
+                return intelligent_agent.BankingIntelligentAgent(rag)
+
+        conversaciones = cargar_conversaciones(args.conversations)
+        plan = [(f"{nombre}#{i}", mensajes) for i in range(args.repeat) for nombre, mensajes in conversaciones.items()]
+
+        # Calentamiento: imports perezosos, herramientas y agente construidos antes de medir
+        # (el AgentExecutor usa verbose=True: su salida no es parte del reporte)
+        calentamiento = crear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for mensajes in conversaciones.values():
+                for mensaje in mensajes:
+                    calentamiento.chat(mensaje)
+        del calentamiento
+        # La telemetría es del proceso: se descuenta lo acumulado en el calentamiento
+        previo = get_telemetry().resumen() if get_telemetry is not None else {}
+
+        latencias: List[float] = []
+        rutas: Dict[str, int] = {}
+        lock = threading.Lock()
+        agentes = []
+        rss_inicio = rss_mb()
+
+        def sesion(mensajes: List[str]):
+            agente = crear()
+            propias = []
+            for mensaje in mensajes:
+                inicio = time.perf_counter()
+                agente.chat(mensaje)
+                propias.append(time.perf_counter() - inicio)
+            with lock:
+                latencias.extend(propias)
+                agentes.append(agente)  # viva hasta el final: cuenta en el RSS por sesión
+                for ruta, total in getattr(agente, "routing_counts", {}).items():
+                    rutas[ruta] = rutas.get(ruta, 0) + total
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool, contextlib.redirect_stdout(io.StringIO()):
+            list(pool.map(lambda item: sesion(item[1]), plan))
+        duracion = time.perf_counter() - inicio
+        rss_fin = rss_mb()
+
+    operaciones = {}
+    if get_telemetry is not None:
+        for nombre, datos in get_telemetry().resumen().items():
+            antes = previo.get(nombre, {"conteo": 0, "media": 0.0})
+            conteo = datos["conteo"] - antes["conteo"]
+            if conteo and nombre.startswith(("tool.", "rag.", "llm.", "myrlux.")):
+                total = datos["media"] * datos["conteo"] - antes["media"] * antes["conteo"]
+                operaciones[nombre] = {"conteo": conteo, "media_ms": total / conteo * 1000, "total_s": total}
+    return {
+        **commit_actual(RAIZ),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "rev")},
+        "sesiones": len(plan),
+        "mensajes": len(latencias),
+        "segundos": duracion,
+        "throughput": len(latencias) / duracion,
+        "latencia_ms": {f"p{q}": percentil(latencias, q / 100) * 1000 for q in (50, 95, 99)},
+        "rutas": rutas,
+        "operaciones": operaciones,
+        "rss_por_sesion_mb": (rss_fin - rss_inicio) / max(1, len(plan)),
+        "rss_total_mb": rss_fin,
+    }
+
+# ============================================================================
+# 2. REPORTE Y COMPARACIÓN
+# ============================================================================
+
+
+def imprimir(r: dict):
+    print(f"commit {r['commit']}{' (con cambios sin commit)' if r['cambios_sin_commit'] else ''}  {r['asunto']}")
+    lat = r["latencia_ms"]
+    print(f"  {r['sesiones']} sesiones, {r['mensajes']} mensajes en {r['segundos']:.2f}s: "
+          f"{r['throughput']:.1f} msg/s  p50 {lat['p50']:.1f} ms  p95 {lat['p95']:.1f} ms  p99 {lat['p99']:.1f} ms")
+    print(f"  RSS: {r['rss_por_sesion_mb']:.2f} MB/sesión, {r['rss_total_mb']:.0f} MB total   rutas: "
+          + ", ".join(f"{k}={v}" for k, v in sorted(r["rutas"].items())))
+    if r["operaciones"]:
+        total = sum(o["total_s"] for o in r["operaciones"].values()) or 1.0
+        print(f"  {'operación':<32} {'llamadas':>8} {'media ms':>9} {'total s':>8} {'% tiempo':>8}")
+        for nombre, o in sorted(r["operaciones"].items(), key=lambda item: -item[1]["total_s"]):
+            print(f"  {nombre:<32} {o['conteo']:>8} {o['media_ms']:>9.2f} {o['total_s']:>8.2f} "
+                  f"{o['total_s'] / total:>8.1%}")
+
+
+def comparar(base: dict, nuevo: dict):
+    def fila(nombre: str, antes: float, despues: float, mayor_es_mejor: bool = False):
+        cambio = (despues - antes) / antes if antes else float("nan")
+        mejor = cambio > 0 if mayor_es_mejor else cambio < 0
+        marca = "" if abs(cambio) < 0.10 else (" mejor" if mejor else " PEOR")
+        print(f"  {nombre:<32} {antes:>10.2f} {despues:>10.2f} {cambio:>+8.1%}{marca}")
+
+    print(f"\n{base['commit']} -> {nuevo['commit']}")
+    print(f"  {'métrica':<32} {'base':>10} {'nuevo':>10} {'cambio':>8}")
+    fila("throughput msg/s", base["throughput"], nuevo["throughput"], mayor_es_mejor=True)
+    for q in ("p50", "p95", "p99"):
+        fila(f"latencia {q} ms", base["latencia_ms"][q], nuevo["latencia_ms"][q])
+    fila("RSS por sesión MB", base["rss_por_sesion_mb"], nuevo["rss_por_sesion_mb"])
+    for nombre in sorted(set(base["operaciones"]) & set(nuevo["operaciones"])):
+        fila(f"{nombre} ms", base["operaciones"][nombre]["media_ms"], nuevo["operaciones"][nombre]["media_ms"])
+
+
+def correr_en_commit(rev: str, argv: List[str]) -> dict:
+    """Corre este script contra el árbol de `rev` (worktree temporal) y devuelve su resultado"""
+    destino = tempfile.mkdtemp(prefix="bench_rev_")
+    shutil.rmtree(destino)
+    subprocess.run(["git", "-C", os.path.dirname(BENCH), "worktree", "add", "--detach", destino, rev],
+                   check=True, capture_output=True)
+    try:
+        salida = os.path.join(tempfile.gettempdir(), f"bench_replay_{os.getpid()}.json")
+        subprocess.run([sys.executable, os.path.abspath(__file__), *argv, "--json", salida],
+                       env={**os.environ, "BENCH_REPO": destino}, check=True, stdout=subprocess.DEVNULL)
+        with open(salida, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        subprocess.run(["git", "-C", os.path.dirname(BENCH), "worktree", "remove", "--force", destino],
+                       capture_output=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", default=CONVERSACIONES, help="JSONL de turnos grabados")
+    parser.add_argument("--repeat", type=int, default=4, help="veces que se reproduce cada sesión grabada")
+    parser.add_argument("--concurrency", type=int, default=8, help="sesiones simultáneas")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="segundos de rag_query/query_deepseek")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="segundos de embed_query")
+    parser.add_argument("--model-mb", type=float, default=90.0, help="RAM del modelo de embeddings simulado")
+    parser.add_argument("--students", type=int, default=200, help="estudiantes del MyrluxBack simulado")
+    parser.add_argument("--json", help="guardar el resultado en este archivo")
+    parser.add_argument("--compare", help="resultado JSON de referencia")
+    parser.add_argument("--rev", action="append", help="commit a medir (repetible); compara contra el primero")
+    args = parser.parse_args()
+
+    if args.rev:
+        argv = [a for a in sys.argv[1:] if a not in args.rev and a != "--rev"]
+        resultados = [correr_en_commit(rev, argv) for rev in args.rev]
+        for r in resultados:
+            imprimir(r)
+        for r in resultados[1:]:
+            comparar(resultados[0], r)
+        return
+
+    resultado = reproducir(args)
+    imprimir(resultado)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            comparar(json.load(f), resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark: carga sobre la API HTTP (api_server) con 1/10/100 clientes concurrentes
+
+Levanta api_server en un proceso aparte (uvicorn) sobre el RAG falso, cuyo
+query_deepseek/rag_query tarda --llm-latency segundos (stub de DeepSeek),
+y un MyrluxBack simulado. Cada cliente abre su propia sesión y envía una
+mezcla de mensajes (ruta rápida, estudiante, consulta que pasa por el
+agente) tan rápido como recibe respuestas. Reporta throughput y latencia
+p50/p95/p99 por nivel de concurrencia; con --stream usa /chat/stream (SSE)
+y reporta además el tiempo al primer token. El servidor corre en su propio
+proceso para que los clientes no compitan con él por el GIL. Los clientes
+usan aiohttp: el pool async de httpx se vuelve el cuello de botella con 100
+conexiones concurrentes.
+
+Uso:
+    python benchmarks/bench_api_load.py --seconds 5 --llm-latency 0.05
+    python benchmarks/bench_api_load.py --stream --clients 1,10,100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_myrlux import StubMyrluxServer  # noqa: E402
+
+MENSAJES = [
+    "prestamo 50000 18 24",
+    "consulta el estudiante 7",
+    "cuentame algo sobre las cuentas para jovenes",
+    "convierte 100 usd a mxn",
+    "que opinas de ahorrar para el retiro",
+]
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentil(valores, q: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] if ordenados else float("nan")
+
+
+async def cliente(http, base: str, segundos: float, stream: bool, resultados: dict):
+    session_id = None
+    i = 0
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        cuerpo = {"message": MENSAJES[i % len(MENSAJES)]}
+        if session_id:
+            cuerpo["session_id"] = session_id
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            ruta = "/chat/stream" if stream else "/chat"
+            async with http.post(f"{base}{ruta}", json=cuerpo) as r:
+                if r.status != 200:
+                    resultados["errores"] += 1
+                    await r.read()
+                    continue
+                if stream:
+                    primero = None
+                    async for linea in r.content:
+                        linea = linea.decode().strip()
+                        if linea.startswith("data:") and session_id is None:
+                            session_id = json.loads(linea[5:]).get("session_id")
+                        if linea == "event: token" and primero is None:
+                            primero = time.perf_counter() - inicio
+                    resultados["ttft"].append(primero if primero is not None else time.perf_counter() - inicio)
+                else:
+                    session_id = (await r.json())["session_id"]
+        except Exception:
+            resultados["errores"] += 1
+            continue
+        resultados["latencias"].append(time.perf_counter() - inicio)
+
+
+async def nivel(base: str, clientes: int, segundos: float, stream: bool) -> dict:
+    import aiohttp
+
+    resultados = {"latencias": [], "ttft": [], "errores": 0}
+    conector = aiohttp.TCPConnector(limit=clientes)
+    async with aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=60)) as http:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(http, base, segundos, stream, resultados) for _ in range(clientes)))
+        resultados["duracion"] = time.perf_counter() - inicio
+    return resultados
+
+
+def servir(puerto: int, llm_latency: float, max_concurrency: int):
+    """Proceso servidor: MyrluxBack simulado + api_server sobre el RAG falso"""
+    import uvicorn
+
+    with StubMyrluxServer(total_estudiantes=200) as myrlux:
+        os.environ["MYRLUX_API_URL"] = myrlux.base_url
+        from fake_rag import FakeBankingRAG
+        from api_server import create_app
+
+        app = create_app(lambda: FakeBankingRAG(modelo_mb=1, carga_s=0, latencia_s=llm_latency),
+                         max_concurrencia=max_concurrency, espera_maxima=30)
+        uvicorn.run(app, host="127.0.0.1", port=puerto, log_level="warning")
+
+
+def esperar_servidor(base: str, proceso: subprocess.Popen):
+    import httpx
+
+    while proceso.poll() is None:
+        try:
+            httpx.get(f"{base}/health", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError("el servidor terminó antes de arrancar")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", default="1,10,100", help="niveles de concurrencia")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duración de cada nivel")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="latencia del stub de DeepSeek (s)")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="API_MAX_CONCURRENCY del servidor")
+    parser.add_argument("--stream", action="store_true", help="usar /chat/stream (SSE)")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        servir(args.serve, args.llm_latency, args.max_concurrency)
+        return
+
+    puerto = puerto_libre()
+    base = f"http://127.0.0.1:{puerto}"
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(puerto),
+         "--llm-latency", str(args.llm_latency), "--max-concurrency", str(args.max_concurrency)],
+        stdout=subprocess.DEVNULL,  # el agente LangChain es verbose
+    )
+    try:
+        esperar_servidor(base, proceso)
+        # Calentamiento: importa LangChain y construye el agente y las herramientas
+        asyncio.run(nivel(base, 1, 1.0, args.stream))
+
+        modo = "/chat/stream (SSE)" if args.stream else "/chat"
+        print(f"{modo}, stub DeepSeek {args.llm_latency * 1000:.0f} ms, "
+              f"{args.max_concurrency} turnos concurrentes en el servidor, {args.seconds:g}s por nivel\n")
+        cabecera = f"{'clientes':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}"
+        print(cabecera + (f" {'ttft p50':>9} {'ttft p95':>9}" if args.stream else ""))
+        for clientes in (int(c) for c in args.clients.split(",")):
+            r = asyncio.run(nivel(base, clientes, args.seconds, args.stream))
+            lat = [x * 1000 for x in r["latencias"]]
+            fila = (f"{clientes:>8} {len(lat) / r['duracion']:>9.1f} {percentil(lat, 0.5):>9.1f} "
+                    f"{percentil(lat, 0.95):>9.1f} {percentil(lat, 0.99):>9.1f} {r['errores']:>8}")
+            if args.stream:
+                ttft = [x * 1000 for x in r["ttft"]]
+                fila += f" {percentil(ttft, 0.5):>9.1f} {percentil(ttft, 0.95):>9.1f}"
+            print(fila)
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
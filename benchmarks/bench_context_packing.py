@@ -0,0 +1,119 @@
+"""
+Benchmark: compresión de contexto (context_packer) en LocalRetriever.rag_query
+
+Genera fichas de producto de ~3 KB (una frase por atributo más texto de
+relleno), las fragmenta con ingestion_pipeline.fragmentar (1000/200
+caracteres, como la ingesta real) y las indexa con LocalIndexSink. Cada
+pregunta pide un dato de una ficha; se mide, sin compresión y con varios
+presupuestos: tokens del prompt, tokens ahorrados, latencia por rag_query
+cobertura (fracción de prompts que contienen el dato pedido) y
+conservado (de los prompts sin compresión que lo contenían, cuántos lo
+siguen conteniendo: aísla la pérdida de la compresión de la de la
+recuperación, que con el encoder falso es alta).
+El generador simula DeepSeek con costo proporcional al prompt: --base
+ms fijos + --prefill ms por token de entrada.
+
+Uso:
+    python benchmarks/bench_context_packing.py --budgets 100000,600,400,250
+    python benchmarks/bench_context_packing.py --prefill 0.5 --queries 100
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from context_packer import estimar_tokens  # noqa: E402
+from fake_rag import embedder_lote  # noqa: E402
+from ingestion_pipeline import Fragmento, fragmentar, id_fragmento  # noqa: E402
+from local_index import LocalIndexSink, LocalRetriever  # noqa: E402
+
+ATRIBUTOS = (
+    ("{p} tiene un CAT promedio de {v}% sin IVA.", "¿Cuál es el CAT promedio de {p}?"),
+    ("La comisión anual de {p} es de ${v} pesos.", "¿Cuánto es la comisión anual de {p}?"),
+    ("{p} exige ingresos mínimos de ${v} al mes.", "¿Qué ingresos mínimos pide {p}?"),
+    ("{p} ofrece hasta {v} meses sin intereses.", "¿Cuántos meses sin intereses da {p}?"),
+)
+PALABRAS = ("banco cliente contrato condiciones aviso sucursal banca línea información oferta aprobación "
+            "normativa vigente saldo cargo pago fecha corte plazo seguro servicio cuenta titular").split()
+
+
+def relleno(rng: random.Random) -> str:
+    """Frase de texto legal sin datos útiles (distinta en cada llamada, como en documentos reales)"""
+    return " ".join(rng.choices(PALABRAS, k=rng.randint(10, 18))).capitalize()
+
+
+def construir(ruta: str, productos: int, semilla: int = 0):
+    rng = random.Random(semilla)
+    sink = LocalIndexSink(ruta)
+    preguntas = []
+    for n in range(productos):
+        producto = f"Tarjeta Modelo {n}"
+        frases = []
+        for plantilla, pregunta in ATRIBUTOS:
+            valor = str(rng.randint(10, 9999))
+            frases.append(plantilla.format(p=producto, v=valor))
+            preguntas.append((pregunta.format(p=producto), valor))
+            frases.extend(relleno(rng) for _ in range(3))
+        frases.extend(relleno(rng) for _ in range(12))
+        fragmentos = [Fragmento(id_fragmento(producto, i), producto, i, texto, "")
+                      for i, texto in enumerate(fragmentar(". ".join(frases)))]
+        sink.upsert(fragmentos, embedder_lote([f.texto for f in fragmentos]))
+    sink.cerrar()
+    return preguntas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--budgets", default="100000,600,400,250",
+                        help="presupuestos a comparar con la corrida sin compresión (enorme = solo deduplicación)")
+    parser.add_argument("--base", type=float, default=50.0, help="ms fijos por generación")
+    parser.add_argument("--prefill", type=float, default=0.2, help="ms por token del prompt")
+    args = parser.parse_args()
+
+    def generar(prompt: str) -> str:
+        time.sleep((args.base + args.prefill * estimar_tokens(prompt)) / 1000)
+        return prompt
+
+    ruta = tempfile.mkdtemp(prefix="bench_contexto_")
+    try:
+        todas = construir(ruta, args.products)
+        muestras = random.Random(1).sample(todas, min(args.queries, len(todas)))
+        print(f"{'presupuesto':>11} {'prompt tok':>10} {'ahorrados':>9} {'ahorro':>7} {'cobertura':>9} "
+              f"{'conservado':>10} {'p50 ms':>7} {'p95 ms':>7}")
+        base = None
+        for presupuesto in [0] + [int(b) for b in args.budgets.split(",") if int(b)]:
+            retriever = LocalRetriever(ruta, lambda t: embedder_lote([t])[0], generar,
+                                       presupuesto_contexto=presupuesto)
+            tokens, ahorrados, cubiertas, latencias = [], [], set(), []
+            for i, (pregunta, valor) in enumerate(muestras):
+                inicio = time.perf_counter()
+                resultado = retriever.rag_query(pregunta, k=3)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                tokens.append(estimar_tokens(resultado["response"]))
+                ahorrados.append(resultado["context_tokens_saved"])
+                if valor in resultado["response"]:
+                    cubiertas.add(i)
+            media, ahorro = float(np.mean(tokens)), float(np.mean(ahorrados))
+            base = cubiertas if base is None else base
+            print(f"{presupuesto or 'sin compr.':>11} {media:>10.0f} {ahorro:>9.0f} "
+                  f"{ahorro / (media + ahorro):>7.1%} {len(cubiertas) / len(muestras):>9.1%} "
+                  f"{len(cubiertas & base) / max(1, len(base)):>10.1%} "
+                  f"{np.median(latencias):>7.1f} {np.percentile(latencias, 95):>7.1f}")
+            retriever.store.cerrar()
+    finally:
+        shutil.rmtree(ruta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: tamaño de prompt y latencia por turno en sesiones largas
+
+Simula una sesión de N turnos con respuestas de tamaño realista y compara la
+memoria sin límite (ConversationBufferMemory) contra BoundedSummaryMemory:
+tokens de historial enviados a DeepSeek, costo de cargar/guardar la memoria y
+latencia estimada de prefill (proporcional a los tokens del prompt).
+
+Uso:
+    python benchmarks/bench_conversation_memory.py --turns 200 --prefill-ms-per-1k 150
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.memory import ConversationBufferMemory  # noqa: E402
+
+from conversation_memory import BoundedSummaryMemory, estimar_tokens  # noqa: E402
+
+PREGUNTAS = [
+    "¿Qué tipos de cuentas de ahorro tienen?",
+    "Calcula un préstamo de 50000 pesos al 18% por 24 meses",
+    "¿Qué documentos necesito para un crédito personal?",
+    "Muestra todos los estudiantes",
+    "¿Cuál es el clima en Monterrey?",
+    "Convierte 200 USD a MXN",
+    "¿Y si lo pago en 36 meses en lugar de 24?",
+    "¿Cuáles son las comisiones de la tarjeta de crédito?",
+]
+
+FRASES = [
+    "La cuenta de ahorro básica no cobra comisión por manejo de cuenta.",
+    "El pago mensual estimado es de $2,496.12 con un total de intereses de $9,906.88.",
+    "Para el crédito personal se requiere identificación oficial y comprobante de domicilio.",
+    "El CAT promedio informativo es de 32.5% sin IVA.",
+    "La tarjeta Oro incluye seguro de viaje y acceso a salas VIP.",
+    "Las sucursales abren de lunes a viernes de 9:00 a 16:00 horas.",
+]
+
+# Instrucciones + descripción de herramientas del agente ReAct (aprox.)
+TOKENS_PLANTILLA = 650
+
+
+def generar_sesion(turnos: int, semilla: int = 7):
+    rnd = random.Random(semilla)
+    for _ in range(turnos):
+        pregunta = rnd.choice(PREGUNTAS)
+        respuesta = " ".join(rnd.choice(FRASES) for _ in range(rnd.randint(3, 14)))
+        yield pregunta, respuesta
+
+
+def medir(memoria, turnos: int, prefill_ms_por_1k: float):
+    filas = []
+    for turno, (pregunta, respuesta) in enumerate(generar_sesion(turnos), start=1):
+        inicio = time.perf_counter()
+        historial = memoria.load_memory_variables({})["chat_history"]
+        costo_carga = time.perf_counter() - inicio
+        tokens_prompt = TOKENS_PLANTILLA + estimar_tokens(historial) + estimar_tokens(pregunta)
+
+        inicio = time.perf_counter()
+        memoria.save_context({"input": pregunta}, {"output": respuesta})
+        costo_guardado = time.perf_counter() - inicio
+
+        filas.append({
+            "turno": turno,
+            "tokens_prompt": tokens_prompt,
+            "memoria_ms": (costo_carga + costo_guardado) * 1000,
+            "prefill_ms": tokens_prompt / 1000 * prefill_ms_por_1k,
+        })
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=150.0,
+                        help="ms de prefill de DeepSeek por cada 1000 tokens de prompt")
+    parser.add_argument("--max-tokens", type=int, default=1200)
+    parser.add_argument("--summary-tokens", type=int, default=300)
+    parser.add_argument("--context-window", type=int, default=4096)
+    args = parser.parse_args()
+
+    variantes = {
+        "sin límite": ConversationBufferMemory(memory_key="chat_history"),
+        "acotada": BoundedSummaryMemory(max_tokens=args.max_tokens, max_tokens_resumen=args.summary_tokens),
+    }
+    puntos = sorted({1, 10, 25, 50, 100, 150, args.turns} & set(range(1, args.turns + 1)))
+
+    for nombre, memoria in variantes.items():
+        filas = medir(memoria, args.turns, args.prefill_ms_per_1k)
+        excede = next((f["turno"] for f in filas if f["tokens_prompt"] > args.context_window), None)
+        print(f"\n{nombre}")
+        print(f"  {'turno':>6} {'tokens prompt':>14} {'memoria ms':>11} {'prefill ms':>11}")
+        for f in (filas[p - 1] for p in puntos):
+            print(f"  {f['turno']:>6} {f['tokens_prompt']:>14,} {f['memoria_ms']:>11.3f} {f['prefill_ms']:>11.0f}")
+        total = sum(f["tokens_prompt"] for f in filas)
+        print(f"  tokens de prompt acumulados: {total:,}")
+        print(f"  excede contexto de {args.context_window} tokens: "
+              f"{'turno ' + str(excede) if excede else 'nunca'}")
+        if isinstance(memoria, BoundedSummaryMemory):
+            print(f"  estado final: {memoria.stats()}")
+
+
+if __name__ == "__main__":
+    main()
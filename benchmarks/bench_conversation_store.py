@@ -0,0 +1,176 @@
+"""
+Benchmark: RAM de sesiones inactivas en memoria vs en conversation_store, y latencia de reanudación
+
+Simula N sesiones de T turnos con las respuestas reales de las
+herramientas (préstamos, ahorro, clima, conversiones, listas de
+estudiantes, ayuda) y respuestas RAG largas. "en RAM" es el estado que
+hoy se queda vivo por sesión inactiva (historial de la UI como dicts +
+BoundedSummaryMemory); "persistente" guarda cada turno en SQLite y suelta
+la sesión. Se reporta RAM (tracemalloc) por 1000 sesiones inactivas,
+bytes en disco frente al mismo historial en JSON, y la latencia de
+reanudar una sesión (memoria + última página) desde otro proceso, como
+lo haría otro worker.
+
+Uso:
+    python benchmarks/bench_conversation_store.py --sessions 1000 --turns 20
+    python benchmarks/bench_conversation_store.py --sessions 5000 --turns 10 --resumes 500
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_memory import BoundedSummaryMemory  # noqa: E402
+from conversation_store import ConversationStore  # noqa: E402
+from rendering import INFO_AYUDA, renderizar, renderizar_lista_estudiantes  # noqa: E402
+
+RESPUESTA_RAG = ("🏦 Consulta Bancaria:\n\nEl Crédito Personal Express ofrece montos de {m} a 300,000 pesos "
+                 "con plazos de 6 a 60 meses y tasa fija anual desde {t}%. Requisitos: identificación "
+                 "oficial, comprobante de domicilio, comprobante de ingresos de los últimos tres meses y "
+                 "antigüedad laboral mínima de un año. La aprobación toma hasta 48 horas.\n\n"
+                 "📋 Fuentes consultadas: 3 documentos")
+
+
+def turnos(rng: random.Random):
+    """Generador infinito de (pregunta, respuesta) variados"""
+    estudiantes = [{"id": i, "nombres": f"Nombre{i}", "apellidos": "Pérez", "email": f"e{i}@myrlux.mx",
+                    "telefono": "555-0100"} for i in range(10)]
+    while True:
+        m, t, n = rng.randint(5000, 90000), rng.randint(8, 30), rng.randint(6, 48)
+        tipo = rng.randrange(6)
+        if tipo == 0:
+            yield f"prestamo {m} {t} {n}", renderizar(
+                "prestamo", monto=m, tasa_anual=float(t), meses=n, pago_mensual=m / n * 1.1,
+                total_pagado=m * 1.1, intereses=m * 0.1)
+        elif tipo == 1:
+            yield f"ahorro {m // 10} {t / 4} {n}", renderizar(
+                "ahorro", deposito_mensual=m / 10, tasa_anual=t / 4, meses=n, total_depositado=m / 10 * n,
+                valor_futuro=m / 10 * n * 1.03, ganancias=m / 10 * n * 0.03)
+        elif tipo == 2:
+            yield "¿Cuál es el clima en Monterrey?", renderizar(
+                "clima", ciudad="Monterrey", temp=28, desc="Despejado", humedad=45, hora="12:00")
+        elif tipo == 3:
+            yield f"Convierte {m} USD a MXN", renderizar(
+                "conversion", cantidad=m, origen="USD", resultado=m * 18.5, destino="MXN", tasa=18.5, nota="",
+                actualizado="2026-01-01 12:00")
+        elif tipo == 4:
+            yield "Muestra todos los estudiantes", renderizar_lista_estudiantes(estudiantes, 40)
+        else:
+            yield ("cuéntame del crédito personal express" if rng.random() < 0.8 else "¿Qué puedes hacer?",
+                   RESPUESTA_RAG.format(m=m, t=t) if rng.random() < 0.8 else INFO_AYUDA)
+
+
+def en_ram(sesiones: int, n_turnos: int):
+    """(bytes retenidos, bytes del historial en JSON)"""
+    rng = random.Random(0)
+    fuente = turnos(rng)
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    vivas = []
+    for _ in range(sesiones):
+        memoria, mensajes = BoundedSummaryMemory(), []
+        for _ in range(n_turnos):
+            pregunta, respuesta = next(fuente)
+            memoria.save_context({"input": pregunta}, {"output": respuesta})
+            mensajes += [{"role": "user", "content": pregunta}, {"role": "assistant", "content": respuesta}]
+        vivas.append((memoria, mensajes))
+    gc.collect()
+    retenidos = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    json_bytes = sum(len(json.dumps(m, ensure_ascii=False).encode("utf-8")) for _, m in vivas)
+    return retenidos, json_bytes
+
+
+def persistente(ruta: str, sesiones: int, n_turnos: int):
+    """(bytes retenidos, bytes en disco, ms por turno guardado)"""
+    rng = random.Random(0)
+    fuente = turnos(rng)
+    store = ConversationStore(ruta)
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    for s in range(sesiones):
+        memoria = BoundedSummaryMemory()
+        for _ in range(n_turnos):
+            pregunta, respuesta = next(fuente)
+            memoria.save_context({"input": pregunta}, {"output": respuesta})
+            store.agregar_turno(f"sesion-{s}", pregunta, respuesta, memoria.exportar_estado())
+        # La sesión queda inactiva: nada suyo sigue en memoria
+    duracion = time.perf_counter() - inicio
+    gc.collect()
+    retenidos = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    store._conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    stats = store.stats()
+    store.cerrar()
+    return retenidos, stats["bytes"], duracion * 1000 / (sesiones * n_turnos)
+
+
+def reanudar(ruta: str, sesiones: int, muestras: int) -> dict:
+    """Se corre en otro proceso: conexión nueva, como un worker que no vio la sesión"""
+    store = ConversationStore(ruta)
+    rng = random.Random(2)
+    latencias, pagina = [], []
+    for s in rng.sample(range(sesiones), min(muestras, sesiones)):
+        inicio = time.perf_counter()
+        memoria = BoundedSummaryMemory()
+        memoria.restaurar_estado(store.cargar_memoria(f"sesion-{s}"))
+        mensajes, _ = store.pagina(f"sesion-{s}")
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        pagina.append(len(mensajes))
+    store.cerrar()
+    return {"latencias": latencias, "pagina": pagina}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--resumes", type=int, default=300)
+    parser.add_argument("--reanudar", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reanudar:
+        print(json.dumps(reanudar(args.reanudar, args.sessions, args.resumes)))
+        return
+
+    escala = 1000 / args.sessions
+    ram, json_bytes = en_ram(args.sessions, args.turns)
+    directorio = tempfile.mkdtemp(prefix="bench_conversaciones_")
+    try:
+        ruta = os.path.join(directorio, "conversaciones.db")
+        ram_store, disco, ms_turno = persistente(ruta, args.sessions, args.turns)
+        salida = subprocess.run([sys.executable, __file__, "--reanudar", ruta, "--sessions", str(args.sessions),
+                                 "--resumes", str(args.resumes)], capture_output=True, text=True, check=True).stdout
+        datos = json.loads(salida.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    latencias = np.asarray(datos["latencias"])
+    print(f"Sesiones: {args.sessions}  turnos: {args.turns}  (cifras por 1000 sesiones inactivas)\n")
+    print(f"{'modo':<12} {'RAM':>10} {'disco':>10}")
+    print(f"{'en RAM':<12} {ram * escala / 2**20:>7.1f} MB {'—':>10}   (historial en JSON: "
+          f"{json_bytes * escala / 2**20:.1f} MB)")
+    print(f"{'persistente':<12} {ram_store * escala / 2**20:>7.2f} MB {disco * escala / 2**20:>7.1f} MB")
+    print(f"\nGuardar turno: {ms_turno:.3f} ms")
+    print(f"Reanudar sesión (memoria + última página de {int(np.median(datos['pagina']))} mensajes, "
+          f"otro proceso): p50 {np.median(latencias):.2f} ms  p95 {np.percentile(latencias, 95):.2f} ms  "
+          f"p99 {np.percentile(latencias, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
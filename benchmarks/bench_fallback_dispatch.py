@@ -0,0 +1,155 @@
+"""
+Benchmark: mensajes/s por la ruta de respaldo sin agente (_handle_without_agent)
+
+Compara la cadena if/elif original (subcadenas + `import re` en línea + una
+herramienta nueva por mensaje) con la tabla de despacho precompilada sobre las
+herramientas que el agente ya tiene, y la clasificación de la tabla con la
+alternativa de un solo autómata: una alternancia regex con todas las
+palabras, recorrida una vez (misma prioridad que la tabla, ver
+clasificador_regex). Las herramientas corren contra el RAG
+falso (sin latencia) y un MyrluxBack simulado, así que se mide el costo propio
+del despacho y de construir herramientas, no el de los servicios.
+
+Uso:
+    python benchmarks/bench_fallback_dispatch.py --seconds 2
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_myrlux import StubMyrluxServer  # noqa: E402
+
+MENSAJES = [
+    "¿Qué beneficios tiene la tarjeta Oro?",
+    "necesito info del alumno 42",
+    "calcula cuanto ahorro en un año",
+    "como esta el clima hoy en cancun",
+    "cuantos usd son 300 mxn",
+    "que puedes hacer por mi",
+    "háblame de las cuentas para empresas",
+    "dime algo sobre inversiones",
+    "muestra todos los estudiantes",
+    "interes de 10000 a 3 años",
+]
+
+
+def despacho_anterior(agente, user_input: str) -> str:
+    """Copia de la cadena if/elif original, creando la herramienta en cada mensaje"""
+    from banking_tools import (BankingRAGTool, CurrencyConverterTool, FinancialCalculatorTool,
+                               MyrluxStudentTool, WeatherTool)
+    user_lower = user_input.lower()
+    if any(word in user_lower for word in ['banco', 'cuenta', 'credito', 'prestamo', 'tarjeta']):
+        return BankingRAGTool(agente.rag_system)._run(user_input)
+    elif 'estudiante' in user_lower or 'alumno' in user_lower:
+        tool = MyrluxStudentTool()
+        if 'todos' in user_lower:
+            return tool._run('todos')
+        import re
+        numbers = re.findall(r'\d+', user_input)
+        if numbers:
+            return tool._run(numbers[0])
+        return "Por favor especifica el ID del estudiante o escribe 'todos'"
+    elif any(word in user_lower for word in ['calcula', 'prestamo', 'ahorro', 'interes']):
+        return FinancialCalculatorTool()._run(user_input)
+    elif 'clima' in user_lower:
+        tool = WeatherTool()
+        for city in ['mexico', 'guadalajara', 'monterrey', 'cancun', 'veracruz']:
+            if city in user_lower:
+                return tool._run(city)
+        return tool._run('mexico')
+    elif any(word in user_lower for word in ['convierte', 'conversion', 'usd', 'mxn', 'eur']):
+        return CurrencyConverterTool()._run(user_input)
+    elif any(word in user_lower for word in ['ayuda', 'help', 'que puedes', 'capacidades']):
+        return agente._help_info()
+    return BankingRAGTool(agente.rag_system)._run(user_input)
+
+
+def clasificar_anterior(user_input: str):
+    user_lower = user_input.lower()
+    for grupo, palabras in (
+        ("bancaria", ['banco', 'cuenta', 'credito', 'prestamo', 'tarjeta']),
+        ("estudiante", ['estudiante', 'alumno']),
+        ("calculo", ['calcula', 'prestamo', 'ahorro', 'interes']),
+        ("clima", ['clima']),
+        ("conversion", ['convierte', 'conversion', 'usd', 'mxn', 'eur']),
+        ("ayuda", ['ayuda', 'help', 'que puedes', 'capacidades']),
+    ):
+        if any(word in user_lower for word in palabras):
+            return grupo
+    return None
+
+
+def clasificador_regex(grupos):
+    """Clasificación en una sola pasada: lookahead con todas las palabras ordenadas por prioridad.
+
+    En cada posición la alternancia devuelve la palabra de mayor prioridad
+    que empieza ahí; el resultado es el mínimo sobre todas las posiciones,
+    igual que recorrer los grupos en orden.
+    """
+    from intent_router import quitar_acentos
+
+    prioridad = {}
+    for i, (_, palabras) in enumerate(grupos):
+        for palabra in palabras:
+            prioridad.setdefault(quitar_acentos(palabra.lower()), i)
+    patron = re.compile("(?=(" + "|".join(re.escape(p) for p in sorted(prioridad, key=prioridad.get)) + "))")
+    nombres = [nombre for nombre, _ in grupos]
+
+    def clasificar(normalizado: str):
+        mejor = min((prioridad[m.group(1)] for m in patron.finditer(normalizado)), default=None)
+        return nombres[mejor] if mejor is not None else None
+
+    return clasificar
+
+
+def tasa(funcion, segundos: float) -> float:
+    """Mensajes por segundo llamando funcion(mensaje) en ciclo durante `segundos`"""
+    for mensaje in MENSAJES:
+        funcion(mensaje)
+    procesados = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        for mensaje in MENSAJES:
+            funcion(mensaje)
+        procesados += len(MENSAJES)
+    return procesados / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with StubMyrluxServer(total_estudiantes=200) as servidor:
+        os.environ["MYRLUX_API_URL"] = servidor.base_url
+        from fake_rag import FakeBankingRAG
+        from intelligent_agent import FALLBACK_KEYWORDS, BankingIntelligentAgent
+
+        agente = BankingIntelligentAgent(FakeBankingRAG(modelo_mb=1, carga_s=0))
+        dispatcher = agente.despacho_fallback
+        regex = clasificador_regex(FALLBACK_KEYWORDS)
+        assert all(regex(m.lower()) == dispatcher.clasificar(m.lower()) for m in MENSAJES)
+
+        print(f"Mensajes distintos: {len(MENSAJES)}  ({args.seconds:g} s por medición)\n")
+        print(f"{'':<32} {'comparada':>12} {'tabla':>12} {'mejora':>8}")
+        filas = [
+            ("solo clasificación", clasificar_anterior,
+             lambda m: dispatcher.clasificar(m.lower())),
+            ("clasificación: regex 1 pasada", lambda m: regex(m.lower()),
+             lambda m: dispatcher.clasificar(m.lower())),
+            ("ruta completa (con herramienta)", lambda m: despacho_anterior(agente, m),
+             agente._handle_without_agent),
+        ]
+        for nombre, anterior, nueva in filas:
+            t_anterior, t_nueva = tasa(anterior, args.seconds), tasa(nueva, args.seconds)
+            print(f"{nombre:<32} {t_anterior:>10,.0f}/s {t_nueva:>10,.0f}/s {t_nueva / t_anterior:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: camino escalar de FinancialCalculatorTool vs motor vectorizado
+
+Compara escenarios/seg para (a) solo pago mensual y (b) tablas de amortización
+completas sobre una grilla monto × tasa × plazo.
+
+Uso:
+    python benchmarks/bench_financial_engine.py --montos 50 --tasas 20 --plazos 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import financial_engine  # noqa: E402
+
+
+def prestamo_escalar(monto, tasa_anual, meses):
+    """Fórmula escalar original de FinancialCalculatorTool._run"""
+    tasa_mensual = (tasa_anual / 100) / 12
+    pago_mensual = monto * (tasa_mensual * (1 + tasa_mensual)**meses) / ((1 + tasa_mensual)**meses - 1)
+    total_pagado = pago_mensual * meses
+    return pago_mensual, total_pagado, total_pagado - monto
+
+
+def tabla_escalar(monto, tasa_anual, meses):
+    """Tabla de amortización periodo a periodo con ciclos de Python"""
+    pago = prestamo_escalar(monto, tasa_anual, meses)[0]
+    tasa_mensual = (tasa_anual / 100) / 12
+    saldo = monto
+    filas = []
+    for _ in range(meses):
+        interes = saldo * tasa_mensual
+        capital = pago - interes
+        saldo -= capital
+        filas.append((pago, interes, capital, saldo))
+    return filas
+
+
+def medir(fn, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--montos", type=int, default=50)
+    parser.add_argument("--tasas", type=int, default=20)
+    parser.add_argument("--plazos", type=int, default=10)
+    args = parser.parse_args()
+
+    montos = np.linspace(10_000, 500_000, args.montos)
+    tasas = np.linspace(6, 36, args.tasas)
+    plazos = np.linspace(6, 360, args.plazos).astype(int)
+    grilla = financial_engine.grilla_escenarios(montos, tasas, plazos)
+    escenarios = list(zip(grilla["monto"].tolist(), grilla["tasa_anual"].tolist(), grilla["meses"].tolist()))
+    total = len(escenarios)
+    periodos = int(grilla["meses"].sum())
+    print(f"{total} escenarios ({args.montos} montos × {args.tasas} tasas × {args.plazos} plazos), "
+          f"{periodos} periodos en total\n")
+
+    resultados = [
+        ("pago: escalar", medir(lambda: [prestamo_escalar(*e) for e in escenarios])),
+        ("pago: vectorizado", medir(lambda: financial_engine.grilla_escenarios(montos, tasas, plazos))),
+        ("tabla: escalar", medir(lambda: [tabla_escalar(*e) for e in escenarios], 1)),
+        ("tabla: vectorizado", medir(lambda: financial_engine.tabla_amortizacion(
+            grilla["monto"], grilla["tasa_anual"], grilla["meses"]), 1)),
+    ]
+    for nombre, segundos in resultados:
+        print(f"{nombre:<20} {total / segundos:>14,.0f} escenarios/s   ({segundos * 1000:,.1f} ms)")
+
+    # Verificación: ambos caminos coinciden
+    tabla = financial_engine.tabla_amortizacion(*zip(*escenarios[:50]))
+    for i, e in enumerate(escenarios[:50]):
+        esperado = tabla_escalar(*e)
+        assert np.allclose(tabla["interes"][i, :e[2]], [f[1] for f in esperado], rtol=1e-6, atol=1e-6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: costo del panel de estado y de las herramientas con una dependencia colgada
+
+Levanta un "MyrluxBack" que acepta conexiones pero nunca responde (el peor
+caso: cada llamada espera su timeout completo) y mide:
+  - render del panel: GET síncrono como hacía el sidebar vs leer el estado
+    en caché del HealthMonitor
+  - consultas de estudiantes no cacheadas: sin circuit breaker vs con él
+    (tras HEALTH_FAILURE_THRESHOLD fallos la herramienta responde al instante)
+
+Uso:
+    python benchmarks/bench_health_monitor.py --timeout 1 --calls 10
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("HEALTH_MONITOR", "false")
+
+
+def servidor_colgado() -> socket.socket:
+    """Socket que completa el handshake TCP (vía backlog) pero nunca contesta"""
+    servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    servidor.bind(("127.0.0.1", 0))
+    servidor.listen(128)
+    return servidor
+
+
+def medir(funcion, repeticiones: int) -> float:
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(i)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.mean(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--timeout", type=float, default=1.0, help="timeout de lectura (s)")
+    parser.add_argument("--calls", type=int, default=10, help="consultas por medición")
+    args = parser.parse_args()
+
+    servidor = servidor_colgado()
+    base_url = f"http://127.0.0.1:{servidor.getsockname()[1]}/api"
+    os.environ["MYRLUX_API_URL"] = base_url
+    os.environ["MYRLUX_READ_TIMEOUT"] = str(args.timeout)
+
+    import httpx
+    from banking_tools import MyrluxStudentTool
+    from health_monitor import HealthMonitor, sonda_http
+    from myrlux_client import MyrluxClientConfig, MyrluxHTTPClient
+    from response_cache import TTLCache
+
+    def sidebar_anterior(_):
+        try:
+            httpx.get(f"{base_url}/home", timeout=args.timeout)
+        except httpx.HTTPError:
+            pass
+
+    monitor = HealthMonitor(umbral=2)
+    monitor.registrar("myrlux", sonda_http(f"{base_url}/home", timeout=args.timeout))
+    monitor.start()
+
+    def sidebar_cache(_):
+        [estado.etiqueta() for estado in monitor.snapshot().values()]
+
+    cliente = MyrluxHTTPClient(MyrluxClientConfig.from_env())
+    sin_circuito = MyrluxStudentTool(client=cliente, cache=TTLCache(nombre="sin"),
+                                     salud=HealthMonitor(umbral=10 ** 9))
+    con_circuito = MyrluxStudentTool(client=cliente, cache=TTLCache(nombre="con"), salud=monitor)
+
+    print(f"Dependencia colgada, timeout {args.timeout:g}s, {args.calls} llamadas\n")
+    print(f"{'':<34} {'anterior':>12} {'monitor':>12}")
+    t_ant, t_nuevo = medir(sidebar_anterior, args.calls), medir(sidebar_cache, 1000)
+    print(f"{'render panel de estado':<34} {t_ant * 1000:>10.1f}ms {t_nuevo * 1e6:>10.1f}µs")
+    t_ant = medir(lambda i: sin_circuito._run(str(i + 1)), args.calls)
+    t_nuevo = medir(lambda i: con_circuito._run(str(i + 1)), args.calls)
+    print(f"{'consulta estudiante (promedio)':<34} {t_ant * 1000:>10.1f}ms {t_nuevo * 1000:>10.1f}ms")
+    print(f"\n  respuesta con circuito abierto: {con_circuito._run('999')}")
+    monitor.stop()
+    servidor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: recuperación híbrida BM25 + vectores (RRF) frente a solo vectores
+
+Genera un catálogo sintético de productos bancarios (familia x nombre x
+serie, p. ej. "Tarjeta de Crédito Oro 17") con un fragmento por atributo
+(CAT, comisión anual, tasa, requisitos, beneficios), todos con la misma
+plantilla: lo único que distingue a dos productos son los términos
+exactos. Las preguntas usan otra redacción ("¿cuánto cobran de anualidad
+en la Tarjeta Oro 17?") y cada una tiene un único fragmento correcto.
+Mide hit@1, hit@3 (= recall@3), precisión@3, MRR y latencia de los
+modos vector, bm25 e hibrido de LocalRetriever.
+
+El encoder por defecto es fake_rag.embedder_lote (bolsa de palabras
+hasheada, no semántico); con --embedder sentence-transformers se usa el
+modelo real de ingestion_pipeline.
+
+Uso:
+    python benchmarks/bench_hybrid_retrieval.py --chunks 10000,100000
+    python benchmarks/bench_hybrid_retrieval.py --chunks 10000 --embedder sentence-transformers
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion_pipeline import Fragmento, cargar_embedder, id_fragmento  # noqa: E402
+from local_index import LocalIndexSink, LocalRetriever  # noqa: E402
+
+FAMILIAS = ("Tarjeta de Crédito", "Crédito Personal", "Cuenta de Ahorro", "Crédito Hipotecario", "Seguro de Vida",
+            "Fondo de Inversión")
+NOMBRES = ("Oro", "Platino", "Clásica", "Azul", "Joven", "Express", "Plus", "Nómina", "Black", "Digital",
+           "Flex", "Premium")
+
+# (atributo, plantilla del fragmento, plantilla de la pregunta)
+ATRIBUTOS = (
+    ("cat", "El producto {p} tiene un CAT promedio de {v}% sin IVA, informativo y calculado al corte.",
+     "¿Qué CAT maneja {p}?"),
+    ("comision", "La comisión anual del producto {p} es de ${v} pesos más IVA, cobrada en el primer mes.",
+     "¿Cuánto cobran de comisión anual en {p}?"),
+    ("tasa", "El producto {p} ofrece una tasa de interés fija de {v}% anual durante todo el plazo.",
+     "¿Cuál es la tasa de interés de {p}?"),
+    ("requisitos", "Para contratar el producto {p} se requieren ingresos mínimos de ${v} y antigüedad laboral.",
+     "¿Qué ingresos mínimos pide {p}?"),
+    ("beneficios", "El producto {p} incluye {v} meses sin intereses, seguro de compras y banca móvil.",
+     "¿Cuántos meses sin intereses da {p}?"),
+)
+LOTE = 5000
+
+
+def productos(total: int):
+    series = max(1, -(-total // (len(FAMILIAS) * len(NOMBRES) * len(ATRIBUTOS))))
+    for serie in range(1, series + 1):
+        for familia in FAMILIAS:
+            for nombre in NOMBRES:
+                yield f"{familia} {nombre} {serie}"
+
+
+def construir(ruta: str, total: int, embedder, semilla: int = 0):
+    rng = random.Random(semilla)
+    sink = LocalIndexSink(ruta)
+    fragmentos, filas = [], 0
+    for producto in productos(total):
+        for indice, (_, plantilla, _) in enumerate(ATRIBUTOS):
+            texto = plantilla.format(p=producto, v=rng.randint(10, 9999))
+            fragmentos.append(Fragmento(id_fragmento(producto, indice), producto, indice, texto, ""))
+        if len(fragmentos) >= LOTE:
+            sink.upsert(fragmentos, embedder([f.texto for f in fragmentos]))
+            filas += len(fragmentos)
+            fragmentos = []
+        if filas + len(fragmentos) >= total:
+            break
+    if fragmentos:
+        sink.upsert(fragmentos, embedder([f.texto for f in fragmentos]))
+    sink.cerrar()
+
+
+def preguntas(ruta: str, n: int, semilla: int = 1):
+    """(pregunta, fuente, chunk_index) tomando productos presentes en el índice"""
+    from local_index import VectorStore
+
+    store = VectorStore(ruta)
+    rng = random.Random(semilla)
+    muestras = []
+    for fila in rng.sample(range(store.filas), min(n, store.filas)):
+        datos = store.fragmento(fila)
+        pregunta = ATRIBUTOS[datos["chunk_index"]][2].format(p=datos["source"])
+        muestras.append((pregunta, datos["source"], datos["chunk_index"]))
+    store.cerrar()
+    return muestras
+
+
+def evaluar(retriever: LocalRetriever, muestras, modo: str, k: int = 3):
+    aciertos_1 = aciertos_k = 0
+    rr, latencias = 0.0, []
+    for pregunta, fuente, indice in muestras:
+        inicio = time.perf_counter()
+        resultado = retriever.buscar(pregunta, k, modo=modo)
+        latencias.append(time.perf_counter() - inicio)
+        posiciones = [i for i, f in enumerate(resultado, start=1)
+                      if f["source"] == fuente and f["chunk_index"] == indice]
+        if posiciones:
+            aciertos_1 += posiciones[0] == 1
+            aciertos_k += 1
+            rr += 1 / posiciones[0]
+    n = len(muestras)
+    latencias = np.asarray(latencias) * 1000
+    return (aciertos_1 / n, aciertos_k / n, aciertos_k / (n * k), rr / n,
+            float(np.median(latencias)), float(np.percentile(latencias, 95)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", default="10000,100000", help="fragmentos del catálogo por corrida")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--embedder", default="fake_rag:embedder_lote",
+                        help="'sentence-transformers[:modelo]' o 'modulo:funcion'")
+    args = parser.parse_args()
+    embedder_lote = cargar_embedder(args.embedder)
+
+    print(f"{'fragmentos':>10} {'modo':<8} {'hit@1':>6} {'hit@3':>6} {'P@3':>6} {'MRR':>6} "
+          f"{'p50 ms':>7} {'p95 ms':>7}")
+    for total in (int(c) for c in args.chunks.split(",")):
+        ruta = tempfile.mkdtemp(prefix="bench_hibrido_")
+        try:
+            construir(ruta, total, embedder_lote)
+            retriever = LocalRetriever(ruta, lambda texto: embedder_lote([texto])[0])
+            muestras = preguntas(ruta, args.queries)
+            for modo in ("vector", "bm25", "hibrido"):
+                h1, hk, p3, mrr, p50, p95 = evaluar(retriever, muestras, modo)
+                print(f"{total if modo == 'vector' else '':>10} {modo:<8} {h1:>6.3f} {hk:>6.3f} {p3:>6.3f} "
+                      f"{mrr:>6.3f} {p50:>7.2f} {p95:>7.2f}")
+            retriever.store.cerrar()
+        finally:
+            shutil.rmtree(ruta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: ingesta incremental (ingestion_pipeline) sobre un corpus sintético
+
+Genera --docs documentos de ~1-3 KB en un directorio temporal y mide
+docs/s de tres corridas: en frío, repetida sin cambios (el manifiesto
+descarta todo por tamaño+mtime) y tras modificar --changed de los
+archivos. La primera tabla compara procesos de embedding (0 = en línea,
+en el hilo principal); el encoder es fake_rag.embedder_lote (bolsa de
+palabras x proyección, costo de CPU real) y el destino un MemorySink,
+así que mide lectura, hash, fragmentación y embeddings, no la red.
+
+Uso:
+    python benchmarks/bench_ingestion.py --docs 100000 --workers 0,2,4
+    python benchmarks/bench_ingestion.py --docs 10000 --changed 0.05
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion_pipeline import IngestionPipeline, MemorySink  # noqa: E402
+
+PALABRAS = ("cuenta ahorro crédito tasa interés préstamo tarjeta saldo comisión plazo inversión "
+            "cliente banco transferencia depósito hipoteca seguro fondo rendimiento pago").split()
+
+
+def generar_corpus(raiz: str, docs: int, semilla: int = 0):
+    rng = random.Random(semilla)
+    for i in range(docs):
+        subdir = os.path.join(raiz, f"{i // 1000:03d}")
+        if i % 1000 == 0:
+            os.makedirs(subdir, exist_ok=True)
+        texto = " ".join(rng.choices(PALABRAS, k=rng.randint(150, 400)))
+        with open(os.path.join(subdir, f"doc_{i:06d}.txt"), "w", encoding="utf-8") as f:
+            f.write(texto)
+
+
+def modificar(raiz: str, docs: int, fraccion: float, semilla: int = 1) -> int:
+    rng = random.Random(semilla)
+    elegidos = rng.sample(range(docs), max(1, int(docs * fraccion)))
+    for i in elegidos:
+        ruta = os.path.join(raiz, f"{i // 1000:03d}", f"doc_{i:06d}.txt")
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(" actualizado " + " ".join(rng.choices(PALABRAS, k=50)))
+    return len(elegidos)
+
+
+def corrida(raiz: str, manifest: str, workers: int, sink: MemorySink):
+    pipeline = IngestionPipeline(sink, manifest_path=manifest, embedder="fake_rag:embedder_lote",
+                                 workers=workers)
+    return pipeline.ejecutar(raiz)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--workers", default="0,2", help="procesos de embedding a comparar")
+    parser.add_argument("--changed", type=float, default=0.01, help="fracción de archivos modificados")
+    args = parser.parse_args()
+    # Los procesos spawn importan fake_rag desde benchmarks/
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                             os.environ.get("PYTHONPATH")]))
+
+    base = tempfile.mkdtemp(prefix="bench_ingesta_")
+    raiz = os.path.join(base, "corpus")
+    try:
+        inicio = time.perf_counter()
+        generar_corpus(raiz, args.docs)
+        print(f"corpus: {args.docs} documentos generados en {time.perf_counter() - inicio:.1f}s "
+              f"({os.cpu_count()} CPUs)\n")
+        print(f"{'workers':>7} {'corrida':<12} {'docs':>8} {'procesados':>10} {'fragmentos':>10} "
+              f"{'segundos':>9} {'docs/s':>9}")
+        for workers in (int(w) for w in args.workers.split(",")):
+            manifest = os.path.join(base, f"manifest_{workers}.json")
+            sink = MemorySink()
+            cambiados = 0
+            for nombre in ("en frío", "sin cambios", "cambios"):
+                if nombre == "cambios":
+                    cambiados = modificar(raiz, args.docs, args.changed)
+                stats = corrida(raiz, manifest, workers, sink)
+                print(f"{workers:>7} {nombre:<12} {stats.archivos:>8} {stats.procesados:>10} "
+                      f"{stats.fragmentos:>10} {stats.segundos:>9.2f} {stats.docs_por_segundo:>9.0f}")
+                for error in stats.errores:
+                    print(f"        ❌ {error}")
+            print(f"{'':>7} ({cambiados} modificados; {len(sink.objetos)} fragmentos en el destino, "
+                  f"{sink.peticiones} peticiones de subida)")
+            # El siguiente nivel empieza desde el corpus original
+            shutil.rmtree(raiz)
+            generar_corpus(raiz, args.docs)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
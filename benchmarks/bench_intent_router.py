@@ -0,0 +1,92 @@
+"""
+Benchmark: proporción de tráfico que evita el LLM gracias al router determinista
+
+Clasifica una mezcla de mensajes representativa y mide el costo del router.
+Cada mensaje directo es una ejecución del agente ReAct (y sus llamadas a
+DeepSeek) que no ocurre; cuánto tiempo ahorra eso depende de DeepSeek y no
+se estima aquí (ver bench_agent_replay.py para latencias medidas).
+
+Uso:
+    python benchmarks/bench_intent_router.py --threshold 0.85
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import IntentRouter  # noqa: E402
+
+CIUDADES = ["mexico", "guadalajara", "monterrey", "cancun", "veracruz"]
+MONEDAS = ["USD", "MXN", "EUR"]
+
+# Ejemplos del sidebar + consultas típicas del chat (mezcla aproximada de producción)
+TRAFICO = [
+    "¿Qué tipos de cuentas de ahorro tienen?",
+    "prestamo 75000 16 30",
+    "Muestra todos los estudiantes",
+    "Consulta el estudiante 1",
+    "¿Cuál es el clima en Monterrey?",
+    "Convierte 200 USD a MXN",
+    "ahorro 1500 3.5 18",
+    "¿Qué puedes hacer?",
+    "¿Cómo abrir una cuenta de ahorros?",
+    "Calcula un préstamo de 50000 pesos al 18% por 24 meses",
+    "¿Qué documentos necesito para un crédito personal?",
+    "¿Cuáles son las comisiones de la tarjeta de crédito?",
+    "prestamo 100000 15 36",
+    "Convierte 500 MXN a USD",
+    "¿Cuál es el clima en Guadalajara?",
+    "interes 10000 5 2",
+    "Muestra información del estudiante 123",
+    "¿Cuál es el horario de las sucursales?",
+    "¿Qué beneficios tiene la tarjeta Oro?",
+    "ayuda",
+    "100 EUR a MXN",
+    "¿Cuánto es el CAT del crédito personal express?",
+    "clima",
+    "tabla 50000 18 24",
+    # Coma decimal y números que no son un cálculo
+    "ahorro 1500 3,5 18",
+    "¿El crédito Oro cobra 2 comisiones al 3% en 12 meses?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    router = IntentRouter(ciudades=CIUDADES, monedas=MONEDAS, threshold=args.threshold)
+
+    reglas = Counter()
+    directos = 0
+    for mensaje in TRAFICO:
+        decision = router.route_confident(mensaje)
+        reglas[decision.regla if decision else "→ agente LLM"] += 1
+        directos += decision is not None
+
+    latencias = []
+    for _ in range(args.iterations):
+        for mensaje in TRAFICO:
+            inicio = time.perf_counter()
+            router.route_confident(mensaje)
+            latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+
+    proporcion = directos / len(TRAFICO)
+    print(f"Mensajes: {len(TRAFICO)}  umbral: {args.threshold}\n")
+    for regla, cuenta in reglas.most_common():
+        print(f"  {regla:<22} {cuenta}")
+    print(f"\nEvitan el LLM: {directos}/{len(TRAFICO)} ({proporcion:.0%})")
+    print(f"Costo del router: p50 {statistics.median(latencias) * 1e6:.1f} µs, "
+          f"p99 {latencias[int(len(latencias) * 0.99)] * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: índice vectorial local (local_index) frente a Weaviate
+
+Genera N embeddings sintéticos agrupados (mezcla de gaussianas sobre la
+esfera, como los de un corpus real), los escribe con LocalIndexSink en
+un directorio temporal y mide, por tamaño, recall@3 y latencia por
+consulta de la búsqueda exacta (top_k sobre el memmap) y de IVF con
+varios nprobe. La verdad de referencia es la búsqueda exacta. Con
+--weaviate URL sube los mismos vectores a una clase temporal y mide
+también consultas nearVector por GraphQL (la red incluida); sin él esa
+fila se omite.
+
+Uso:
+    python benchmarks/bench_local_index.py --sizes 10000,100000,1000000
+    python benchmarks/bench_local_index.py --sizes 10000 --weaviate http://localhost:8080
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestion_pipeline import Fragmento, WeaviateSink, id_fragmento  # noqa: E402
+from local_index import IVFIndex, LocalIndexSink, VectorStore, top_k  # noqa: E402
+
+LOTE = 20_000
+
+
+def generar(ruta: str, filas: int, dimension: int, grupos: int, semilla: int = 0):
+    """Escribe el índice por lotes con LocalIndexSink (mismo camino que ingestion_pipeline --local-index)"""
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((grupos, dimension), dtype=np.float32)
+    sink = LocalIndexSink(ruta, dimension, ivf_min=None)  # el IVF se entrena (y se mide) aparte
+    for inicio in range(0, filas, LOTE):
+        n = min(LOTE, filas - inicio)
+        vectores = centros[rng.integers(0, grupos, n)] + 1.5 * rng.standard_normal((n, dimension), dtype=np.float32)
+        fragmentos = [Fragmento(id_fragmento(f"doc_{i // 4}", i % 4), f"doc_{i // 4}", i % 4, f"fragmento {i}", "")
+                      for i in range(inicio, inicio + n)]
+        sink.upsert(fragmentos, vectores)
+    sink.cerrar()
+
+
+def consultas(store: VectorStore, n: int, semilla: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(semilla)
+    base = np.asarray(store.vectores[np.sort(rng.choice(store.filas, n, replace=False))])
+    q = base + 0.1 * rng.standard_normal(base.shape, dtype=np.float32)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def medir(buscar, q: np.ndarray, verdad: np.ndarray, k: int = 3):
+    latencias, aciertos = [], 0
+    for i, consulta in enumerate(q):
+        inicio = time.perf_counter()
+        filas = buscar(consulta, k)
+        latencias.append(time.perf_counter() - inicio)
+        aciertos += len(set(filas[:k]) & set(verdad[i]))
+    latencias = np.asarray(latencias) * 1000
+    return aciertos / verdad.size, float(np.median(latencias)), float(np.percentile(latencias, 95))
+
+
+def weaviate(url: str, store: VectorStore, q: np.ndarray, verdad: np.ndarray, clase: str = "BenchLocalIndex"):
+    import httpx
+
+    client = httpx.Client(timeout=120.0)
+    client.delete(f"{url}/v1/schema/{clase}")
+    client.post(f"{url}/v1/schema", json={"class": clase, "vectorizer": "none"}).raise_for_status()
+    sink = WeaviateSink(url, clase)
+    ids = {}
+    try:
+        for inicio in range(0, store.filas, 1000):
+            filas = range(inicio, min(store.filas, inicio + 1000))
+            fragmentos = []
+            for fila in filas:
+                datos = store.fragmento(fila)
+                ids[datos["id"]] = fila
+                fragmentos.append(Fragmento(datos["id"], datos["source"], datos["chunk_index"], datos["content"], ""))
+            sink.upsert(fragmentos, np.asarray(store.vectores[inicio:inicio + len(filas)]))
+
+        def buscar(consulta, k):
+            vector = ",".join(f"{x:.6f}" for x in consulta)
+            consulta_gql = (f"{{ Get {{ {clase}(nearVector: {{vector: [{vector}]}}, limit: {k}) "
+                            f"{{ _additional {{ id }} }} }} }}")
+            response = client.post(f"{url}/v1/graphql", json={"query": consulta_gql})
+            response.raise_for_status()
+            return [ids[o["_additional"]["id"]] for o in response.json()["data"]["Get"][clase]]
+
+        return medir(buscar, q, verdad)
+    finally:
+        client.delete(f"{url}/v1/schema/{clase}")
+        sink.cerrar()
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="fragmentos por corrida")
+    parser.add_argument("--dim", type=int, default=384, help="dimensión (384 = all-MiniLM-L6-v2)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", default="8,16,64")
+    parser.add_argument("--weaviate", metavar="URL", help="comparar también contra Weaviate")
+    args = parser.parse_args()
+
+    print(f"{'fragmentos':>10} {'método':<14} {'recall@3':>8} {'p50 ms':>8} {'p95 ms':>8} {'prep s':>7}")
+    for filas in (int(s) for s in args.sizes.split(",")):
+        ruta = tempfile.mkdtemp(prefix="bench_indice_")
+        try:
+            inicio = time.perf_counter()
+            generar(ruta, filas, args.dim, grupos=max(16, filas // 500))
+            preparacion = time.perf_counter() - inicio
+            store = VectorStore(ruta)
+            q = consultas(store, args.queries)
+            verdad = top_k(store.vectores, q, 3, store.vivos)[1]
+
+            def exacta(consulta, k):
+                return top_k(store.vectores, consulta, k, store.vivos)[1][0].tolist()
+
+            recall, p50, p95 = medir(exacta, q, verdad)
+            print(f"{filas:>10} {'exacta':<14} {recall:>8.3f} {p50:>8.2f} {p95:>8.2f} {preparacion:>7.1f}")
+
+            ivf = IVFIndex(store)
+            inicio = time.perf_counter()
+            ivf.entrenar()
+            entrenamiento = time.perf_counter() - inicio
+            for nprobe in (int(n) for n in args.nprobe.split(",")):
+                ivf.nprobe = nprobe
+                recall, p50, p95 = medir(lambda c, k: ivf.buscar(c, k)[1][0].tolist(), q, verdad)
+                print(f"{'':>10} {f'ivf nprobe={nprobe}':<14} {recall:>8.3f} {p50:>8.2f} {p95:>8.2f} "
+                      f"{entrenamiento:>7.1f}")
+
+            if args.weaviate:
+                inicio = time.perf_counter()
+                recall, p50, p95 = weaviate(args.weaviate.rstrip("/"), store, q, verdad)
+                print(f"{'':>10} {'weaviate':<14} {recall:>8.3f} {p50:>8.2f} {p95:>8.2f} "
+                      f"{time.perf_counter() - inicio:>7.1f}")
+            store.cerrar()
+        finally:
+            shutil.rmtree(ruta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: micro-lotes de embeddings y generación con N sesiones concurrentes
+
+Compara el sistema RAG compartido tal cual (SharedRAGSystem: una llamada
+al modelo por petición, semáforo de RAG_MAX_CONCURRENCY) con
+BatchingRAGSystem encima, sobre el RAG falso en modo serializado (una
+sola pasada del modelo a la vez, como una GPU u Ollama con
+NUM_PARALLEL=1). Un lote de n elementos cuesta latencia * (1 + 0.1 * (n-1)).
+Cada hilo simula una sesión que llama a la operación en ciclo.
+
+Uso:
+    python benchmarks/bench_micro_batch.py --threads 1,8,32 --seconds 3
+    python benchmarks/bench_micro_batch.py --op embed_query --latency 0.01
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_rag import FakeBankingRAG  # noqa: E402
+from micro_batcher import BatchingRAGSystem  # noqa: E402
+from shared_resources import SharedRAGSystem  # noqa: E402
+
+
+def percentil(valores, q: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] if ordenados else float("nan")
+
+
+def carga(sistema, op: str, hilos: int, segundos: float) -> dict:
+    latencias = []
+    fin = time.perf_counter() + segundos
+
+    def sesion(n: int):
+        i = 0
+        propias = []
+        while time.perf_counter() < fin:
+            # Textos distintos por sesión: la deduplicación no interviene
+            texto = f"sesion {n} pregunta {i}"
+            inicio = time.perf_counter()
+            if op == "rag_query":
+                sistema.rag_query(texto, k=3)
+            else:
+                getattr(sistema, op)(texto)
+            propias.append(time.perf_counter() - inicio)
+            i += 1
+        latencias.extend(propias)
+
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=sesion, args=(n,)) for n in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    return {"latencias": latencias, "duracion": time.perf_counter() - inicio}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--op", default="query_deepseek", choices=["query_deepseek", "embed_query", "rag_query"])
+    parser.add_argument("--threads", default="1,8,32,64")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="segundos por pasada del modelo")
+    parser.add_argument("--window", type=float, default=0.005, help="RAG_BATCH_WINDOW")
+    parser.add_argument("--max-batch", type=int, default=16, help="RAG_BATCH_MAX_SIZE")
+    args = parser.parse_args()
+
+    def crear_rag():
+        return FakeBankingRAG(modelo_mb=1, carga_s=0, latencia_s=args.latency,
+                              latencia_embed_s=args.latency, serializar=True)
+
+    print(f"{args.op}: pasada del modelo {args.latency * 1000:.0f} ms (serializada), "
+          f"ventana {args.window * 1000:g} ms, lote máx {args.max_batch}\n")
+    print(f"{'sesiones':>8} {'modo':<10} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'pasadas':>8} {'lote':>6}")
+    for hilos in (int(h) for h in args.threads.split(",")):
+        for modo in ("directo", "lotes"):
+            rag = crear_rag()
+            sistema = SharedRAGSystem(rag)
+            if modo == "lotes":
+                sistema = BatchingRAGSystem(sistema, ventana=args.window, max_lote=args.max_batch)
+            r = carga(sistema, args.op, hilos, args.seconds)
+            lat = [x * 1000 for x in r["latencias"]]
+            lote = len(lat) / rag.llamadas_modelo if rag.llamadas_modelo else 0
+            print(f"{hilos:>8} {modo:<10} {len(lat) / r['duracion']:>8.1f} {percentil(lat, 0.5):>8.1f} "
+                  f"{percentil(lat, 0.95):>8.1f} {rag.llamadas_modelo:>8} {lote:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
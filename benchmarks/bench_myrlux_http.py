@@ -0,0 +1,100 @@
+"""
+Benchmark: requests.get por llamada vs cliente MyrluxBack con pool de conexiones
+
+Uso:
+    python benchmarks/bench_myrlux_http.py --requests 2000 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from myrlux_client import MyrluxClientConfig, MyrluxHTTPClient  # noqa: E402
+from stub_myrlux import StubMyrluxServer  # noqa: E402
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def reporte(nombre, latencias, duracion):
+    print(
+        f"{nombre:<28} {len(latencias) / duracion:>10.1f} req/s"
+        f"   p50 {statistics.median(latencias) * 1000:>7.2f} ms"
+        f"   p99 {percentil(latencias, 99) * 1000:>7.2f} ms"
+    )
+
+
+def medir_threads(fn, total, concurrencia):
+    def una(i):
+        inicio = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        latencias = list(pool.map(una, range(total)))
+    return latencias, time.perf_counter() - inicio
+
+
+async def medir_async(cliente, total, concurrencia):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+
+    async def una(i):
+        async with semaforo:
+            inicio = time.perf_counter()
+            await cliente.aget(f"/obtener/alumno/{i % 100 + 1}")
+            latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(total)))
+    duracion = time.perf_counter() - inicio
+    await cliente.aclose()
+    return latencias, duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with StubMyrluxServer(total_estudiantes=100) as stub:
+        base_url = stub.base_url
+        print(f"Stub MyrluxBack en {base_url} — {args.requests} peticiones, concurrencia {args.concurrency}\n")
+
+        latencias, duracion = medir_threads(
+            lambda i: requests.get(f"{base_url}/obtener/alumno/{i % 100 + 1}", timeout=10),
+            args.requests, args.concurrency,
+        )
+        reporte("requests.get por llamada", latencias, duracion)
+
+        cliente = MyrluxHTTPClient(MyrluxClientConfig(
+            base_url=base_url,
+            max_connections=args.concurrency,
+            max_keepalive_connections=args.concurrency,
+        ))
+        latencias, duracion = medir_threads(
+            lambda i: cliente.get(f"/obtener/alumno/{i % 100 + 1}"),
+            args.requests, args.concurrency,
+        )
+        reporte("pool sync (httpx.Client)", latencias, duracion)
+        cliente.close()
+
+        latencias, duracion = asyncio.run(medir_async(cliente, args.requests, args.concurrency))
+        reporte("pool async (_arun)", latencias, duracion)
+
+
+if __name__ == "__main__":
+    main()
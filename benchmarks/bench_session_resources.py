@@ -0,0 +1,84 @@
+"""
+Benchmark: RAM y latencia de apertura por sesión, recursos por sesión vs compartidos
+
+"por-sesion" reproduce la interfaz anterior (un BankingRAGConfigurable y un juego
+de herramientas por navegador); "compartido" usa create_shared_agent(). Cada modo
+corre en su propio proceso para medir su RSS sin interferencias.
+
+Uso:
+    python benchmarks/bench_session_resources.py --sessions 8 --model-mb 90 --load-s 1.0
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as status:
+        for linea in status:
+            if linea.startswith("VmRSS:"):
+                return int(linea.split()[1]) / 1024
+    return 0.0
+
+
+def correr_modo(modo: str, sesiones: int, modelo_mb: float, carga_s: float) -> dict:
+    from fake_rag import FakeBankingRAG
+    from intelligent_agent import BankingIntelligentAgent, create_shared_agent
+    from shared_resources import get_shared_rag_system
+
+    def fabrica():
+        return FakeBankingRAG(modelo_mb=modelo_mb, carga_s=carga_s)
+
+    agentes, aperturas, rss = [], [], [rss_mb()]
+    for _ in range(sesiones):
+        inicio = time.perf_counter()
+        if modo == "por-sesion":
+            agente = BankingIntelligentAgent(fabrica())
+        else:
+            get_shared_rag_system(fabrica)
+            agente = create_shared_agent()
+        agente.chat("prestamo 50000 18 24")
+        aperturas.append(time.perf_counter() - inicio)
+        agentes.append(agente)
+        rss.append(rss_mb())
+    return {"aperturas": aperturas, "rss": rss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--model-mb", type=float, default=90.0, help="RAM del modelo de embeddings simulado")
+    parser.add_argument("--load-s", type=float, default=1.0, help="segundos de carga del sistema RAG simulado")
+    parser.add_argument("--modo", choices=["por-sesion", "compartido"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(correr_modo(args.modo, args.sessions, args.model_mb, args.load_s)))
+        return
+
+    print(f"Sesiones: {args.sessions}  modelo: {args.model_mb:g} MB  carga: {args.load_s:g} s\n")
+    print(f"{'modo':<12} {'1a sesión':>10} {'siguientes':>11} {'RSS/sesión extra':>17} {'RSS total':>10}")
+    for modo in ("por-sesion", "compartido"):
+        salida = subprocess.run(
+            [sys.executable, __file__, "--modo", modo, "--sessions", str(args.sessions),
+             "--model-mb", str(args.model_mb), "--load-s", str(args.load_s)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        datos = json.loads(salida.strip().splitlines()[-1])
+        aperturas, rss = datos["aperturas"], datos["rss"]
+        siguientes = sum(aperturas[1:]) / max(1, len(aperturas) - 1)
+        extra = (rss[-1] - rss[1]) / max(1, len(rss) - 2)
+        print(f"{modo:<12} {aperturas[0] * 1000:>8.0f}ms {siguientes * 1000:>9.1f}ms "
+              f"{extra:>14.1f} MB {rss[-1]:>7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
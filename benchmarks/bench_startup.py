@@ -0,0 +1,79 @@
+"""
+Benchmark: arranque en frío (import, primera respuesta directa y primera respuesta del agente)
+
+Cada repetición corre en un proceso nuevo: mide cuánto tarda `import
+intelligent_agent`, la primera respuesta por la ruta rápida (router ->
+herramienta, incluyendo crear el agente de la sesión) y la primera
+respuesta que necesita el agente LangChain, y lista qué módulos pesados
+quedaron cargados en cada punto.
+
+Uso:
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --root /ruta/a/otra/copia   # comparar con otra versión
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(BENCH_DIR)
+
+PESADOS = ("streamlit", "langchain.agents", "langchain.memory", "langchain_core", "banking_tools", "numpy", "httpx")
+
+PROCESO_FRIO = r"""
+import json, sys, time
+inicio = time.perf_counter()
+import intelligent_agent
+t_import = time.perf_counter() - inicio
+cargados = lambda: [m for m in PESADOS if m in sys.modules]
+m_import = cargados()
+
+from fake_rag import FakeBankingRAG
+rag = FakeBankingRAG(modelo_mb=1, carga_s=0)
+inicio = time.perf_counter()
+agente = intelligent_agent.BankingIntelligentAgent(rag)
+agente.chat("prestamo 50000 18 24")
+t_rapida = time.perf_counter() - inicio
+m_rapida = cargados()
+
+inicio = time.perf_counter()
+agente.chat("cuéntame algo interesante")
+t_agente = time.perf_counter() - inicio
+print(json.dumps({"import": t_import, "rapida": t_rapida, "agente": t_agente,
+                  "m_import": m_import, "m_rapida": m_rapida}))
+"""
+
+
+def correr(raiz: str) -> dict:
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [raiz, BENCH_DIR] + [p for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+    ))
+    codigo = f"PESADOS = {PESADOS!r}\n{PROCESO_FRIO}"
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True,
+                            env=entorno, cwd=raiz, check=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--root", default=RAIZ, help="copia del repositorio a medir")
+    args = parser.parse_args()
+
+    corridas = [correr(args.root) for _ in range(args.repeat)]
+    mediana = {k: statistics.median(c[k] for c in corridas) for k in ("import", "rapida", "agente")}
+    print(f"Procesos en frío: {args.repeat}  ({args.root})\n")
+    print(f"  import intelligent_agent      {mediana['import'] * 1000:>8.0f} ms")
+    print(f"  + primera respuesta directa   {mediana['rapida'] * 1000:>8.0f} ms")
+    print(f"  = listo para ruta rápida      {(mediana['import'] + mediana['rapida']) * 1000:>8.0f} ms")
+    print(f"  + primera respuesta agente    {mediana['agente'] * 1000:>8.0f} ms")
+    print(f"\n  cargados tras import:         {', '.join(corridas[0]['m_import']) or '-'}")
+    print(f"  cargados tras ruta rápida:    {', '.join(corridas[0]['m_rapida']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
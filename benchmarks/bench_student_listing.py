@@ -0,0 +1,112 @@
+"""
+Benchmark: listado 'todos' completo (response.json) vs streaming / paginado
+
+Mide tiempo a la primera fila, tiempo total y pico de RSS de cada modo.
+Cada modo corre en un subproceso para que el pico de memoria no se mezcle.
+
+Uso:
+    python benchmarks/bench_student_listing.py --students 100000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODOS = ("completo", "streaming", "paginado")
+
+
+def rss_pico_mb() -> float:
+    # VmHWM se reinicia con execve; ru_maxrss en Linux hereda el pico del proceso padre
+    try:
+        with open("/proc/self/status") as status:
+            for linea in status:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def ejecutar_modo(modo: str, base_url: str, limite: int) -> dict:
+    """Corre un modo dentro del subproceso y devuelve sus métricas"""
+    import httpx
+    from myrlux_client import MyrluxClientConfig, MyrluxHTTPClient
+
+    base = rss_pico_mb()
+    inicio = time.perf_counter()
+    if modo == "completo":
+        # Camino anterior: descargar y decodificar el arreglo entero
+        estudiantes = httpx.get(f"{base_url}/lista/alumno", timeout=60).json()
+        primera = time.perf_counter()
+        filas, total = estudiantes[:limite], len(estudiantes)
+    else:
+        cliente = MyrluxHTTPClient(MyrluxClientConfig(base_url=base_url, paginate_lists=(modo == "paginado")))
+        filas, total = cliente.get_list_preview("/lista/alumno", limite=limite)
+        primera = None
+    fin = time.perf_counter()
+    return {
+        "modo": modo,
+        "filas": len(filas),
+        "total": total,
+        "primera_fila_ms": ((primera or fin) - inicio) * 1000,
+        "total_ms": (fin - inicio) * 1000,
+        "rss_extra_mb": rss_pico_mb() - base,
+    }
+
+
+def medir_primera_fila(base_url: str) -> float:
+    """Tiempo hasta tener el primer elemento decodificado en modo streaming"""
+    import httpx
+    from myrlux_client import JSONArrayParser
+
+    parser = JSONArrayParser()
+    inicio = time.perf_counter()
+    with httpx.stream("GET", f"{base_url}/lista/alumno", timeout=60) as response:
+        for fragmento in response.iter_bytes():
+            if parser.feed(fragmento):
+                return (time.perf_counter() - inicio) * 1000
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        metricas = ejecutar_modo(args.modo, args.base_url, args.limit)
+        if args.modo == "streaming":
+            metricas["primera_fila_ms"] = medir_primera_fila(args.base_url)
+        print(json.dumps(metricas))
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from stub_myrlux import StubMyrluxServer
+
+    with StubMyrluxServer(total_estudiantes=args.students, pageable=True) as stub:
+        tamano_mb = len(stub.httpd.lista_json) / (1024 * 1024)
+        print(f"Payload sintético: {args.students} estudiantes ({tamano_mb:.1f} MB)\n")
+        print(f"{'modo':<10} {'filas':>6} {'total':>8} {'1a fila ms':>11} {'total ms':>10} {'RSS extra MB':>13}")
+        for modo in MODOS:
+            salida = subprocess.run(
+                [sys.executable, __file__, "--modo", modo, "--base-url", stub.base_url, "--limit", str(args.limit)],
+                capture_output=True, text=True, check=True,
+            )
+            m = json.loads(salida.stdout.strip().splitlines()[-1])
+            print(f"{m['modo']:<10} {m['filas']:>6} {m['total']:>8} {m['primera_fila_ms']:>11.1f}"
+                  f" {m['total_ms']:>10.1f} {m['rss_extra_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
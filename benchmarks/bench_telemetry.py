@@ -0,0 +1,81 @@
+"""
+Benchmark: costo de la instrumentación (spans y trazas) en la ruta rápida
+
+Mide cuánto cuesta un span vacío (con y sin traza activa) y el throughput de
+chat() por la ruta rápida (router -> herramienta, sin LLM), que es donde el
+costo fijo de la instrumentación pesa más en proporción. Al final imprime un
+extracto de la exportación Prometheus.
+
+Uso:
+    python benchmarks/bench_telemetry.py --seconds 2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MENSAJES = [
+    "prestamo 50000 18 24",
+    "clima en cancun",
+    "convierte 100 usd a mxn",
+    "ahorro 1000 3.5 12",
+]
+
+
+def por_segundo(funcion, segundos: float) -> float:
+    funcion()
+    n = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        funcion()
+        n += 1
+    return n / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    from fake_rag import FakeBankingRAG
+    from intelligent_agent import BankingIntelligentAgent
+    from telemetry import Telemetry
+
+    telemetria = Telemetry()
+
+    def span_suelto():
+        with telemetria.span("bench"):
+            pass
+
+    with telemetria.traza("bench"):
+        tasa_traza = por_segundo(span_suelto, args.seconds)
+    tasa_suelta = por_segundo(span_suelto, args.seconds)
+    print(f"span sin traza:  {1e6 / tasa_suelta:>6.2f} µs")
+    print(f"span con traza:  {1e6 / tasa_traza:>6.2f} µs")
+
+    agente = BankingIntelligentAgent(FakeBankingRAG(modelo_mb=1, carga_s=0))
+    i = iter(range(10 ** 12))
+
+    def chat():
+        agente.chat(MENSAJES[next(i) % len(MENSAJES)])
+
+    def sin_traza():
+        agente._responder(MENSAJES[next(i) % len(MENSAJES)])
+
+    # Sin traza siguen corriendo los spans de herramienta; es el piso alcanzable
+    t_sin, t_con = por_segundo(sin_traza, args.seconds), por_segundo(chat, args.seconds)
+    print(f"\nruta rápida sin traza: {t_sin:>10,.0f} msgs/s ({1e6 / t_sin:.1f} µs)")
+    print(f"ruta rápida con traza: {t_con:>10,.0f} msgs/s ({1e6 / t_con:.1f} µs)")
+
+    print("\n" + "\n".join(
+        linea for linea in agente.telemetria.exportar_prometheus().splitlines()
+        if 'quantile="0.5"' in linea
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: rerun de Streamlit con historiales largos (burbuja por mensaje vs bloque + cola)
+
+Ejecuta con streamlit.testing.v1.AppTest solo la parte de historial de la
+UI de intelligent_agent, con sesiones de N mensajes (respuestas reales de
+las herramientas: préstamos, listas de estudiantes, clima, conversiones,
+ayuda). Compara el bucle anterior (una burbuja st.chat_message +
+st.markdown por mensaje) con rendering.HistorialRenderizado (mensajes
+anteriores a la cola en un solo expander, UI_HISTORY_TAIL burbujas).
+Mide la duración del rerun y los elementos emitidos; cada rerun agrega un
+mensaje, como una conversación real. AppTest incluye la ejecución del
+script y la serialización de elementos, no el pintado en el navegador.
+
+Uso:
+    python benchmarks/bench_ui_rerun.py --messages 100,500 --reruns 20
+    UI_HISTORY_TAIL=20 python benchmarks/bench_ui_rerun.py --messages 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CABECERA = f"import sys\nsys.path.insert(0, {RAIZ!r})\nimport streamlit as st\n"
+
+SCRIPT_BURBUJAS = CABECERA + """
+for message in st.session_state.agent_messages:
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+"""
+
+SCRIPT_BLOQUE = CABECERA + """
+from rendering import HistorialRenderizado
+if "historial_render" not in st.session_state:
+    st.session_state.historial_render = HistorialRenderizado()
+anteriores, n_anteriores, recientes = st.session_state.historial_render.actualizar(st.session_state.agent_messages)
+if n_anteriores:
+    with st.expander(f"{n_anteriores} mensajes anteriores"):
+        st.markdown(anteriores)
+for message in recientes:
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+"""
+
+
+def conversacion(total: int):
+    """Pares pregunta/respuesta con las salidas reales de las herramientas"""
+    from banking_tools import CurrencyConverterTool, FinancialCalculatorTool, WeatherTool
+    from rendering import INFO_AYUDA, SALUDO, renderizar_lista_estudiantes
+
+    calculadora, clima, conversor = FinancialCalculatorTool(), WeatherTool(), CurrencyConverterTool()
+    estudiantes = [{"id": i, "nombres": f"Nombre{i}", "apellidos": "Pérez", "email": f"e{i}@myrlux.mx",
+                    "telefono": "555-0100"} for i in range(10)]
+    turnos = (
+        lambda i: (f"prestamo {50000 + i} 16 30", calculadora._run(f"prestamo {50000 + i} 16 30")),
+        lambda i: ("Muestra todos los estudiantes", renderizar_lista_estudiantes(estudiantes, 40)),
+        lambda i: ("¿Cuál es el clima en Monterrey?", clima._run("monterrey")),
+        lambda i: (f"Convierte {i} USD a MXN", conversor._run(f"{i} USD a MXN")),
+        lambda i: ("¿Qué puedes hacer?", INFO_AYUDA),
+    )
+    mensajes = [{"role": "assistant", "content": SALUDO}]
+    i = 0
+    while len(mensajes) < total:
+        pregunta, respuesta = turnos[i % len(turnos)](i)
+        mensajes += [{"role": "user", "content": pregunta}, {"role": "assistant", "content": respuesta}]
+        i += 1
+    return mensajes[:total]
+
+
+def medir(script: str, mensajes, reruns: int):
+    app = AppTest.from_string(script, default_timeout=60)
+    app.session_state["agent_messages"] = list(mensajes)
+    app.run()  # primer render (y construcción del bloque) fuera de la medición
+    tiempos = []
+    for i in range(reruns):
+        app.session_state["agent_messages"].append({"role": "user" if i % 2 else "assistant",
+                                                    "content": f"Mensaje nuevo {i}"})
+        inicio = time.perf_counter()
+        app.run()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    elementos = len(list(app.main))
+    return statistics.median(tiempos), max(tiempos), elementos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", default="100,500", help="mensajes en el historial por corrida")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'mensajes':>8} {'render':<9} {'p50 ms':>8} {'máx ms':>8} {'elementos':>9}")
+    for total in (int(m) for m in args.messages.split(",")):
+        mensajes = conversacion(total)
+        for nombre, script in (("burbujas", SCRIPT_BURBUJAS), ("bloque", SCRIPT_BLOQUE)):
+            p50, maximo, elementos = medir(script, mensajes, args.reruns)
+            print(f"{total if nombre == 'burbujas' else '':>8} {nombre:<9} {p50:>8.1f} {maximo:>8.1f} "
+                  f"{elementos:>9}")
+
+
+if __name__ == "__main__":
+    main()
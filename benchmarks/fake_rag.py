@@ -0,0 +1,105 @@
+"""
+Sistema RAG falso para benchmarks
+Imita el costo de BankingRAGConfigurable: carga de modelo (RAM + tiempo), embeddings y latencia de consulta
+"""
+
+import contextlib
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# Sin Weaviate ni DeepSeek reales: que el monitor de salud no abra sus circuitos
+os.environ.setdefault("HEALTH_MONITOR", "false")
+
+
+class FakeBankingRAG:
+    """Misma interfaz que BankingRAGConfigurable (rag_query, query_deepseek, embed_query).
+
+    modelo_mb: RAM residente que ocupa el "modelo de embeddings"
+    carga_s: tiempo de inicialización (descarga/carga del modelo, cliente Weaviate)
+    latencia_s: tiempo de cada rag_query / query_deepseek
+    latencia_embed_s: tiempo de cada embed_query (pasada del encoder)
+    costo_item_lote: fracción de la latencia que añade cada elemento extra de un lote
+        (embed_documents, query_deepseek_batch, rag_query_batch), como en un modelo en GPU
+    serializar: una sola pasada del modelo a la vez (una GPU / Ollama con NUM_PARALLEL=1)
+    """
+
+    def __init__(self, modelo_mb: float = 90.0, carga_s: float = 1.0, latencia_s: float = 0.0,
+                 dimension: int = 384, latencia_embed_s: float = 0.0, costo_item_lote: float = 0.1,
+                 serializar: bool = False):
+        time.sleep(carga_s)
+        filas = max(1, int(modelo_mb * 1024 * 1024 / 4 / dimension))
+        # Pesos materializados (no solo reservados) para que cuenten en el RSS
+        self.pesos = np.random.default_rng(0).standard_normal((filas, dimension), dtype=np.float32)
+        self.dimension = dimension
+        self.latencia_s = latencia_s
+        self.latencia_embed_s = latencia_embed_s
+        self.costo_item_lote = costo_item_lote
+        self.consultas = 0
+        self.llamadas_modelo = 0
+        self._modelo = threading.Lock() if serializar else contextlib.nullcontext()
+
+    def _pasada(self, latencia: float, elementos: int = 1):
+        with self._modelo:
+            self.llamadas_modelo += 1
+            time.sleep(latencia * (1 + self.costo_item_lote * (elementos - 1)))
+
+    def embed_query(self, texto: str) -> list:
+        if self.latencia_embed_s:
+            self._pasada(self.latencia_embed_s)
+        return self._vector(texto)
+
+    def _vector(self, texto: str) -> list:
+        semilla = int.from_bytes(hashlib.blake2b(texto.encode(), digest_size=8).digest(), "little")
+        vector = self.pesos[semilla % len(self.pesos)]
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def rag_query(self, pregunta: str, k: int = 3) -> dict:
+        self.consultas += 1
+        self._pasada(self.latencia_s)
+        return {"response": f"Respuesta simulada para: {pregunta}", "sources": list(range(k))}
+
+    def query_deepseek(self, prompt: str) -> str:
+        self._pasada(self.latencia_s)
+        return "Thought: Do I need to use a tool? No\nAI: Respuesta simulada."
+
+    # ---- versiones por lotes: una pasada del modelo para todo el lote ----
+
+    def embed_documents(self, textos: list) -> list:
+        if self.latencia_embed_s:
+            self._pasada(self.latencia_embed_s, len(textos))
+        return [self._vector(t) for t in textos]
+
+    def rag_query_batch(self, preguntas: list, k: int = 3) -> list:
+        self.consultas += len(preguntas)
+        self._pasada(self.latencia_s, len(preguntas))
+        return [{"response": f"Respuesta simulada para: {p}", "sources": list(range(k))} for p in preguntas]
+
+    def query_deepseek_batch(self, prompts: list) -> list:
+        self._pasada(self.latencia_s, len(prompts))
+        return ["Thought: Do I need to use a tool? No\nAI: Respuesta simulada."] * len(prompts)
+
+
+# ---- encoder para ingestion_pipeline: función de módulo, importable desde los procesos del pool ----
+
+_proyeccion = None
+# Palabras sin signos ni mayúsculas, como separa un tokenizador real ("17?" y "17" son el mismo término)
+_PALABRA = re.compile(r"\w+")
+
+
+def embedder_lote(textos: list, dimension: int = 384, cubetas: int = 4096) -> np.ndarray:
+    """Embeddings deterministas con costo de CPU real: bolsa de palabras hasheada x proyección aleatoria"""
+    global _proyeccion
+    if _proyeccion is None:
+        _proyeccion = np.random.default_rng(0).standard_normal((cubetas, dimension), dtype=np.float32)
+    conteos = np.zeros((len(textos), cubetas), dtype=np.float32)
+    for fila, texto in enumerate(textos):
+        for palabra in _PALABRA.findall(texto.lower()):
+            conteos[fila, zlib.crc32(palabra.encode()) % cubetas] += 1
+    vectores = conteos @ _proyeccion
+    return vectores / np.maximum(np.linalg.norm(vectores, axis=1, keepdims=True), 1e-9)
@@ -0,0 +1,101 @@
+"""
+Servidor stub de MyrluxBack para benchmarks
+Responde /api/home, /api/lista/alumno y /api/obtener/alumno/{id} con datos sintéticos
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict
+from urllib.parse import parse_qs
+
+
+def generar_estudiantes(total: int) -> List[Dict]:
+    """Genera registros de estudiantes con la forma que devuelve MyrluxBack"""
+    return [
+        {
+            "id": i,
+            "nombres": f"Nombre{i}",
+            "apellidos": f"Apellido{i}",
+            "email": f"alumno{i}@myrlux.mx",
+            "telefono": f"55{i:08d}",
+            "direccion": f"Calle {i}, CDMX",
+        }
+        for i in range(1, total + 1)
+    ]
+
+
+class _MyrluxHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 para que los clientes puedan mantener la conexión abierta
+    protocol_version = "HTTP/1.1"
+    # Sin Nagle: cabeceras y cuerpo van en escrituras separadas y el ACK retrasado
+    # añadiría ~40 ms a cada respuesta sobre una conexión keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, status: int, cuerpo: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        try:
+            self.wfile.write(cuerpo)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El cliente cerró antes de tiempo (p. ej. al leer solo las primeras filas)
+
+    def do_GET(self):
+        server = self.server
+        ruta, _, query = self.path.partition("?")
+        params = parse_qs(query)
+        if ruta == "/api/home":
+            self._responder(200, b'{"status": "ok"}')
+        elif ruta == "/api/lista/alumno":
+            if server.pageable and "size" in params:
+                pagina = int(params.get("page", ["0"])[0])
+                tamano = int(params["size"][0])
+                contenido = server.estudiantes[pagina * tamano:(pagina + 1) * tamano]
+                cuerpo = {"content": contenido, "totalElements": len(server.estudiantes)}
+                self._responder(200, json.dumps(cuerpo).encode())
+            else:
+                self._responder(200, server.lista_json)
+        elif ruta.startswith("/api/obtener/alumno/"):
+            try:
+                student_id = int(ruta.rsplit("/", 1)[1])
+            except ValueError:
+                self._responder(400, b'{"error": "id"}')
+                return
+            if 1 <= student_id <= len(server.estudiantes):
+                self._responder(200, json.dumps(server.estudiantes[student_id - 1]).encode())
+            else:
+                self._responder(404, b'{"error": "not found"}')
+        else:
+            self._responder(404, b'{"error": "not found"}')
+
+
+class StubMyrluxServer:
+    """MyrluxBack falso en un hilo de fondo (usar como context manager)"""
+
+    def __init__(self, total_estudiantes: int = 100, host: str = "127.0.0.1", port: int = 0,
+                 pageable: bool = False):
+        self.httpd = ThreadingHTTPServer((host, port), _MyrluxHandler)
+        self.httpd.daemon_threads = True
+        # pageable=True imita un endpoint Spring con Pageable (content/totalElements)
+        self.httpd.pageable = pageable
+        self.httpd.estudiantes = generar_estudiantes(total_estudiantes)
+        self.httpd.lista_json = json.dumps(self.httpd.estudiantes).encode()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def __enter__(self) -> "StubMyrluxServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
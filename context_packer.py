@@ -0,0 +1,156 @@
+"""
+Compresión del contexto RAG antes de construir el prompt de DeepSeek
+Une fragmentos solapados, descarta frases repetidas y conserva las frases relevantes a la pregunta dentro de un presupuesto de tokens
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from lexical_index import tokenizar
+from semantic_cache import normalizar_pregunta
+
+# Tokens máximos del bloque de contexto (~4 caracteres por token); 0 desactiva la compresión.
+# Solo la aplica LocalRetriever.rag_query: por Weaviate el prompt lo arma el sistema RAG externo
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "400"))
+
+_FIN_FRASE = re.compile(r"(?<=[.!?;])\s+|\n+")
+# Solape mínimo (caracteres) para considerar que dos fragmentos contiguos se pisan
+_SOLAPE_MINIMO = 20
+
+
+def estimar_tokens(texto: str) -> int:
+    """Misma aproximación que conversation_memory, sin importar LangChain"""
+    return len(texto) // 4 + 1
+
+
+@dataclass
+class ContextoEmpaquetado:
+    texto: str
+    tokens_originales: int
+    tokens: int
+    frases: int
+    frases_descartadas: int
+
+    @property
+    def tokens_ahorrados(self) -> int:
+        return self.tokens_originales - self.tokens
+
+# ============================================================================
+# 1. DEDUPLICACIÓN
+# ============================================================================
+
+
+def _solape(anterior: str, siguiente: str) -> int:
+    """Largo del sufijo de `anterior` con el que empieza `siguiente` (solape de fragmentar)"""
+    sonda = siguiente[:_SOLAPE_MINIMO]
+    if len(sonda) < _SOLAPE_MINIMO:
+        return 0
+    posicion = anterior.find(sonda)
+    while posicion != -1:
+        if siguiente.startswith(anterior[posicion:]):
+            return len(anterior) - posicion
+        posicion = anterior.find(sonda, posicion + 1)
+    return 0
+
+
+def unir_fragmentos(fragmentos: Sequence[Dict[str, Any]]) -> List[Tuple[str, int, str]]:
+    """(fuente, rango de recuperación, texto) con los fragmentos contiguos de una fuente unidos sin el solape"""
+    por_fuente: Dict[str, List[Tuple[int, int, str]]] = {}
+    for rango, f in enumerate(fragmentos):
+        por_fuente.setdefault(f["source"], []).append((f.get("chunk_index", 0), rango, f["content"]))
+    bloques = []
+    for fuente, partes in por_fuente.items():
+        partes.sort()
+        indice, rango, texto = partes[0]
+        for siguiente_indice, siguiente_rango, siguiente in partes[1:]:
+            if siguiente_indice == indice + 1:
+                solape = _solape(texto, siguiente)
+                texto += siguiente[solape:] if solape else " " + siguiente
+                rango = min(rango, siguiente_rango)
+            else:
+                bloques.append((fuente, rango, texto))
+                rango, texto = siguiente_rango, siguiente
+            indice = siguiente_indice
+        bloques.append((fuente, rango, texto))
+    return sorted(bloques, key=lambda b: b[1])
+
+# ============================================================================
+# 2. SELECCIÓN DE FRASES
+# ============================================================================
+
+
+def empaquetar_contexto(pregunta: str, fragmentos: Sequence[Dict[str, Any]], presupuesto: int = RAG_CONTEXT_TOKENS,
+                        contar_tokens: Callable[[str], int] = estimar_tokens) -> ContextoEmpaquetado:
+    """Contexto '[fuente]\\nfrases...' que cabe en `presupuesto` tokens.
+
+    Si después de quitar solapes y frases repetidas el contexto ya cabe, se
+    envía completo. Si no, cada frase puntúa por los términos de la pregunta
+    que contiene (ponderados por su rareza entre las frases recuperadas) más
+    un desempate por el rango del fragmento, y se eligen las mejores hasta
+    llenar el presupuesto, conservando el orden original dentro de cada fuente.
+    """
+    originales = "\n\n".join(f"[{f['source']}]\n{f['content']}" for f in fragmentos)
+    tokens_originales = contar_tokens(originales) if fragmentos else 0
+    if presupuesto <= 0:
+        return ContextoEmpaquetado(originales, tokens_originales, tokens_originales, len(fragmentos), 0)
+
+    frases: List[Tuple[int, str, str]] = []  # (rango, fuente, frase)
+    vistas = set()
+    for fuente, rango, texto in unir_fragmentos(fragmentos):
+        for frase in _FIN_FRASE.split(texto):
+            frase = frase.strip()
+            clave = normalizar_pregunta(frase)
+            if clave and clave not in vistas:
+                vistas.add(clave)
+                frases.append((rango, fuente, frase))
+    total_frases = sum(1 for f in fragmentos for frase in _FIN_FRASE.split(f["content"]) if frase.strip())
+
+    elegidas = list(range(len(frases)))
+    texto = _formatear(frases, elegidas)
+    if contar_tokens(texto) > presupuesto:
+        # Siempre se vuelve a formatear: aunque queden todas las frases, _seleccionar pudo recortar una
+        elegidas = _seleccionar(pregunta, frases, presupuesto, contar_tokens)
+        texto = _formatear(frases, elegidas)
+    return ContextoEmpaquetado(texto=texto, tokens_originales=tokens_originales,
+                               tokens=contar_tokens(texto) if texto else 0, frases=len(elegidas),
+                               frases_descartadas=max(0, total_frases - len(elegidas)))
+
+
+def _seleccionar(pregunta: str, frases: List[Tuple[int, str, str]], presupuesto: int,
+                 contar_tokens: Callable[[str], int]) -> List[int]:
+    terminos = set(tokenizar(pregunta))
+    tokens_frases = [set(tokenizar(frase)) for _, _, frase in frases]
+    df = {t: sum(t in tf for tf in tokens_frases) for t in terminos}
+    idf = {t: math.log1p(len(frases) / df[t]) for t in terminos if df[t]}
+    puntajes = [sum(idf.get(t, 0.0) for t in tf & terminos) + 0.1 / (1 + rango)
+                for (rango, _, _), tf in zip(frases, tokens_frases)]
+
+    # Se cuenta el texto que escribe _formatear (una cabecera por bloque, espacios y saltos entre
+    # frases): sumar costos por frase se queda corto y el contexto se pasaba del presupuesto
+    elegidas: List[int] = []
+    for i in sorted(range(len(frases)), key=lambda i: -puntajes[i]):
+        candidata = sorted(elegidas + [i])
+        if contar_tokens(_formatear(frases, candidata)) <= presupuesto:
+            elegidas = candidata
+    if not elegidas and frases:
+        # Ni la mejor frase cabe: se recorta en vez de enviar un contexto vacío
+        mejor = max(range(len(frases)), key=lambda i: puntajes[i])
+        rango, fuente, frase = frases[mejor]
+        cabecera = f"[{fuente}]\n"
+        recorte = frase[:max(1, presupuesto * 4 - len(cabecera))]
+        while len(recorte) > 1 and contar_tokens(cabecera + recorte.rstrip() + "…") > presupuesto:
+            recorte = recorte[:-max(1, len(recorte) // 8)]
+        frases[mejor] = (rango, fuente, recorte.rstrip() + "…")
+        elegidas.append(mejor)
+    return sorted(elegidas)
+
+
+def _formatear(frases: List[Tuple[int, str, str]], elegidas: Sequence[int]) -> str:
+    bloques: Dict[Tuple[int, str], List[str]] = {}
+    for i in elegidas:
+        rango, fuente, frase = frases[i]
+        bloques.setdefault((rango, fuente), []).append(frase)
+    return "\n\n".join(f"[{fuente}]\n" + " ".join(partes) for (_, fuente), partes in bloques.items())
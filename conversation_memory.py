@@ -0,0 +1,230 @@
+"""
+Memoria conversacional acotada
+Ventana deslizante con presupuesto de tokens + resumen incremental de los turnos que salen de ella
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.memory import BaseMemory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.pydantic_v1 import Field
+
+# Presupuestos por sesión (tokens estimados)
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "1200"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+# Tokens desalojados que se acumulan antes de llamar al resumidor LLM
+MEMORY_SUMMARY_BATCH = int(os.getenv("MEMORY_SUMMARY_BATCH", "400"))
+
+# ============================================================================
+# 1. CONTEO Y RESUMEN
+# ============================================================================
+
+
+def estimar_tokens(texto: str) -> int:
+    """Aproximación barata (~4 caracteres por token), suficiente para presupuestar"""
+    return len(texto) // 4 + 1
+
+
+def _recortar(texto: str, max_tokens: int) -> str:
+    limite = max_tokens * 4
+    return texto if len(texto) <= limite else texto[:limite].rstrip() + "…"
+
+
+def _primera_frase(texto: str, max_chars: int = 160) -> str:
+    linea = next((l.strip() for l in texto.splitlines() if l.strip()), "")
+    for fin in (". ", "? ", "! "):
+        if fin in linea:
+            linea = linea[:linea.index(fin) + 1]
+            break
+    return linea if len(linea) <= max_chars else linea[:max_chars].rstrip() + "…"
+
+
+def resumen_extractivo(resumen: str, mensajes: List[BaseMessage], max_tokens: int) -> str:
+    """Agrega una línea por mensaje desalojado y descarta las más viejas si excede el tope.
+
+    No llama al LLM: el costo es proporcional a lo desalojado, no a la sesión.
+    """
+    lineas = resumen.splitlines() if resumen else []
+    for mensaje in mensajes:
+        rol = "Usuario" if mensaje.type == "human" else "Asistente"
+        frase = _primera_frase(mensaje.content)
+        if frase:
+            lineas.append(f"- {rol}: {frase}")
+    total = sum(estimar_tokens(l) for l in lineas)
+    inicio = 0
+    while total > max_tokens and inicio < len(lineas):
+        total -= estimar_tokens(lineas[inicio])
+        inicio += 1
+    return "\n".join(lineas[inicio:])
+
+
+def resumidor_llm(llm_call: Callable[[str], str]) -> Callable[[str, List[BaseMessage], int], str]:
+    """Resumidor que extiende el resumen previo con DeepSeek (llm_call(prompt) -> str)"""
+
+    def resumir(resumen: str, mensajes: List[BaseMessage], max_tokens: int) -> str:
+        nuevas = get_buffer_string(mensajes, human_prefix="Usuario", ai_prefix="Asistente")
+        prompt = (
+            "Actualiza el resumen de la conversación con las nuevas líneas. "
+            f"Conserva datos concretos (montos, IDs, ciudades) y usa menos de {max_tokens * 3 // 4} palabras.\n\n"
+            f"Resumen actual:\n{resumen or '(vacío)'}\n\nNuevas líneas:\n{nuevas}\n\nNuevo resumen:"
+        )
+        return _recortar(llm_call(prompt).strip(), max_tokens)
+
+    return resumir
+
+# ============================================================================
+# 2. MEMORIA ACOTADA
+# ============================================================================
+
+
+class BoundedSummaryMemory(BaseMemory):
+    """Reemplazo de ConversationBufferMemory con tamaño de prompt constante.
+
+    Los turnos recientes se guardan completos mientras quepan en max_tokens;
+    los que salen de la ventana se pliegan a un resumen de a lo más
+    max_tokens_resumen. El conteo se mantiene incrementalmente, así que guardar
+    y cargar cuesta lo mismo en el turno 5 que en el 500. Hereda de la
+    BaseMemory de langchain_core para no importar el paquete langchain.memory.
+    """
+
+    mensajes: List[BaseMessage] = Field(default_factory=list)
+    input_key: Optional[str] = None
+    output_key: Optional[str] = None
+    return_messages: bool = False
+    human_prefix: str = "Human"
+    ai_prefix: str = "AI"
+    memory_key: str = "chat_history"
+    max_tokens: int = MEMORY_MAX_TOKENS
+    max_tokens_resumen: int = MEMORY_SUMMARY_TOKENS
+    lote_resumen: int = MEMORY_SUMMARY_BATCH
+    resumidor: Optional[Callable[[str, List[BaseMessage], int], str]] = None
+    contar_tokens: Callable[[str], int] = estimar_tokens
+    resumen: str = ""
+    tokens_mensajes: List[int] = Field(default_factory=list)
+    tokens_ventana: int = 0
+    pendientes: List[BaseMessage] = Field(default_factory=list)
+    tokens_pendientes: int = 0
+    turnos_resumidos: int = 0
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def resumen_vigente(self) -> str:
+        """Resumen más los turnos desalojados que aún esperan al resumidor LLM"""
+        if not self.pendientes:
+            return self.resumen
+        return resumen_extractivo(self.resumen, self.pendientes, self.max_tokens_resumen)
+
+    @property
+    def buffer_as_messages(self) -> List[BaseMessage]:
+        mensajes = list(self.mensajes)
+        resumen = self.resumen_vigente
+        if resumen:
+            mensajes.insert(0, SystemMessage(content=f"Resumen de la conversación previa:\n{resumen}"))
+        return mensajes
+
+    @property
+    def buffer_as_str(self) -> str:
+        ventana = get_buffer_string(
+            self.mensajes, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix
+        )
+        resumen = self.resumen_vigente
+        if not resumen:
+            return ventana
+        return f"Resumen de la conversación previa:\n{resumen}\n\n{ventana}"
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return {self.memory_key: self.buffer_as_messages if self.return_messages else self.buffer_as_str}
+
+    def _entrada_salida(self, inputs: Dict[str, Any], outputs: Dict[str, str]):
+        clave_entrada = self.input_key or next(
+            k for k in inputs if k not in (self.memory_key, "stop")
+        )
+        clave_salida = self.output_key or next(iter(outputs))
+        return inputs[clave_entrada], outputs[clave_salida]
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        input_str, output_str = self._entrada_salida(inputs, outputs)
+        # Un solo mensaje enorme (p. ej. un listado) no puede ocupar toda la ventana
+        tope_mensaje = max(1, self.max_tokens // 2)
+        for texto, clase in ((input_str, HumanMessage), (output_str, AIMessage)):
+            texto = _recortar(texto, tope_mensaje)
+            self.mensajes.append(clase(content=texto))
+            tokens = self.contar_tokens(texto)
+            self.tokens_mensajes.append(tokens)
+            self.tokens_ventana += tokens
+        self._podar()
+
+    def _podar(self):
+        mensajes = self.mensajes
+        # Desaloja turnos completos (pregunta + respuesta), conservando siempre el último
+        desalojar = 0
+        while self.tokens_ventana > self.max_tokens and len(mensajes) - desalojar > 2:
+            for _ in range(2):
+                self.tokens_ventana -= self.tokens_mensajes[desalojar]
+                desalojar += 1
+        if not desalojar:
+            return
+        salientes = mensajes[:desalojar]
+        del mensajes[:desalojar]
+        del self.tokens_mensajes[:desalojar]
+        self.turnos_resumidos += desalojar // 2
+        self.pendientes.extend(salientes)
+        self.tokens_pendientes += sum(self.contar_tokens(m.content) for m in salientes)
+        self._resumir_pendientes()
+
+    def _resumir_pendientes(self):
+        if not self.pendientes:
+            return
+        if self.resumidor is None:
+            self.resumen = resumen_extractivo(self.resumen, self.pendientes, self.max_tokens_resumen)
+        elif self.tokens_pendientes >= self.lote_resumen:
+            try:
+                self.resumen = self.resumidor(self.resumen, self.pendientes, self.max_tokens_resumen)
+            except Exception:
+                # Sin LLM disponible el resumen no se pierde: se degrada a extractivo
+                self.resumen = resumen_extractivo(self.resumen, self.pendientes, self.max_tokens_resumen)
+        else:
+            return
+        self.pendientes = []
+        self.tokens_pendientes = 0
+
+    def clear(self) -> None:
+        self.mensajes = []
+        self.resumen = ""
+        self.tokens_mensajes = []
+        self.tokens_ventana = 0
+        self.pendientes = []
+        self.tokens_pendientes = 0
+        self.turnos_resumidos = 0
+
+    def exportar_estado(self) -> Dict[str, Any]:
+        """Lo necesario para reanudar la memoria en otro proceso (ver conversation_store)"""
+        def roles(mensajes: List[BaseMessage]) -> List[Tuple[str, str]]:
+            return [("u" if isinstance(m, HumanMessage) else "a", m.content) for m in mensajes]
+        return {"resumen": self.resumen, "turnos_resumidos": self.turnos_resumidos,
+                "mensajes": roles(self.mensajes), "pendientes": roles(self.pendientes)}
+
+    def restaurar_estado(self, estado: Dict[str, Any]) -> None:
+        """Inverso de exportar_estado; los conteos de tokens se recalculan"""
+        def mensajes(pares: List[Tuple[str, str]]) -> List[BaseMessage]:
+            return [HumanMessage(content=texto) if rol == "u" else AIMessage(content=texto) for rol, texto in pares]
+        self.clear()
+        self.resumen = estado["resumen"]
+        self.turnos_resumidos = estado["turnos_resumidos"]
+        self.mensajes = mensajes(estado["mensajes"])
+        self.tokens_mensajes = [self.contar_tokens(m.content) for m in self.mensajes]
+        self.tokens_ventana = sum(self.tokens_mensajes)
+        self.pendientes = mensajes(estado["pendientes"])
+        self.tokens_pendientes = sum(self.contar_tokens(m.content) for m in self.pendientes)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "mensajes_ventana": len(self.mensajes),
+            "tokens_ventana": self.tokens_ventana,
+            "tokens_resumen": self.contar_tokens(self.resumen) if self.resumen else 0,
+            "turnos_resumidos": self.turnos_resumidos,
+        }
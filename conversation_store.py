@@ -0,0 +1,282 @@
+"""
+Almacén persistente de conversaciones por sesión
+SQLite embebido (WAL, compartible entre procesos) con mensajes en binario compacto, lectura por páginas y expiración de sesiones inactivas
+"""
+
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Archivo SQLite de las conversaciones; vacío desactiva la persistencia
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "")
+# Segundos sin actividad tras los que una sesión se borra del disco
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", str(7 * 24 * 3600)))
+# Mensajes por página al reanudar una sesión
+CONVERSATION_PAGE = int(os.getenv("CONVERSATION_PAGE", "40"))
+# Segundos mínimos entre barridos de sesiones expiradas
+CONVERSATION_SWEEP = float(os.getenv("CONVERSATION_SWEEP", "60"))
+
+# Textos más cortos no se comprimen (zlib no gana y cuesta CPU)
+_MIN_COMPRIMIR = 200
+_ROLES = {"u": "user", "a": "assistant"}
+
+# ============================================================================
+# 1. SERIALIZACIÓN COMPACTA
+# ============================================================================
+# Texto:  1 byte de formato (0 = UTF-8, 1 = zlib, 2 = zlib con diccionario) + cuerpo
+# Lista:  por cada texto, su largo en varint + bytes; el conjunto pasa por _comprimir
+#
+# Las respuestas de las herramientas salen de unas pocas plantillas: con ellas
+# como diccionario precargado de zlib, un cálculo de préstamo de 170 bytes
+# ocupa 68. El diccionario se guarda en la propia base al crearla, así que
+# cambiar las plantillas después no impide leer lo ya guardado.
+
+
+def diccionario_inicial() -> bytes:
+    """Plantillas y textos fijos de rendering; zlib usa a lo más los últimos 32 KB"""
+    from rendering import INFO_AYUDA, INFO_SISTEMA, PLANTILLAS, SALUDO
+
+    return "\n".join([INFO_SISTEMA, INFO_AYUDA, SALUDO, *PLANTILLAS.values()]).encode("utf-8")[-32768:]
+
+
+def _comprimir(datos: bytes, diccionario: bytes = b"") -> bytes:
+    if len(datos) >= _MIN_COMPRIMIR or diccionario:
+        compresor = zlib.compressobj(6, zdict=diccionario) if diccionario else zlib.compressobj(6)
+        comprimido = compresor.compress(datos) + compresor.flush()
+        if len(comprimido) < len(datos):
+            return (b"\x02" if diccionario else b"\x01") + comprimido
+    return b"\x00" + datos
+
+
+def _descomprimir(blob: bytes, diccionario: bytes = b"") -> bytes:
+    formato = blob[:1]
+    if formato == b"\x02":
+        return zlib.decompressobj(zdict=diccionario).decompress(blob[1:])
+    return zlib.decompress(blob[1:]) if formato == b"\x01" else bytes(blob[1:])
+
+
+def codificar_texto(texto: str, diccionario: bytes = b"") -> bytes:
+    return _comprimir(texto.encode("utf-8"), diccionario)
+
+
+def decodificar_texto(blob: bytes, diccionario: bytes = b"") -> str:
+    return _descomprimir(blob, diccionario).decode("utf-8")
+
+
+def _varint(n: int) -> bytes:
+    salida = bytearray()
+    while n >= 0x80:
+        salida.append((n & 0x7F) | 0x80)
+        n >>= 7
+    salida.append(n)
+    return bytes(salida)
+
+
+def codificar_textos(textos: Sequence[str], diccionario: bytes = b"") -> bytes:
+    partes = []
+    for texto in textos:
+        datos = texto.encode("utf-8")
+        partes.append(_varint(len(datos)))
+        partes.append(datos)
+    return _comprimir(b"".join(partes), diccionario)
+
+
+def decodificar_textos(blob: bytes, diccionario: bytes = b"") -> List[str]:
+    datos = _descomprimir(blob, diccionario)
+    textos, i = [], 0
+    while i < len(datos):
+        largo = desplazamiento = 0
+        while True:
+            byte = datos[i]
+            i += 1
+            largo |= (byte & 0x7F) << desplazamiento
+            desplazamiento += 7
+            if byte < 0x80:
+                break
+        textos.append(datos[i:i + largo].decode("utf-8"))
+        i += largo
+    return textos
+
+
+def codificar_memoria(estado: Dict[str, Any], diccionario: bytes = b"") -> bytes:
+    """Estado de BoundedSummaryMemory.exportar_estado() -> blob"""
+    ventana, pendientes = estado["mensajes"], estado["pendientes"]
+    roles = "".join(rol for rol, _ in ventana), "".join(rol for rol, _ in pendientes)
+    return codificar_textos([estado["resumen"], str(estado["turnos_resumidos"]), *roles,
+                             *(texto for _, texto in ventana), *(texto for _, texto in pendientes)], diccionario)
+
+
+def decodificar_memoria(blob: bytes, diccionario: bytes = b"") -> Dict[str, Any]:
+    resumen, turnos, roles_ventana, roles_pendientes, *textos = decodificar_textos(blob, diccionario)
+    corte = len(roles_ventana)
+    return {"resumen": resumen, "turnos_resumidos": int(turnos),
+            "mensajes": list(zip(roles_ventana, textos[:corte])),
+            "pendientes": list(zip(roles_pendientes, textos[corte:]))}
+
+# ============================================================================
+# 2. ALMACÉN
+# ============================================================================
+
+
+class ConversationStore:
+    """Historial y memoria de cada sesión en SQLite.
+
+    Cada turno es una transacción (los dos mensajes + el estado de la memoria
+    del agente), así que cualquier proceso que abra el mismo archivo puede
+    reanudar la sesión donde quedó. En modo WAL los lectores no bloquean al
+    escritor. Las sesiones sin actividad en `ttl` segundos se borran en un
+    barrido perezoso, a lo más cada CONVERSATION_SWEEP segundos.
+    """
+
+    def __init__(self, ruta: str, ttl: float = CONVERSATION_TTL, pagina: int = CONVERSATION_PAGE):
+        self.ruta = ruta
+        self.ttl = ttl
+        self.tam_pagina = pagina
+        self._lock = threading.Lock()
+        self._ultimo_barrido = 0.0
+        self._conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conexion.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS sesiones (
+                session_id TEXT PRIMARY KEY,
+                creada REAL NOT NULL,
+                actualizada REAL NOT NULL,
+                mensajes INTEGER NOT NULL DEFAULT 0,
+                memoria BLOB
+            );
+            CREATE INDEX IF NOT EXISTS sesiones_actualizada ON sesiones(actualizada);
+            CREATE TABLE IF NOT EXISTS mensajes (
+                session_id TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                rol TEXT NOT NULL,
+                contenido BLOB NOT NULL,
+                PRIMARY KEY (session_id, n)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor BLOB NOT NULL);
+        """)
+        with self._transaccion() as c:
+            c.execute("INSERT OR IGNORE INTO meta (clave, valor) VALUES ('diccionario', ?)",
+                      (diccionario_inicial(),))
+            self.diccionario = bytes(c.execute("SELECT valor FROM meta WHERE clave = 'diccionario'").fetchone()[0])
+
+    @contextlib.contextmanager
+    def _transaccion(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura; BEGIN IMMEDIATE serializa a los escritores de todos los procesos"""
+        with self._lock:
+            c = self._conexion
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+
+    def agregar_turno(self, session_id: str, pregunta: str, respuesta: str,
+                      memoria: Optional[Dict[str, Any]] = None):
+        """Guarda pregunta + respuesta (y el estado de la memoria) en una sola transacción"""
+        ahora = time.time()
+        blob = codificar_memoria(memoria, self.diccionario) if memoria is not None else None
+        filas = [codificar_texto(pregunta, self.diccionario), codificar_texto(respuesta, self.diccionario)]
+        with self._transaccion() as c:
+            fila = c.execute("SELECT mensajes FROM sesiones WHERE session_id = ?", (session_id,)).fetchone()
+            n = fila[0] if fila else 0
+            if fila is None:
+                c.execute("INSERT INTO sesiones (session_id, creada, actualizada) VALUES (?, ?, ?)",
+                          (session_id, ahora, ahora))
+            c.executemany("INSERT INTO mensajes (session_id, n, rol, contenido) VALUES (?, ?, ?, ?)",
+                          [(session_id, n, "u", filas[0]), (session_id, n + 1, "a", filas[1])])
+            c.execute("UPDATE sesiones SET actualizada = ?, mensajes = ?, memoria = COALESCE(?, memoria) "
+                      "WHERE session_id = ?", (ahora, n + 2, blob, session_id))
+        self._barrer_si_toca(ahora)
+
+    def pagina(self, session_id: str, antes: Optional[int] = None,
+               limite: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        """(mensajes en orden, índice del primero) de los `limite` anteriores a `antes` (por defecto, los últimos)"""
+        limite = limite or self.tam_pagina
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT n, rol, contenido FROM mensajes WHERE session_id = ? AND n < ? ORDER BY n DESC LIMIT ?",
+                (session_id, antes if antes is not None else 1 << 62, limite),
+            ).fetchall()
+        filas.reverse()
+        mensajes = [{"role": _ROLES[rol], "content": decodificar_texto(contenido, self.diccionario)} for _, rol, contenido in filas]
+        return mensajes, filas[0][0] if filas else 0
+
+    def cargar_memoria(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Estado de la memoria del agente (None si la sesión no existe o expiró)"""
+        with self._lock:
+            fila = self._conexion.execute("SELECT memoria, actualizada FROM sesiones WHERE session_id = ?",
+                                          (session_id,)).fetchone()
+        if fila is None or fila[0] is None or time.time() - fila[1] > self.ttl:
+            return None
+        return decodificar_memoria(fila[0], self.diccionario)
+
+    def existe(self, session_id: str) -> bool:
+        with self._lock:
+            return self._conexion.execute("SELECT 1 FROM sesiones WHERE session_id = ?",
+                                          (session_id,)).fetchone() is not None
+
+    def borrar(self, session_id: str) -> bool:
+        with self._transaccion() as c:
+            c.execute("DELETE FROM mensajes WHERE session_id = ?", (session_id,))
+            borradas = c.execute("DELETE FROM sesiones WHERE session_id = ?", (session_id,)).rowcount
+        return borradas > 0
+
+    def expirar(self, ahora: Optional[float] = None) -> int:
+        """Borra las sesiones inactivas más de `ttl` segundos; devuelve cuántas"""
+        limite = (ahora if ahora is not None else time.time()) - self.ttl
+        with self._transaccion() as c:
+            c.execute("DELETE FROM mensajes WHERE session_id IN "
+                      "(SELECT session_id FROM sesiones WHERE actualizada < ?)", (limite,))
+            borradas = c.execute("DELETE FROM sesiones WHERE actualizada < ?", (limite,)).rowcount
+        return borradas
+
+    def _barrer_si_toca(self, ahora: float):
+        if ahora - self._ultimo_barrido < CONVERSATION_SWEEP:
+            return
+        self._ultimo_barrido = ahora
+        try:
+            borradas = self.expirar(ahora)
+            if borradas:
+                logger.info("Sesiones expiradas borradas: %d", borradas)
+        except sqlite3.OperationalError as e:
+            # Otro proceso tiene el archivo ocupado: el siguiente barrido lo intenta de nuevo
+            logger.debug("Barrido de sesiones pospuesto: %s", e)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            sesiones, mensajes = self._conexion.execute(
+                "SELECT COUNT(*), COALESCE(SUM(mensajes), 0) FROM sesiones").fetchone()
+        return {"sesiones": sesiones, "mensajes": mensajes,
+                "bytes": os.path.getsize(self.ruta) if os.path.exists(self.ruta) else 0}
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> Optional[ConversationStore]:
+    """Almacén del proceso (None si CONVERSATION_STORE no está configurado)"""
+    global _store
+    if not CONVERSATION_STORE:
+        return None
+    with _store_lock:
+        if _store is None:
+            directorio = os.path.dirname(CONVERSATION_STORE)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            _store = ConversationStore(CONVERSATION_STORE)
+        return _store
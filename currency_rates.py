@@ -0,0 +1,231 @@
+"""
+Almacén de tasas de cambio
+Snapshots inmutables con todas las tasas cruzadas precalculadas y recarga atómica desde JSON/CSV
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Par = Tuple[str, str]
+
+# Tasas simuladas por defecto (en producción se cargan desde CURRENCY_RATES_FILE)
+TASAS_POR_DEFECTO: Dict[Par, float] = {
+    ("USD", "MXN"): 18.50,
+    ("MXN", "USD"): 0.054,
+    ("EUR", "MXN"): 20.20,
+    ("MXN", "EUR"): 0.049,
+    ("USD", "EUR"): 0.92,
+    ("EUR", "USD"): 1.09,
+}
+
+# ============================================================================
+# 1. SNAPSHOT INMUTABLE
+# ============================================================================
+
+class RateSnapshot:
+    """Conjunto de tasas con el grafo de monedas resuelto de antemano.
+
+    Al construirse recorre cada componente conexa del grafo (BFS) y expresa
+    cada moneda en unidades de una moneda pivote; con eso todas las tasas
+    cruzadas quedan en un dict y convertir es una búsqueda O(1). Las
+    cotizaciones directas (o su inversa) tienen prioridad sobre las trianguladas.
+    """
+
+    def __init__(self, tasas: Dict[Par, float], fuente: str = "default",
+                 actualizado: Optional[datetime] = None):
+        self.fuente = fuente
+        self.actualizado = actualizado or datetime.now()
+        self.directas: Dict[Par, float] = {}
+        for (origen, destino), tasa in tasas.items():
+            origen, destino, tasa = origen.upper(), destino.upper(), float(tasa)
+            if tasa <= 0:
+                raise ValueError(f"Tasa no positiva para {origen}/{destino}: {tasa}")
+            self.directas[(origen, destino)] = tasa
+        self.monedas = frozenset(m for par in self.directas for m in par)
+        self.tasas, self.cruzadas = self._precalcular()
+
+    def _precalcular(self) -> Tuple[Dict[Par, float], frozenset]:
+        vecinos: Dict[str, list] = {m: [] for m in self.monedas}
+        for (origen, destino), tasa in self.directas.items():
+            vecinos[origen].append((destino, tasa))
+            vecinos[destino].append((origen, 1 / tasa))
+
+        tasas: Dict[Par, float] = {}
+        cruzadas = set()
+        visitadas = set()
+        for pivote in sorted(self.monedas):
+            if pivote in visitadas:
+                continue
+            # valor[m] = unidades de pivote por 1 m
+            valor = {pivote: 1.0}
+            cola = deque([pivote])
+            while cola:
+                actual = cola.popleft()
+                for vecina, tasa in vecinos[actual]:
+                    if vecina not in valor:
+                        # 1 actual = tasa vecina  ->  1 vecina = valor[actual] / tasa pivote
+                        valor[vecina] = valor[actual] / tasa
+                        cola.append(vecina)
+            visitadas.update(valor)
+            for origen, valor_origen in valor.items():
+                for destino, valor_destino in valor.items():
+                    if origen == destino:
+                        continue
+                    par = (origen, destino)
+                    if par in self.directas:
+                        tasas[par] = self.directas[par]
+                    elif (destino, origen) in self.directas:
+                        tasas[par] = 1 / self.directas[(destino, origen)]
+                    else:
+                        tasas[par] = valor_origen / valor_destino
+                        cruzadas.add(par)
+        return tasas, frozenset(cruzadas)
+
+    def tasa(self, origen: str, destino: str) -> Optional[float]:
+        if origen == destino:
+            return 1.0 if origen in self.monedas else None
+        return self.tasas.get((origen, destino))
+
+    def es_cruzada(self, origen: str, destino: str) -> bool:
+        return (origen, destino) in self.cruzadas
+
+# ============================================================================
+# 2. CARGA DESDE ARCHIVOS
+# ============================================================================
+
+def _pares_desde_json(datos) -> Dict[Par, float]:
+    """Acepta {"base": "USD", "rates": {"MXN": 18.5}}, {"pairs": [{"from", "to", "rate"}]}
+    o {"USD/MXN": 18.5}"""
+    if isinstance(datos, dict) and "rates" in datos and "base" in datos:
+        base = datos["base"]
+        return {(base, moneda): tasa for moneda, tasa in datos["rates"].items() if moneda != base}
+    if isinstance(datos, dict) and "pairs" in datos:
+        datos = datos["pairs"]
+    if isinstance(datos, list):
+        return _pares_desde_filas(datos)
+    return {tuple(par.split("/")): tasa for par, tasa in datos.items()}
+
+
+def _pares_desde_filas(filas: Iterable[dict]) -> Dict[Par, float]:
+    pares = {}
+    for fila in filas:
+        origen = fila.get("from") or fila.get("origen")
+        destino = fila.get("to") or fila.get("destino")
+        tasa = fila.get("rate") or fila.get("tasa")
+        pares[(origen.strip(), destino.strip())] = float(tasa)
+    return pares
+
+
+def cargar_snapshot(ruta: str) -> RateSnapshot:
+    """Lee un archivo de tasas (.json o .csv con columnas from,to,rate / origen,destino,tasa)"""
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        if ruta.lower().endswith(".csv"):
+            pares = _pares_desde_filas(csv.DictReader(archivo))
+        else:
+            pares = _pares_desde_json(json.load(archivo))
+    actualizado = datetime.fromtimestamp(os.path.getmtime(ruta))
+    return RateSnapshot(pares, fuente=ruta, actualizado=actualizado)
+
+# ============================================================================
+# 3. ALMACÉN CON INTERCAMBIO ATÓMICO
+# ============================================================================
+
+class RateStore:
+    """Mantiene el snapshot vigente; las recargas construyen uno nuevo aparte
+    y lo publican con una sola asignación, así las conversiones nunca esperan."""
+
+    def __init__(self, snapshot: Optional[RateSnapshot] = None, ruta: Optional[str] = None):
+        self._snapshot = snapshot or RateSnapshot(TASAS_POR_DEFECTO)
+        self.ruta = ruta
+        self._mtime: Optional[float] = None
+        self._recarga_lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> RateSnapshot:
+        return self._snapshot
+
+    def convertir(self, cantidad: float, origen: str, destino: str) -> Optional[Tuple[float, float, bool]]:
+        """(monto convertido, tasa, es_cruzada) o None si no hay ruta entre monedas"""
+        snapshot = self._snapshot
+        tasa = snapshot.tasa(origen, destino)
+        if tasa is None:
+            return None
+        return cantidad * tasa, tasa, snapshot.es_cruzada(origen, destino)
+
+    def load_file(self, ruta: Optional[str] = None) -> RateSnapshot:
+        """Carga un archivo de tasas y lo publica atómicamente"""
+        ruta = ruta or self.ruta
+        with self._recarga_lock:
+            snapshot = cargar_snapshot(ruta)
+            self.ruta = ruta
+            self._mtime = os.path.getmtime(ruta)
+            self._snapshot = snapshot
+        logger.info("Tasas cargadas desde %s (%d monedas)", ruta, len(snapshot.monedas))
+        return snapshot
+
+    def refresh_if_changed(self) -> bool:
+        """Recarga si el archivo cambió desde la última carga"""
+        if not self.ruta:
+            return False
+        try:
+            mtime = os.path.getmtime(self.ruta)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self.load_file(self.ruta)
+        return True
+
+    def start_auto_refresh(self, intervalo: float = 60.0):
+        """Revisa el archivo en un hilo de fondo cada `intervalo` segundos"""
+        if self._hilo is not None:
+            return
+
+        def revisar():
+            while not self._detener.wait(intervalo):
+                try:
+                    self.refresh_if_changed()
+                except Exception as e:
+                    # Un archivo a medio escribir no debe tumbar las tasas vigentes
+                    logger.warning("No se pudieron recargar tasas: %s", e)
+
+        self._hilo = threading.Thread(target=revisar, name="rate-store-refresh", daemon=True)
+        self._hilo.start()
+
+    def stop_auto_refresh(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        self._detener.clear()
+
+
+_store: Optional[RateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_rate_store() -> RateStore:
+    """Almacén compartido del proceso (CURRENCY_RATES_FILE si está configurado)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            ruta = os.getenv("CURRENCY_RATES_FILE")
+            store = RateStore(ruta=ruta)
+            if ruta:
+                try:
+                    store.load_file(ruta)
+                except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                    logger.warning("Usando tasas por defecto; no se pudo leer %s: %s", ruta, e)
+                store.start_auto_refresh(float(os.getenv("CURRENCY_RATES_REFRESH", "60")))
+            _store = store
+        return _store
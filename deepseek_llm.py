@@ -0,0 +1,191 @@
+"""
+Wrapper LangChain para DeepSeek con salida en streaming
+Usa el sistema RAG existente y, si está configurado, el endpoint de streaming de Ollama
+"""
+
+import contextlib
+import json
+import os
+import queue
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from telemetry import get_telemetry
+
+DEEPSEEK_DIRECT_URL = os.getenv("DEEPSEEK_DIRECT_URL", "http://localhost:11434")
+# Con DEEPSEEK_MODEL definido se hace streaming directo contra Ollama (/api/generate)
+DEEPSEEK_MODEL = os.getenv("DEEPSEEK_MODEL")
+DEEPSEEK_STREAM_TIMEOUT = float(os.getenv("DEEPSEEK_STREAM_TIMEOUT", "120"))
+
+
+def _stream_ollama(prompt: str) -> Iterator[str]:
+    """Tokens de Ollama en NDJSON: {"response": "...", "done": false}"""
+    cuerpo = {"model": DEEPSEEK_MODEL, "prompt": prompt, "stream": True}
+    timeout = httpx.Timeout(DEEPSEEK_STREAM_TIMEOUT, connect=5.0)
+    with httpx.stream("POST", f"{DEEPSEEK_DIRECT_URL}/api/generate", json=cuerpo, timeout=timeout) as response:
+        response.raise_for_status()
+        for linea in response.iter_lines():
+            if not linea:
+                continue
+            evento = json.loads(linea)
+            if evento.get("response"):
+                yield evento["response"]
+            if evento.get("done"):
+                break
+
+
+def stream_deepseek(rag_system, prompt: str) -> Iterator[str]:
+    """Fragmentos de la respuesta de DeepSeek conforme se generan.
+
+    Orden de preferencia: query_deepseek_stream del sistema RAG, streaming
+    directo de Ollama (DEEPSEEK_MODEL) y, si no hay ninguno, la respuesta
+    completa de query_deepseek como un solo fragmento. Los streams ocupan
+    un cupo de RAG_MAX_CONCURRENCY (SharedRAGSystem.acceso) mientras duran,
+    igual que query_deepseek.
+    """
+    propio = getattr(rag_system, "query_deepseek_stream", None)
+    if not callable(propio) and not DEEPSEEK_MODEL:
+        # query_deepseek ya pasa por el semáforo de SharedRAGSystem
+        yield rag_system.query_deepseek(prompt)
+        return
+    acceso = getattr(rag_system, "acceso", None)
+    with acceso if acceso is not None else contextlib.nullcontext():
+        if callable(propio):
+            yield from propio(prompt)
+        else:
+            yield from _stream_ollama(prompt)
+
+
+class _CortadorStop:
+    """Corta el stream en la primera secuencia de stop, aunque llegue partida en varios tokens"""
+
+    def __init__(self, stop: Optional[List[str]]):
+        self.stop = [s for s in (stop or []) if s]
+        self.reserva = max((len(s) for s in self.stop), default=1) - 1
+        self.pendiente = ""
+        self.terminado = False
+
+    def agregar(self, texto: str) -> str:
+        if not self.stop:
+            return texto
+        self.pendiente += texto
+        cortes = [self.pendiente.find(s) for s in self.stop if s in self.pendiente]
+        if cortes:
+            self.terminado = True
+            salida, self.pendiente = self.pendiente[:min(cortes)], ""
+            return salida
+        # Retiene solo el final que podría ser el comienzo de una secuencia de stop
+        limite = len(self.pendiente)
+        for largo in range(min(self.reserva, len(self.pendiente)), 0, -1):
+            sufijo = self.pendiente[-largo:]
+            if any(s.startswith(sufijo) for s in self.stop):
+                limite -= largo
+                break
+        salida, self.pendiente = self.pendiente[:limite], self.pendiente[limite:]
+        return salida
+
+    def cerrar(self) -> str:
+        salida, self.pendiente = self.pendiente, ""
+        return salida
+
+
+class DeepSeekLLM(LLM):
+    """LLM de LangChain respaldado por tu DeepSeek existente.
+
+    Con streaming=True, _call consume el stream y reporta cada token a los
+    callbacks (on_llm_new_token), así el agente puede mostrar la respuesta
+    final mientras se genera.
+    """
+
+    rag_system: Any
+    streaming: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "deepseek-rag"
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        with get_telemetry().span("llm.deepseek", prompt_chars=len(prompt)) as span:
+            cortador = _CortadorStop(stop)
+            for fragmento in stream_deepseek(self.rag_system, prompt):
+                if "ttft" not in span.atributos:
+                    span.atributos["ttft"] = span.transcurrido()
+                texto = cortador.agregar(fragmento)
+                if texto:
+                    if run_manager:
+                        run_manager.on_llm_new_token(texto)
+                    yield GenerationChunk(text=texto)
+                if cortador.terminado:
+                    return
+            resto = cortador.cerrar()
+            if resto:
+                if run_manager:
+                    run_manager.on_llm_new_token(resto)
+                yield GenerationChunk(text=resto)
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        try:
+            if self.streaming:
+                return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+            # Usar tu sistema DeepSeek existente
+            cortador = _CortadorStop(stop)
+            with get_telemetry().span("llm.deepseek", prompt_chars=len(prompt)):
+                texto = cortador.agregar(self.rag_system.query_deepseek(prompt))
+            return texto + ("" if cortador.terminado else cortador.cerrar())
+        except Exception as e:
+            return f"Error en LLM: {str(e)}"
+
+
+class FinalAnswerStreamHandler(BaseCallbackHandler):
+    """Publica en una cola solo los tokens de la respuesta final del agente.
+
+    El agente conversacional ReAct escribe primero su razonamiento
+    ("Thought: ...", "Action: ...") y la respuesta al usuario tras el
+    prefijo "AI:"; lo anterior al prefijo nunca llega a la interfaz.
+    """
+
+    def __init__(self, cola: "queue.Queue", prefijo: str = "AI:"):
+        self.cola = cola
+        self.prefijo = prefijo
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.buffer = ""
+        self.emitiendo = False
+        self.al_inicio = True
+
+    def _publicar(self, texto: str):
+        if self.al_inicio:
+            texto = texto.lstrip()
+            self.al_inicio = not texto
+        if texto:
+            self.cola.put(texto)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        self._reiniciar()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.emitiendo:
+            self._publicar(token)
+            return
+        self.buffer += token
+        posicion = self.buffer.find(self.prefijo)
+        if posicion >= 0:
+            self.emitiendo = True
+            self._publicar(self.buffer[posicion + len(self.prefijo):])
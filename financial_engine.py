@@ -0,0 +1,126 @@
+"""
+Motor de cálculo financiero vectorizado
+Evalúa arreglos de escenarios (monto × tasa × plazo) en una sola pasada de NumPy
+"""
+
+from typing import Dict
+
+import numpy as np
+
+# ============================================================================
+# 1. FÓRMULAS VECTORIZADAS (aceptan escalares o arreglos con broadcasting)
+# ============================================================================
+
+
+def _tasa_mensual(tasa_anual) -> np.ndarray:
+    return np.asarray(tasa_anual, dtype=np.float64) / 100.0 / 12.0
+
+
+def _factor_anualidad(tasa, periodos) -> np.ndarray:
+    """((1 + r)^n - 1) / r, con límite n cuando r == 0"""
+    tasa, periodos = np.broadcast_arrays(np.asarray(tasa, dtype=np.float64),
+                                         np.asarray(periodos, dtype=np.float64))
+    crecimiento = np.expm1(periodos * np.log1p(tasa))
+    sin_tasa = tasa == 0
+    return np.where(sin_tasa, periodos, crecimiento / np.where(sin_tasa, 1.0, tasa))
+
+
+def pago_mensual(monto, tasa_anual, meses) -> np.ndarray:
+    """Pago fijo mensual de un préstamo (sistema francés)"""
+    tasa = _tasa_mensual(tasa_anual)
+    meses = np.asarray(meses, dtype=np.float64)
+    factor = _factor_anualidad(tasa, meses)
+    # P * r * g^n / (g^n - 1) == P / factor + P * r
+    return np.asarray(monto, dtype=np.float64) * (1.0 / factor + tasa)
+
+
+def calcular_prestamo(monto, tasa_anual, meses) -> Dict[str, np.ndarray]:
+    """Pago mensual, total pagado e intereses para cada escenario"""
+    monto = np.asarray(monto, dtype=np.float64)
+    pago = pago_mensual(monto, tasa_anual, meses)
+    total = pago * np.asarray(meses, dtype=np.float64)
+    return {"pago_mensual": pago, "total_pagado": total, "intereses": total - monto}
+
+
+def calcular_ahorro(deposito_mensual, tasa_anual, meses) -> Dict[str, np.ndarray]:
+    """Valor futuro de depósitos mensuales al final de cada mes"""
+    deposito = np.asarray(deposito_mensual, dtype=np.float64)
+    meses = np.asarray(meses, dtype=np.float64)
+    valor_futuro = deposito * _factor_anualidad(_tasa_mensual(tasa_anual), meses)
+    total_depositado = deposito * meses
+    return {
+        "valor_futuro": valor_futuro,
+        "total_depositado": total_depositado,
+        "ganancias": valor_futuro - total_depositado,
+    }
+
+
+def calcular_interes(capital, tasa_anual, anios) -> Dict[str, np.ndarray]:
+    """Interés simple y compuesto anual"""
+    capital = np.asarray(capital, dtype=np.float64)
+    tasa = np.asarray(tasa_anual, dtype=np.float64) / 100.0
+    anios = np.asarray(anios, dtype=np.float64)
+    simple = capital * tasa * anios
+    compuesto = capital * np.expm1(anios * np.log1p(tasa))
+    return {"interes_simple": simple, "interes_compuesto": compuesto}
+
+# ============================================================================
+# 2. TABLAS DE AMORTIZACIÓN Y GRILLAS DE ESCENARIOS
+# ============================================================================
+
+
+def tabla_amortizacion(monto, tasa_anual, meses) -> Dict[str, np.ndarray]:
+    """Tablas de amortización de varios préstamos sin ciclos de Python.
+
+    Devuelve matrices (escenarios, max_meses); los periodos posteriores al plazo
+    de cada escenario quedan en cero. El saldo tras k pagos es
+    P·g^k − pago·(g^k − 1)/r, así que todas las filas salen de un broadcast.
+    """
+    monto, tasa_anual, meses = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(monto, dtype=np.float64)),
+        np.atleast_1d(np.asarray(tasa_anual, dtype=np.float64)),
+        np.atleast_1d(np.asarray(meses, dtype=np.int64)),
+    )
+    tasa = _tasa_mensual(tasa_anual)[:, None]
+    pago = pago_mensual(monto, tasa_anual, meses)[:, None]
+    max_meses = int(meses.max()) if meses.size else 0
+    periodos = np.arange(max_meses + 1, dtype=np.float64)[None, :]
+
+    # saldo_k = P·g^k − pago·(g^k − 1)/r  ==  (P − pago/r)·g^k + pago/r   (r == 0: P − pago·k)
+    sin_tasa = tasa == 0
+    cociente = np.where(sin_tasa, 0.0, pago / np.where(sin_tasa, 1.0, tasa))
+    saldo = np.exp(periodos * np.log1p(tasa))
+    saldo *= monto[:, None] - cociente
+    saldo += cociente
+    if sin_tasa.any():
+        filas = sin_tasa[:, 0]
+        saldo[filas] = monto[filas, None] - pago[filas] * periodos
+    saldo[periodos > meses[:, None]] = 0.0
+    saldo[np.arange(len(meses)), meses] = 0.0    # Elimina el residuo de redondeo final
+
+    activo = periodos[:, 1:] <= meses[:, None]
+    interes = saldo[:, :-1] * tasa
+    abono_capital = saldo[:, :-1] - saldo[:, 1:]
+    pago_periodo = np.where(activo, pago, 0.0)
+    return {
+        "periodo": np.arange(1, max_meses + 1),
+        "pago": pago_periodo,
+        "interes": interes,
+        "capital": abono_capital,
+        "saldo": saldo[:, 1:],
+    }
+
+
+def grilla_escenarios(montos, tasas_anuales, plazos) -> Dict[str, np.ndarray]:
+    """Evalúa todas las combinaciones monto × tasa × plazo en una pasada"""
+    monto, tasa, plazo = (
+        arr.ravel() for arr in np.meshgrid(
+            np.asarray(montos, dtype=np.float64),
+            np.asarray(tasas_anuales, dtype=np.float64),
+            np.asarray(plazos, dtype=np.int64),
+            indexing="ij",
+        )
+    )
+    resultado = calcular_prestamo(monto, tasa, plazo)
+    resultado.update({"monto": monto, "tasa_anual": tasa, "meses": plazo})
+    return resultado
@@ -0,0 +1,260 @@
+"""
+Monitor de salud de dependencias
+Sondea MyrluxBack, Weaviate y DeepSeek en segundo plano, con backoff exponencial y circuit breaker
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+import httpx
+
+from myrlux_client import MYRLUX_BASE_URL
+
+logger = logging.getLogger(__name__)
+
+WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "http://localhost:11004")
+# Fallback DEEPSEEK_DIRECT (Ollama) que usa el RAG si la API no responde; vacío = sin fallback
+DEEPSEEK_DIRECT_URL = os.getenv("DEEPSEEK_DIRECT_URL", "http://localhost:11434")
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "15"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+# Fallos consecutivos que abren el circuito y backoff de los reintentos
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "2"))
+HEALTH_BACKOFF_BASE = float(os.getenv("HEALTH_BACKOFF_BASE", "5"))
+HEALTH_BACKOFF_MAX = float(os.getenv("HEALTH_BACKOFF_MAX", "120"))
+
+# ============================================================================
+# 1. ESTADO POR DEPENDENCIA
+# ============================================================================
+
+OK, CAIDO, DESCONOCIDO = "ok", "caido", "desconocido"
+CERRADO, ABIERTO, SEMIABIERTO = "cerrado", "abierto", "semiabierto"
+
+
+@dataclass(frozen=True)
+class HealthStatus:
+    """Foto inmutable del estado de una dependencia; se reemplaza, nunca se modifica"""
+    nombre: str
+    estado: str = DESCONOCIDO
+    circuito: str = CERRADO
+    fallos_consecutivos: int = 0
+    latencia: Optional[float] = None
+    detalle: str = ""
+    ultimo_chequeo: Optional[float] = None   # time.time()
+    proximo_chequeo: float = 0.0             # time.monotonic()
+
+    def reintento_en(self) -> float:
+        return max(0.0, self.proximo_chequeo - time.monotonic())
+
+    def etiqueta(self) -> str:
+        """Texto corto para el panel de estado"""
+        if self.estado == OK:
+            return f"✅ Conectado ({self.latencia * 1000:.0f} ms)" if self.latencia is not None else "✅ Conectado"
+        if self.estado == CAIDO:
+            return f"❌ Desconectado · reintento en {self.reintento_en():.0f}s"
+        return "⏳ Verificando..."
+
+
+class DependencyUnavailable(Exception):
+    """La dependencia tiene el circuito abierto: se falla sin intentar la llamada"""
+
+    def __init__(self, estado: HealthStatus):
+        super().__init__(f"{estado.nombre} no disponible ({estado.detalle})")
+        self.estado = estado
+
+# ============================================================================
+# 2. SONDAS HTTP
+# ============================================================================
+
+
+def sonda_http(*urls: str, timeout: float = HEALTH_PROBE_TIMEOUT) -> Callable[[], str]:
+    """Sonda que pasa si alguna URL responde 2xx (en orden, como health_check.sh)"""
+
+    def sondear() -> str:
+        ultimo_error = ""
+        for url in urls:
+            try:
+                response = httpx.get(url, timeout=timeout)
+                if response.is_success:
+                    return url
+                ultimo_error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                ultimo_error = type(e).__name__
+        raise ConnectionError(ultimo_error or "sin respuesta")
+
+    return sondear
+
+# ============================================================================
+# 3. MONITOR CON CIRCUIT BREAKER
+# ============================================================================
+
+
+class HealthMonitor:
+    """Mantiene el estado cacheado de cada dependencia.
+
+    Un hilo de fondo ejecuta las sondas cuando les toca; la interfaz solo lee
+    snapshot() y las herramientas consultan verificar() antes de llamar. Tras
+    `umbral` fallos seguidos el circuito se abre y las llamadas fallan al
+    instante; los reintentos se espacian con backoff exponencial (con jitter)
+    y el primero que pasa vuelve a cerrarlo. Las herramientas también reportan
+    sus propios éxitos y fallos, así que una caída se detecta sin esperar a la
+    siguiente sonda.
+    """
+
+    def __init__(self, intervalo: float = HEALTH_CHECK_INTERVAL, umbral: int = HEALTH_FAILURE_THRESHOLD,
+                 backoff_base: float = HEALTH_BACKOFF_BASE, backoff_max: float = HEALTH_BACKOFF_MAX):
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sondas: Dict[str, Callable[[], object]] = {}
+        self._estados: Dict[str, HealthStatus] = {}
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def registrar(self, nombre: str, sonda: Callable[[], object]):
+        with self._lock:
+            self._sondas[nombre] = sonda
+            self._estados.setdefault(nombre, HealthStatus(nombre))
+        self._despertar.set()
+
+    # ---- lectura (sin E/S) ----
+
+    def estado(self, nombre: str) -> Optional[HealthStatus]:
+        return self._estados.get(nombre)
+
+    def snapshot(self) -> Dict[str, HealthStatus]:
+        return dict(self._estados)
+
+    def disponible(self, nombre: str) -> bool:
+        estado = self._estados.get(nombre)
+        return estado is None or estado.circuito == CERRADO
+
+    def verificar(self, *nombres: str):
+        """Lanza DependencyUnavailable si alguna dependencia no tiene el circuito cerrado"""
+        for nombre in nombres:
+            estado = self._estados.get(nombre)
+            if estado is not None and estado.circuito != CERRADO:
+                raise DependencyUnavailable(estado)
+
+    # ---- actualización ----
+
+    def _backoff(self, fallos: int) -> float:
+        espera = min(self.backoff_max, self.backoff_base * 2 ** max(0, fallos - self.umbral))
+        return espera * random.uniform(0.8, 1.2)
+
+    def registrar_exito(self, nombre: str, latencia: Optional[float] = None, detalle: str = "OK"):
+        with self._lock:
+            previo = self._estados.get(nombre, HealthStatus(nombre))
+            self._estados[nombre] = replace(
+                previo, estado=OK, circuito=CERRADO, fallos_consecutivos=0, latencia=latencia,
+                detalle=detalle, ultimo_chequeo=time.time(),
+                proximo_chequeo=time.monotonic() + self.intervalo,
+            )
+        if previo.estado == CAIDO:
+            logger.info("%s recuperado", nombre)
+
+    def registrar_fallo(self, nombre: str, detalle: str):
+        with self._lock:
+            previo = self._estados.get(nombre, HealthStatus(nombre))
+            fallos = previo.fallos_consecutivos + 1
+            abierto = fallos >= self.umbral
+            self._estados[nombre] = replace(
+                previo, estado=CAIDO, circuito=ABIERTO if abierto else previo.circuito,
+                fallos_consecutivos=fallos, latencia=None, detalle=detalle, ultimo_chequeo=time.time(),
+                proximo_chequeo=time.monotonic() + (self._backoff(fallos) if abierto else min(
+                    self.intervalo, self.backoff_base)),
+            )
+        if abierto and previo.circuito == CERRADO:
+            logger.warning("Circuito abierto para %s tras %d fallos: %s", nombre, fallos, detalle)
+
+    def sondear(self, nombre: str) -> HealthStatus:
+        """Ejecuta la sonda de una dependencia ahora mismo (bloquea hasta su timeout)"""
+        sonda = self._sondas[nombre]
+        with self._lock:
+            previo = self._estados[nombre]
+            if previo.circuito == ABIERTO:
+                # Una sola llamada de prueba; las herramientas siguen fallando rápido
+                self._estados[nombre] = replace(previo, circuito=SEMIABIERTO)
+        inicio = time.perf_counter()
+        try:
+            sonda()
+        except Exception as e:
+            self.registrar_fallo(nombre, str(e) or type(e).__name__)
+        else:
+            self.registrar_exito(nombre, latencia=time.perf_counter() - inicio)
+        return self._estados[nombre]
+
+    # ---- hilo de fondo ----
+
+    def _pendientes(self) -> Sequence[str]:
+        ahora = time.monotonic()
+        return [n for n, e in self._estados.items() if n in self._sondas and e.proximo_chequeo <= ahora]
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            for nombre in self._pendientes():
+                try:
+                    self.sondear(nombre)
+                except Exception:
+                    logger.exception("Sonda de %s falló inesperadamente", nombre)
+            proximos = [e.proximo_chequeo for e in self._estados.values()] or [time.monotonic() + self.intervalo]
+            espera = max(0.05, min(proximos) - time.monotonic())
+            self._despertar.wait(espera)
+            self._despertar.clear()
+
+    def start(self):
+        if self._hilo is not None:
+            return
+        self._hilo = threading.Thread(target=self._ciclo, name="health-monitor", daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        self._detener.clear()
+
+
+def sondas_por_defecto() -> Dict[str, Callable[[], object]]:
+    # "deepseek" es la generación del RAG: cae solo si no responden ni la API ni el fallback (deploy.sh)
+    deepseek = [f"{DEEPSEEK_API_URL}/api/actuator/health", f"{DEEPSEEK_API_URL}/health"]
+    if DEEPSEEK_DIRECT_URL:
+        deepseek.append(f"{DEEPSEEK_DIRECT_URL}/api/tags")
+    return {
+        "myrlux": sonda_http(f"{MYRLUX_BASE_URL}/home"),
+        "weaviate": sonda_http(f"{WEAVIATE_URL}/v1/.well-known/ready"),
+        "deepseek": sonda_http(*deepseek),
+    }
+
+
+_monitor: Optional[HealthMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor(dependencias: Optional[Iterable[str]] = None) -> HealthMonitor:
+    """Monitor compartido del proceso; arranca su hilo de sondeo en el primer uso.
+
+    HEALTH_MONITOR=false deja el monitor sin sondas (todo se considera disponible).
+    """
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            monitor = HealthMonitor()
+            if os.getenv("HEALTH_MONITOR", "true").lower() == "true":
+                sondas = sondas_por_defecto()
+                for nombre in dependencias or sondas:
+                    monitor.registrar(nombre, sondas[nombre])
+                monitor.start()
+            _monitor = monitor
+        return _monitor
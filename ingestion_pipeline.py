@@ -0,0 +1,486 @@
+"""
+Ingesta incremental del corpus RAG
+Fragmenta -> embebe en procesos paralelos -> sube a Weaviate por lotes; un manifiesto sha256 evita reprocesar archivos sin cambios
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
+BANKING_CLASS_NAME = os.getenv("BANKING_CLASS_NAME", "BankingDocument")
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+# Fragmentos por tarea de embedding, objetos por petición batch a Weaviate y lotes en vuelo por etapa
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+INGEST_UPSERT_BATCH = int(os.getenv("INGEST_UPSERT_BATCH", "200"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+INGEST_MANIFEST = os.getenv("INGEST_MANIFEST", ".ingest_manifest.json")
+
+EXTENSIONES = (".txt", ".md")
+
+# ============================================================================
+# 1. FRAGMENTACIÓN
+# ============================================================================
+
+
+@dataclass(frozen=True)
+class Fragmento:
+    id: str
+    fuente: str
+    indice: int
+    texto: str
+    sha256: str      # del archivo completo
+
+
+def id_fragmento(fuente: str, indice: int) -> str:
+    """ID determinista: reingestar un archivo sobrescribe sus fragmentos en vez de duplicarlos"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{fuente}#{indice}"))
+
+
+def fragmentar(texto: str, tamano: int = RAG_CHUNK_SIZE, solape: int = RAG_CHUNK_OVERLAP) -> List[str]:
+    """Ventanas de ~tamano caracteres con `solape`, cortando en el último espacio de cada ventana"""
+    texto = " ".join(texto.split())
+    if len(texto) <= tamano:
+        return [texto] if texto else []
+    fragmentos = []
+    inicio = 0
+    while inicio < len(texto):
+        fin = min(len(texto), inicio + tamano)
+        if fin < len(texto):
+            corte = texto.rfind(" ", inicio + tamano // 2, fin)
+            fin = corte if corte > 0 else fin
+        fragmentos.append(texto[inicio:fin])
+        if fin >= len(texto):
+            break
+        inicio = max(fin - solape, inicio + 1)
+    return fragmentos
+
+# ============================================================================
+# 2. MANIFIESTO
+# ============================================================================
+
+
+class Manifest:
+    """ruta relativa -> sha256, tamaño, mtime y número de fragmentos subidos.
+
+    (tamaño, mtime) descarta sin leer los archivos que no se tocaron; el
+    sha256 decide si un archivo tocado cambió de verdad. Se guarda de forma
+    atómica (archivo temporal + os.replace).
+    """
+
+    VERSION = 1
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.archivos: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(ruta):
+            with open(ruta, encoding="utf-8") as f:
+                datos = json.load(f)
+            if datos.get("version") == self.VERSION:
+                self.archivos = datos["archivos"]
+        self._lock = threading.Lock()
+
+    def get(self, fuente: str) -> Optional[Dict[str, Any]]:
+        return self.archivos.get(fuente)
+
+    def registrar(self, fuente: str, sha256: str, tamano: int, mtime_ns: int, fragmentos: int):
+        with self._lock:
+            self.archivos[fuente] = {"sha256": sha256, "tamano": tamano, "mtime_ns": mtime_ns,
+                                     "fragmentos": fragmentos}
+
+    def quitar(self, fuente: str):
+        with self._lock:
+            self.archivos.pop(fuente, None)
+
+    def guardar(self):
+        with self._lock:
+            datos = json.dumps({"version": self.VERSION, "archivos": self.archivos}, ensure_ascii=False)
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(datos)
+        os.replace(temporal, self.ruta)
+
+# ============================================================================
+# 3. EMBEDDINGS EN PROCESOS
+# ============================================================================
+
+
+def cargar_embedder(spec: str) -> Callable[[List[str]], np.ndarray]:
+    """'sentence-transformers[:modelo]' o 'modulo:funcion' (lista de textos -> matriz)"""
+    if spec.startswith("sentence-transformers"):
+        from sentence_transformers import SentenceTransformer
+
+        _, _, nombre = spec.partition(":")
+        modelo = SentenceTransformer(nombre or EMBEDDING_MODEL)
+        return lambda textos: modelo.encode(textos, batch_size=len(textos), normalize_embeddings=True,
+                                            convert_to_numpy=True, show_progress_bar=False)
+    modulo, _, funcion = spec.partition(":")
+    return getattr(importlib.import_module(modulo), funcion)
+
+
+_embedder_proceso: Optional[Callable[[List[str]], np.ndarray]] = None
+
+
+def _iniciar_worker(spec: str):
+    # El modelo se carga una vez por proceso, no por tarea
+    global _embedder_proceso
+    _embedder_proceso = cargar_embedder(spec)
+
+
+def _embeber(textos: List[str]) -> np.ndarray:
+    return np.asarray(_embedder_proceso(textos), dtype=np.float32)
+
+# ============================================================================
+# 4. DESTINOS
+# ============================================================================
+
+
+class WeaviateSink:
+    """Sube fragmentos con el endpoint batch REST de Weaviate (/v1/batch/objects)"""
+
+    def __init__(self, url: str = WEAVIATE_URL, clase: str = BANKING_CLASS_NAME, timeout: float = 60.0):
+        import httpx
+
+        self.url = url.rstrip("/")
+        self.clase = clase
+        self.client = httpx.Client(timeout=timeout)
+
+    def upsert(self, fragmentos: Sequence[Fragmento], vectores: np.ndarray):
+        objetos = [
+            {
+                "class": self.clase,
+                "id": f.id,
+                "properties": {"content": f.texto, "source": f.fuente, "chunk_index": f.indice,
+                               "sha256": f.sha256},
+                "vector": vector.tolist(),
+            }
+            for f, vector in zip(fragmentos, vectores)
+        ]
+        response = self.client.post(f"{self.url}/v1/batch/objects", json={"objects": objetos})
+        response.raise_for_status()
+        errores = [r["result"]["errors"] for r in response.json() if r.get("result", {}).get("errors")]
+        if errores:
+            raise RuntimeError(f"Weaviate rechazó {len(errores)} objetos: {errores[0]}")
+
+    def borrar(self, fuente: str, desde_indice: int = 0):
+        """Borra los fragmentos de una fuente con chunk_index >= desde_indice"""
+        condiciones = [{"path": ["source"], "operator": "Equal", "valueText": fuente}]
+        if desde_indice:
+            condiciones.append({"path": ["chunk_index"], "operator": "GreaterThanEqual", "valueInt": desde_indice})
+        where = condiciones[0] if len(condiciones) == 1 else {"operator": "And", "operands": condiciones}
+        response = self.client.request("DELETE", f"{self.url}/v1/batch/objects",
+                                       json={"match": {"class": self.clase, "where": where}})
+        response.raise_for_status()
+
+    def cerrar(self):
+        self.client.close()
+
+
+class MemorySink:
+    """Destino en memoria (--dry-run y benchmarks)"""
+
+    def __init__(self):
+        self.objetos: Dict[str, Tuple[Fragmento, np.ndarray]] = {}
+        self.peticiones = 0
+
+    def upsert(self, fragmentos: Sequence[Fragmento], vectores: np.ndarray):
+        self.peticiones += 1
+        for f, vector in zip(fragmentos, vectores):
+            self.objetos[f.id] = (f, vector)
+
+    def borrar(self, fuente: str, desde_indice: int = 0):
+        for id_, (f, _) in list(self.objetos.items()):
+            if f.fuente == fuente and f.indice >= desde_indice:
+                del self.objetos[id_]
+
+    def cerrar(self):
+        pass
+
+# ============================================================================
+# 5. PIPELINE
+# ============================================================================
+
+
+@dataclass
+class IngestStats:
+    archivos: int = 0
+    nuevos: int = 0
+    cambiados: int = 0
+    sin_cambios: int = 0
+    borrados: int = 0
+    fragmentos: int = 0
+    segundos: float = 0.0
+    errores: List[str] = field(default_factory=list)
+
+    @property
+    def procesados(self) -> int:
+        return self.nuevos + self.cambiados
+
+    @property
+    def docs_por_segundo(self) -> float:
+        return self.archivos / self.segundos if self.segundos else 0.0
+
+
+_FIN = object()
+
+
+class IngestionPipeline:
+    """Lector/fragmentador -> embeddings (pool de procesos) -> subida por lotes.
+
+    Las etapas se comunican por colas acotadas: si Weaviate o el modelo van
+    lentos, el lector se detiene en vez de cargar todo el corpus en memoria.
+    Un archivo entra al manifiesto solo cuando todos sus fragmentos se
+    subieron; si la ingesta se interrumpe, la siguiente corrida lo retoma.
+    """
+
+    def __init__(self, destino, manifest_path: str = INGEST_MANIFEST, embedder: str = "sentence-transformers",
+                 workers: int = INGEST_WORKERS, lote_embed: int = INGEST_EMBED_BATCH,
+                 lote_upsert: int = INGEST_UPSERT_BATCH, max_cola: int = INGEST_QUEUE_SIZE,
+                 tamano: int = RAG_CHUNK_SIZE, solape: int = RAG_CHUNK_OVERLAP):
+        self.destino = destino
+        self.manifest = Manifest(manifest_path)
+        self.embedder = embedder
+        self.workers = workers
+        self.lote_embed = lote_embed
+        self.lote_upsert = lote_upsert
+        self.max_cola = max_cola
+        self.tamano = tamano
+        self.solape = solape
+
+    # ---- etapa 1: descubrir, comparar con el manifiesto y fragmentar ----
+
+    def _archivos(self, raiz: str) -> Iterator[Tuple[str, str, os.stat_result]]:
+        for directorio, subdirs, nombres in os.walk(raiz):
+            subdirs.sort()
+            for nombre in sorted(nombres):
+                if nombre.endswith(EXTENSIONES):
+                    ruta = os.path.join(directorio, nombre)
+                    yield os.path.relpath(ruta, raiz), ruta, os.stat(ruta)
+
+    def _leer(self, raiz: str, stats: IngestStats, vistos: Set[str], cola: "queue.Queue",
+              pendientes: Dict[str, list], abortar: threading.Event):
+        lote: List[Fragmento] = []
+        for fuente, ruta, st in self._archivos(raiz):
+            if abortar.is_set():
+                break
+            vistos.add(fuente)
+            stats.archivos += 1
+            previo = self.manifest.get(fuente)
+            if previo and previo["tamano"] == st.st_size and previo["mtime_ns"] == st.st_mtime_ns:
+                stats.sin_cambios += 1
+                continue
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            sha = hashlib.sha256(contenido).hexdigest()
+            if previo and previo["sha256"] == sha:
+                # Solo cambió el mtime (p. ej. un checkout): no se reprocesa
+                self.manifest.registrar(fuente, sha, st.st_size, st.st_mtime_ns, previo["fragmentos"])
+                stats.sin_cambios += 1
+                continue
+
+            stats.cambiados += bool(previo)
+            stats.nuevos += not previo
+            textos = fragmentar(contenido.decode("utf-8", errors="replace"), self.tamano, self.solape)
+            # [fragmentos sin subir, sha, tamaño, mtime, total, fragmentos anteriores]
+            pendientes[fuente] = [len(textos), sha, st.st_size, st.st_mtime_ns, len(textos),
+                                  previo["fragmentos"] if previo else 0]
+            if not textos:
+                cola.put(("completar", fuente))
+            for indice, texto in enumerate(textos):
+                lote.append(Fragmento(id_fragmento(fuente, indice), fuente, indice, texto, sha))
+                if len(lote) >= self.lote_embed:
+                    cola.put(("embeber", lote))
+                    lote = []
+        if lote:
+            cola.put(("embeber", lote))
+        cola.put(_FIN)
+
+    # ---- etapa 3: subir y cerrar archivos completos ----
+
+    def _completar(self, fuente: str, pendientes: Dict[str, list]):
+        _, sha, tamano, mtime_ns, total, anteriores = pendientes.pop(fuente)
+        if anteriores > total:
+            self.destino.borrar(fuente, desde_indice=total)
+        self.manifest.registrar(fuente, sha, tamano, mtime_ns, total)
+
+    def _subir(self, cola: "queue.Queue", pendientes: Dict[str, list], stats: IngestStats,
+               abortar: threading.Event):
+        buffer_f: List[Fragmento] = []
+        buffer_v: List[np.ndarray] = []
+        ultimo_guardado = time.monotonic()
+
+        def vaciar():
+            if not buffer_f:
+                return
+            self.destino.upsert(buffer_f, np.vstack(buffer_v))
+            stats.fragmentos += len(buffer_f)
+            for f in buffer_f:
+                pendientes[f.fuente][0] -= 1
+                if pendientes[f.fuente][0] == 0:
+                    self._completar(f.fuente, pendientes)
+            buffer_f.clear()
+            buffer_v.clear()
+
+        try:
+            while True:
+                mensaje = cola.get()
+                if mensaje is _FIN:
+                    break
+                tipo, carga = mensaje
+                if tipo == "completar":
+                    self._completar(carga, pendientes)
+                    continue
+                fragmentos, vectores = carga
+                buffer_f.extend(fragmentos)
+                buffer_v.append(vectores)
+                if len(buffer_f) >= self.lote_upsert:
+                    vaciar()
+                if time.monotonic() - ultimo_guardado > 5:
+                    self.manifest.guardar()
+                    ultimo_guardado = time.monotonic()
+            vaciar()
+        except Exception as e:
+            stats.errores.append(f"subida: {e}")
+            abortar.set()
+            # Drenar para no bloquear a la etapa de embeddings
+            while cola.get() is not _FIN:
+                pass
+
+    # ---- orquestación (etapa 2 en el hilo principal) ----
+
+    def ejecutar(self, raiz: str) -> IngestStats:
+        stats = IngestStats()
+        inicio = time.perf_counter()
+        vistos: Set[str] = set()
+        pendientes: Dict[str, list] = {}
+        abortar = threading.Event()
+        cola_fragmentos: "queue.Queue" = queue.Queue(maxsize=self.max_cola)
+        cola_subida: "queue.Queue" = queue.Queue(maxsize=self.max_cola)
+
+        # El pool se crea antes que los hilos; spawn evita heredar locks de hilos (y de torch) al hacer fork
+        pool = None
+        if self.workers > 0:
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_iniciar_worker, initargs=(self.embedder,))
+        else:
+            _iniciar_worker(self.embedder)
+
+        lector = threading.Thread(target=self._leer, name="ingesta-lector",
+                                  args=(raiz, stats, vistos, cola_fragmentos, pendientes, abortar))
+        subidor = threading.Thread(target=self._subir, name="ingesta-subida",
+                                   args=(cola_subida, pendientes, stats, abortar))
+        lector.start()
+        subidor.start()
+        en_vuelo: Dict[Future, List[Fragmento]] = {}
+        try:
+            while True:
+                mensaje = cola_fragmentos.get()
+                if mensaje is _FIN:
+                    break
+                tipo, carga = mensaje
+                if tipo == "completar" or abortar.is_set():
+                    if not abortar.is_set():
+                        cola_subida.put(mensaje)
+                    continue
+                textos = [f.texto for f in carga]
+                if pool is None:
+                    cola_subida.put(("subir", (carga, _embeber(textos))))
+                    continue
+                en_vuelo[pool.submit(_embeber, textos)] = carga
+                # Como mucho dos tareas por proceso: acota la memoria de vectores pendientes
+                while len(en_vuelo) >= 2 * self.workers:
+                    listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        cola_subida.put(("subir", (en_vuelo.pop(futuro), futuro.result())))
+            for futuro in list(en_vuelo):
+                cola_subida.put(("subir", (en_vuelo.pop(futuro), futuro.result())))
+        except Exception as e:
+            stats.errores.append(f"embeddings: {e}")
+            abortar.set()
+            while lector.is_alive():
+                try:
+                    cola_fragmentos.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        finally:
+            cola_subida.put(_FIN)
+            lector.join()
+            subidor.join()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        if not abortar.is_set():
+            # Archivos que desaparecieron del corpus
+            for fuente in set(self.manifest.archivos) - vistos:
+                self.destino.borrar(fuente)
+                self.manifest.quitar(fuente)
+                stats.borrados += 1
+        self.manifest.guardar()
+        stats.segundos = time.perf_counter() - inicio
+        return stats
+
+# ============================================================================
+# 6. MAIN - EJECUCIÓN
+# ============================================================================
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta incremental de documentos a Weaviate")
+    parser.add_argument("raiz", nargs="?", default="demos/banking-rag", help="directorio del corpus")
+    parser.add_argument("--manifest", default=INGEST_MANIFEST)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="procesos de embedding (0 = en línea)")
+    parser.add_argument("--embedder", default="sentence-transformers",
+                        help="'sentence-transformers[:modelo]' o 'modulo:funcion'")
+    parser.add_argument("--weaviate-url", default=WEAVIATE_URL)
+    parser.add_argument("--clase", default=BANKING_CLASS_NAME)
+    parser.add_argument("--dry-run", action="store_true", help="no subir nada (destino en memoria)")
+    parser.add_argument("--local-index", metavar="DIR",
+                        help="escribir el índice vectorial local (local_index) en DIR en lugar de Weaviate")
+    args = parser.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+    if args.dry_run:
+        destino = MemorySink()
+    elif args.local_index:
+        from local_index import LocalIndexSink
+
+        destino = LocalIndexSink(args.local_index)
+        # Manifiesto propio: el del índice local no debe saltar archivos pendientes en Weaviate
+        if args.manifest == INGEST_MANIFEST:
+            args.manifest = os.path.join(args.local_index, "manifest.json")
+    else:
+        destino = WeaviateSink(args.weaviate_url, args.clase)
+    try:
+        pipeline = IngestionPipeline(destino, manifest_path=args.manifest, embedder=args.embedder,
+                                     workers=args.workers)
+        stats = pipeline.ejecutar(args.raiz)
+    finally:
+        destino.cerrar()
+    print(f"📄 {stats.archivos} archivos ({stats.nuevos} nuevos, {stats.cambiados} cambiados, "
+          f"{stats.sin_cambios} sin cambios, {stats.borrados} borrados)")
+    print(f"🧩 {stats.fragmentos} fragmentos en {stats.segundos:.1f}s ({stats.docs_por_segundo:.0f} docs/s)")
+    for error in stats.errores:
+        print(f"❌ {error}")
+
+
+if __name__ == "__main__":
+    main()
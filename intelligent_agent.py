@@ -3,335 +3,159 @@ Implementación Práctica - Agente Inteligente Bancario
 Integración directa con tu sistema RAG existente + nuevas capacidades
 """
 
-import streamlit as st
-import requests
-import json
-import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import contextlib
+import importlib
 import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, List, Dict, Any, Iterator, Optional
 
-# LangChain imports
-from langchain.agents import initialize_agent, Tool, AgentType
-from langchain.memory import ConversationBufferMemory
-from langchain.tools import BaseTool
-from langchain.schema import BaseMessage
-from pydantic import BaseModel, Field
+# Solo dependencias ligeras al importar: streamlit, los agentes de LangChain y
+# las herramientas (httpx, NumPy, embeddings) se cargan la primera vez que se usan
+from intent_router import IntentRouter, KeywordDispatcher
+from tool_planner import combinar_resultados, ejecutar_plan, planificar
+from conversation_memory import BoundedSummaryMemory, resumidor_llm
+from conversation_store import ConversationStore, get_conversation_store
+from admission_control import AdmissionController, AdmissionRejected, get_admission_controller
+from rendering import INFO_AYUDA, INFO_SISTEMA, SALUDO, HistorialRenderizado
+from currency_rates import get_rate_store
+# Tu sistema existente, compartido entre sesiones
+from shared_resources import LazyToolRegistry, get_registry, get_shared_rag_system
+from telemetry import en_contexto, get_telemetry, traza_actual
 
-# Tu sistema existente
-from banking_rag_configurable import BankingRAGConfigurable
+logger = logging.getLogger(__name__)
 
-# ============================================================================
-# 1. HERRAMIENTAS INTEGRADAS CON TU SISTEMA
-# ============================================================================
+# Confianza mínima para responder sin pasar por el agente LLM
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.85"))
 
-class MyrluxStudentTool(BaseTool):
-    """Herramienta para consultar estudiantes en tu backend Java"""
-    name = "consultar_estudiante"
-    description = """Consulta información de estudiantes del sistema MyrluxBack.
-    Parámetros: id_estudiante (número) o 'todos' para listar todos"""
-    
-    def __init__(self):
-        super().__init__()
-        self.base_url = "http://localhost:11002/api"
-    
-    def _run(self, consulta: str) -> str:
-        try:
-            if consulta.lower() == "todos":
-                # Obtener todos los estudiantes
-                response = requests.get(f"{self.base_url}/lista/alumno", timeout=10)
-                
-                if response.status_code == 200:
-                    estudiantes = response.json()
-                    if not estudiantes:
-                        return "No hay estudiantes registrados en el sistema."
-                    
-                    resultado = "📚 Lista de Estudiantes:\n\n"
-                    for estudiante in estudiantes[:10]:  # Limitar a 10 para no saturar
-                        resultado += f"ID: {estudiante.get('id', 'N/A')}\n"
-                        resultado += f"Nombre: {estudiante.get('nombres', '')} {estudiante.get('apellidos', '')}\n"
-                        resultado += f"Email: {estudiante.get('email', 'N/A')}\n"
-                        resultado += f"Teléfono: {estudiante.get('telefono', 'N/A')}\n"
-                        resultado += "---\n"
-                    
-                    if len(estudiantes) > 10:
-                        resultado += f"\n... y {len(estudiantes) - 10} estudiantes más."
-                    
-                    return resultado
-                else:
-                    return f"Error obteniendo estudiantes: {response.status_code}"
-            
-            else:
-                # Consultar estudiante específico
-                try:
-                    student_id = int(consulta)
-                except ValueError:
-                    return "Por favor proporciona un ID válido o escribe 'todos'"
-                
-                response = requests.get(f"{self.base_url}/obtener/alumno/{student_id}", timeout=10)
-                
-                if response.status_code == 200:
-                    estudiante = response.json()
-                    resultado = "👨‍🎓 Información del Estudiante:\n\n"
-                    resultado += f"ID: {estudiante.get('id', 'N/A')}\n"
-                    resultado += f"Nombre: {estudiante.get('nombres', '')} {estudiante.get('apellidos', '')}\n"
-                    resultado += f"Email: {estudiante.get('email', 'N/A')}\n"
-                    resultado += f"Teléfono: {estudiante.get('telefono', 'N/A')}\n"
-                    resultado += f"Dirección: {estudiante.get('direccion', 'N/A')}\n"
-                    return resultado
-                
-                elif response.status_code == 404:
-                    return f"No se encontró estudiante con ID {student_id}"
-                else:
-                    return f"Error consultando estudiante: {response.status_code}"
-                    
-        except requests.exceptions.ConnectionError:
-            return "❌ No se pudo conectar con MyrluxBack. ¿Está ejecutándose en puerto 11002?"
-        except requests.exceptions.Timeout:
-            return "⏱️ Timeout consultando MyrluxBack"
-        except Exception as e:
-            return f"Error inesperado: {str(e)}"
+# Grupos del despacho sin agente, en orden de prioridad. Subcadenas sobre el texto en minúsculas y
+# con sus acentos, como la cadena if/elif original ("préstamo" no es "prestamo")
+FALLBACK_KEYWORDS = (
+    ("bancaria", ("banco", "cuenta", "credito", "prestamo", "tarjeta")),
+    ("estudiante", ("estudiante", "alumno")),
+    ("calculo", ("calcula", "prestamo", "ahorro", "interes")),
+    ("clima", ("clima",)),
+    ("conversion", ("convierte", "conversion", "usd", "mxn", "eur")),
+    ("ayuda", ("ayuda", "help", "que puedes", "capacidades")),
+)
+_NUMERO = re.compile(r"\d+")
 
-class BankingRAGTool(BaseTool):
-    """Herramienta que usa tu sistema RAG bancario existente"""
-    name = "consulta_bancaria_rag"
-    description = """Responde preguntas sobre productos y servicios bancarios usando
-    el sistema RAG. Ejemplos: cuentas de ahorro, préstamos, tarjetas de crédito"""
-    
-    def __init__(self, rag_system):
-        super().__init__()
-        self.rag_system = rag_system
-    
-    def _run(self, pregunta: str) -> str:
-        try:
-            resultado = self.rag_system.rag_query(pregunta, k=3)
-            
-            respuesta = f"🏦 Consulta Bancaria:\n\n"
-            respuesta += resultado["response"]
-            
-            if resultado["sources"]:
-                respuesta += f"\n\n📋 Fuentes consultadas: {len(resultado['sources'])} documentos"
-            
-            return respuesta
-            
-        except Exception as e:
-            return f"Error en consulta bancaria: {str(e)}"
+# Nombres que antes vivían en este módulo; se resuelven al primer acceso (PEP 562)
+_REEXPORTADOS = {
+    "MyrluxStudentTool": "banking_tools",
+    "BankingRAGTool": "banking_tools",
+    "FinancialCalculatorTool": "banking_tools",
+    "WeatherTool": "banking_tools",
+    "CurrencyConverterTool": "banking_tools",
+    "CLIMAS_SIMULADOS": "banking_tools",
+    "MYRLUX_LIST_CACHE_TTL": "banking_tools",
+    "MYRLUX_LIST_PREVIEW_SIZE": "banking_tools",
+    "DeepSeekLLM": "deepseek_llm",
+}
 
-class FinancialCalculatorTool(BaseTool):
-    """Calculadora financiera avanzada"""
-    name = "calculadora_financiera"
-    description = """Realiza cálculos financieros. Ejemplos:
-    - 'prestamo 50000 18 24' (monto, tasa%, meses)
-    - 'ahorro 1000 3.5 12' (deposito mensual, tasa%, meses)
-    - 'interes 10000 5 2' (capital, tasa%, años)"""
-    
-    def _run(self, calculo: str) -> str:
-        try:
-            partes = calculo.lower().split()
-            tipo = partes[0]
-            
-            if tipo == "prestamo" and len(partes) >= 4:
-                monto = float(partes[1])
-                tasa_anual = float(partes[2])
-                meses = int(partes[3])
-                
-                # Calcular pago mensual
-                tasa_mensual = (tasa_anual / 100) / 12
-                pago_mensual = monto * (tasa_mensual * (1 + tasa_mensual)**meses) / ((1 + tasa_mensual)**meses - 1)
-                total_pagado = pago_mensual * meses
-                intereses = total_pagado - monto
-                
-                resultado = f"💰 Cálculo de Préstamo:\n\n"
-                resultado += f"Monto solicitado: ${monto:,.2f}\n"
-                resultado += f"Tasa anual: {tasa_anual}%\n"
-                resultado += f"Plazo: {meses} meses\n"
-                resultado += f"Pago mensual: ${pago_mensual:,.2f}\n"
-                resultado += f"Total a pagar: ${total_pagado:,.2f}\n"
-                resultado += f"Intereses totales: ${intereses:,.2f}"
-                
-                return resultado
-            
-            elif tipo == "ahorro" and len(partes) >= 4:
-                deposito_mensual = float(partes[1])
-                tasa_anual = float(partes[2])
-                meses = int(partes[3])
-                
-                # Calcular valor futuro
-                tasa_mensual = (tasa_anual / 100) / 12
-                valor_futuro = deposito_mensual * (((1 + tasa_mensual)**meses - 1) / tasa_mensual)
-                total_depositado = deposito_mensual * meses
-                ganancias = valor_futuro - total_depositado
-                
-                resultado = f"🐷 Cálculo de Ahorro:\n\n"
-                resultado += f"Depósito mensual: ${deposito_mensual:,.2f}\n"
-                resultado += f"Tasa anual: {tasa_anual}%\n"
-                resultado += f"Plazo: {meses} meses\n"
-                resultado += f"Total depositado: ${total_depositado:,.2f}\n"
-                resultado += f"Valor final: ${valor_futuro:,.2f}\n"
-                resultado += f"Ganancias: ${ganancias:,.2f}"
-                
-                return resultado
-            
-            elif tipo == "interes" and len(partes) >= 4:
-                capital = float(partes[1])
-                tasa_anual = float(partes[2])
-                años = float(partes[3])
-                
-                # Interés simple y compuesto
-                interes_simple = capital * (tasa_anual / 100) * años
-                interes_compuesto = capital * ((1 + tasa_anual / 100)**años - 1)
-                
-                resultado = f"📈 Cálculo de Intereses:\n\n"
-                resultado += f"Capital inicial: ${capital:,.2f}\n"
-                resultado += f"Tasa anual: {tasa_anual}%\n"
-                resultado += f"Tiempo: {años} años\n\n"
-                resultado += f"Interés simple: ${interes_simple:,.2f}\n"
-                resultado += f"Monto final (simple): ${capital + interes_simple:,.2f}\n\n"
-                resultado += f"Interés compuesto: ${interes_compuesto:,.2f}\n"
-                resultado += f"Monto final (compuesto): ${capital + interes_compuesto:,.2f}"
-                
-                return resultado
-            
-            else:
-                return """Formato incorrecto. Ejemplos válidos:
-• prestamo 50000 18 24 (monto, tasa%, meses)
-• ahorro 1000 3.5 12 (depósito mensual, tasa%, meses)  
-• interes 10000 5 2 (capital, tasa%, años)"""
-                
-        except ValueError:
-            return "Error: Verifica que los números sean válidos"
-        except Exception as e:
-            return f"Error en cálculo: {str(e)}"
 
-class WeatherTool(BaseTool):
-    """Consulta información del clima"""
-    name = "consultar_clima"
-    description = "Consulta el clima actual de una ciudad"
-    
-    def _run(self, ciudad: str) -> str:
-        try:
-            # Para demostración, usamos datos simulados
-            # En producción usarías OpenWeatherMap API
-            climas_simulados = {
-                "mexico": {"temp": 22, "desc": "Soleado", "humedad": 60},
-                "guadalajara": {"temp": 25, "desc": "Parcialmente nublado", "humedad": 55},
-                "monterrey": {"temp": 28, "desc": "Despejado", "humedad": 45},
-                "cancun": {"temp": 30, "desc": "Soleado", "humedad": 75},
-                "veracruz": {"temp": 26, "desc": "Nublado", "humedad": 80}
-            }
-            
-            ciudad_lower = ciudad.lower()
-            clima = climas_simulados.get(ciudad_lower, {
-                "temp": 24, "desc": "Información no disponible", "humedad": 65
-            })
-            
-            resultado = f"🌤️ Clima en {ciudad.title()}:\n\n"
-            resultado += f"Temperatura: {clima['temp']}°C\n"
-            resultado += f"Condiciones: {clima['desc']}\n"
-            resultado += f"Humedad: {clima['humedad']}%\n"
-            resultado += f"Actualizado: {datetime.now().strftime('%H:%M')}"
-            
-            return resultado
-            
-        except Exception as e:
-            return f"Error consultando clima: {str(e)}"
+def __getattr__(nombre: str):
+    modulo = _REEXPORTADOS.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    return getattr(importlib.import_module(modulo), nombre)
+
+
+def _reportar_error(mensaje: str):
+    """Registra el error y lo muestra en la interfaz si esta corre en Streamlit"""
+    logger.error(mensaje)
+    if "streamlit" in sys.modules:
+        sys.modules["streamlit"].error(mensaje)
 
-class CurrencyConverterTool(BaseTool):
-    """Conversor de monedas"""
-    name = "conversion_moneda"
-    description = """Convierte entre monedas. Formato: 'cantidad moneda_origen a moneda_destino'
-    Ejemplo: '100 USD a MXN' o '500 MXN a USD'"""
-    
-    def _run(self, conversion: str) -> str:
-        try:
-            # Parsear entrada
-            partes = conversion.split()
-            if len(partes) < 4 or partes[2].lower() != 'a':
-                return "Formato: 'cantidad moneda_origen a moneda_destino' (ej: '100 USD a MXN')"
-            
-            cantidad = float(partes[0])
-            moneda_origen = partes[1].upper()
-            moneda_destino = partes[3].upper()
-            
-            # Tasas de cambio simuladas (en producción usarías una API real)
-            tasas = {
-                ("USD", "MXN"): 18.50,
-                ("MXN", "USD"): 0.054,
-                ("EUR", "MXN"): 20.20,
-                ("MXN", "EUR"): 0.049,
-                ("USD", "EUR"): 0.92,
-                ("EUR", "USD"): 1.09
-            }
-            
-            # Buscar tasa de conversión
-            tasa = tasas.get((moneda_origen, moneda_destino))
-            if not tasa:
-                # Intentar conversión inversa
-                tasa_inversa = tasas.get((moneda_destino, moneda_origen))
-                if tasa_inversa:
-                    tasa = 1 / tasa_inversa
-                else:
-                    return f"No hay tasa de conversión disponible para {moneda_origen} → {moneda_destino}"
-            
-            resultado_conversion = cantidad * tasa
-            
-            resultado = f"💱 Conversión de Moneda:\n\n"
-            resultado += f"{cantidad:,.2f} {moneda_origen} = {resultado_conversion:,.2f} {moneda_destino}\n"
-            resultado += f"Tasa de cambio: 1 {moneda_origen} = {tasa:.4f} {moneda_destino}\n"
-            resultado += f"Actualizado: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            
-            return resultado
-            
-        except ValueError:
-            return "Error: La cantidad debe ser un número válido"
-        except Exception as e:
-            return f"Error en conversión: {str(e)}"
 
 # ============================================================================
-# 2. AGENTE INTELIGENTE INTEGRADO
+# 1. AGENTE INTELIGENTE INTEGRADO
 # ============================================================================
 
 class BankingIntelligentAgent:
     """Agente inteligente que combina tu sistema RAG con nuevas capacidades"""
     
-    def __init__(self, rag_system):
+    def __init__(self, rag_system, tools: Optional[LazyToolRegistry] = None, session_id: Optional[str] = None,
+                 conversaciones: Optional[ConversationStore] = None, admision: Optional[AdmissionController] = None):
         self.rag_system = rag_system
         
-        # Configurar memoria conversacional
-        self.memory = ConversationBufferMemory(
+        # Memoria conversacional acotada: ventana reciente + resumen de lo anterior
+        self.memory = BoundedSummaryMemory(
             memory_key="chat_history",
-            return_messages=True
-        )
-        
-        # Crear herramientas
-        self.tools = [
-            BankingRAGTool(rag_system),
-            MyrluxStudentTool(),
-            FinancialCalculatorTool(),
-            WeatherTool(),
-            CurrencyConverterTool(),
-            
-            # Herramienta simple de información
-            Tool(
-                name="informacion_sistema",
-                description="Proporciona información sobre las capacidades del sistema",
-                func=self._system_info
+            resumidor=(
+                resumidor_llm(rag_system.query_deepseek)
+                if os.getenv("MEMORY_SUMMARY_LLM", "false").lower() == "true" else None
             ),
-            
-            # Herramienta de saludo/ayuda
-            Tool(
-                name="ayuda_general",
-                description="Proporciona ayuda y ejemplos de uso",
-                func=self._help_info
-            )
-        ]
+        )
+        # Persistencia opcional: con session_id la memoria se reanuda desde CONVERSATION_STORE
+        self.session_id = session_id
+        self.conversaciones = conversaciones if conversaciones is not None else (
+            get_conversation_store() if session_id else None
+        )
+        if self.conversaciones is not None and session_id:
+            estado = self.conversaciones.cargar_memoria(session_id)
+            if estado is not None:
+                self.memory.restaurar_estado(estado)
         
-        # Crear un LLM simple usando tu DeepSeek existente
-        self.llm = self._create_simple_llm()
+        # Herramientas y router no guardan estado de sesión: se pueden compartir.
+        # Cada herramienta se construye en su primer uso.
+        self.tool_registry = tools if tools is not None else crear_herramientas(rag_system)
+        self.router = get_registry().get("intent_router", crear_router)
+        # Respaldo sin agente: tabla de palabras clave -> herramienta ya construida
+        self.despacho_fallback = get_registry().get(
+            "despacho_fallback", lambda: KeywordDispatcher(FALLBACK_KEYWORDS)
+        )
+        self.ciudades_fallback = get_registry().get("ciudades_fallback", crear_despacho_ciudades)
+        self._fallback = {
+            "bancaria": self._fallback_rag,
+            "estudiante": self._fallback_estudiante,
+            "calculo": self._fallback_calculo,
+            "clima": self._fallback_clima,
+            "conversion": self._fallback_conversion,
+            "ayuda": self._fallback_ayuda,
+        }
+        self.routing_counts = {"parallel": 0, "fast_path": 0, "agent": 0, "fallback": 0, "shed": 0}
+        # Tasa de mensajes por sesión y cupos del LLM compartidos por todo el proceso
+        self.admision = admision or get_admission_controller()
+        self.clave_admision = session_id or uuid.uuid4().hex
+        # Spans por herramienta/LLM y trazas por petición (compartidos por el proceso)
+        self.telemetria = get_telemetry()
+        # Tiempo al primer fragmento y total de las últimas respuestas en streaming
+        self.latencias = deque(maxlen=200)
         
-        # Inicializar agente
+        # El agente LangChain (y su LLM) se crea solo si una consulta lo necesita
+        self._agent = None
+        self._agent_inicializado = False
+        self._agent_lock = threading.Lock()
+    
+    @property
+    def tools(self) -> List[Any]:
+        """Todas las herramientas (las construye si aún no existen)"""
+        return self.tool_registry.todas()
+    
+    @property
+    def agent(self):
+        """Agente ReAct; importa LangChain y lo inicializa en el primer acceso"""
+        if not self._agent_inicializado:
+            with self._agent_lock:
+                if not self._agent_inicializado:
+                    self._agent = self._crear_agente()
+                    self._agent_inicializado = True
+        return self._agent
+    
+    def _crear_agente(self):
         try:
-            self.agent = initialize_agent(
+            from langchain.agents import AgentType, initialize_agent
+            
+            # Crear un LLM simple usando tu DeepSeek existente
+            self.llm = self._create_simple_llm()
+            return initialize_agent(
                 tools=self.tools,
                 llm=self.llm,
                 agent=AgentType.CONVERSATIONAL_REACT_DESCRIPTION,
@@ -342,152 +166,376 @@ class BankingIntelligentAgent:
                 handle_parsing_errors=True
             )
         except Exception as e:
-            st.error(f"Error inicializando agente: {e}")
-            self.agent = None
+            _reportar_error(f"Error inicializando agente: {e}")
+            return None
+    
+    def _find_tool(self, name: str):
+        """Busca una herramienta del agente por nombre"""
+        return self.tool_registry.get(name)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores hit/miss/eviction de las cachés de cada herramienta"""
+        stats = {}
+        for tool in self.tool_registry.instanciadas():
+            cache = getattr(tool, "cache", None)
+            if cache is not None:
+                stats[tool.name] = cache.stats()
+        return stats
+    
+    def invalidate_rag_cache(self):
+        """Descarta respuestas RAG cacheadas (llamar tras recargar documentos)"""
+        tool = self._find_tool("consulta_bancaria_rag")
+        if tool is not None:
+            tool.cache.invalidate_corpus()
+    
+    def invalidate_student_cache(self, student_id: Optional[int] = None) -> int:
+        """Invalida respuestas cacheadas de MyrluxBack (p. ej. tras editar un alumno)"""
+        tool = self._find_tool("consultar_estudiante")
+        return tool.invalidate(student_id) if tool else 0
     
     def _create_simple_llm(self):
-        """Crear un wrapper simple para tu DeepSeek"""
-        class DeepSeekLLM:
-            def __init__(self, rag_system):
-                self.rag_system = rag_system
-            
-            def __call__(self, prompt, **kwargs):
-                try:
-                    # Usar tu sistema DeepSeek existente
-                    response = self.rag_system.query_deepseek(prompt)
-                    return response
-                except Exception as e:
-                    return f"Error en LLM: {str(e)}"
-            
-            def predict(self, text, **kwargs):
-                return self.__call__(text, **kwargs)
-        
-        return DeepSeekLLM(self.rag_system)
+        """Crear el wrapper LangChain (con streaming) para tu DeepSeek"""
+        from deepseek_llm import DeepSeekLLM
+        return DeepSeekLLM(rag_system=self.rag_system)
     
-    def _system_info(self, query: str = "") -> str:
+    @staticmethod
+    def _system_info(query: str = "") -> str:
         """Información sobre capacidades del sistema"""
-        return """🤖 Capacidades del Asistente Inteligente:
-
-🏦 **Servicios Bancarios:**
-• Consultas sobre productos bancarios (cuentas, préstamos, tarjetas)
-• Cálculos financieros (préstamos, ahorros, intereses)
-• Información sobre tarifas y comisiones
-
-👨‍🎓 **Sistema Educativo (MyrluxBack):**
-• Consultar información de estudiantes
-• Listar todos los estudiantes registrados
-
-🌐 **Servicios Generales:**
-• Información del clima por ciudad
-• Conversión entre monedas (USD, MXN, EUR)
-• Calculadora financiera avanzada
-
-💬 **Ejemplos de uso:**
-• "¿Cómo abrir una cuenta de ahorros?"
-• "Calcula un préstamo de 50000 pesos a 18% por 24 meses"
-• "Muestra información del estudiante ID 123"
-• "¿Cuál es el clima en Guadalajara?"
-• "Convierte 100 USD a MXN"
-"""
+        return INFO_SISTEMA
     
-    def _help_info(self, query: str = "") -> str:
+    @staticmethod
+    def _help_info(query: str = "") -> str:
         """Información de ayuda"""
-        return """📋 **Ejemplos de Consultas:**
-
-**Bancarias:**
-• "¿Qué documentos necesito para un crédito personal?"
-• "¿Cuáles son las comisiones de la tarjeta de crédito?"
-• "prestamo 100000 15 36" (cálculo de préstamo)
-
-**Estudiantes:**
-• "Consulta el estudiante 123"
-• "Muestra todos los estudiantes"
-
-**Utilidades:**
-• "¿Cuál es el clima en Monterrey?"
-• "Convierte 500 MXN a USD"
-• "ahorro 2000 4 24" (cálculo de ahorro)
-
-**Conversacional:**
-• Puedo recordar nuestra conversación
-• Hago preguntas de seguimiento
-• Combino información de múltiples fuentes
-"""
+        return INFO_AYUDA
     
     def chat(self, user_input: str) -> str:
-        """Método principal para chatear con el agente"""
+        """Método principal para chatear con el agente (AdmissionRejected si la sesión excede su tasa)"""
+        self.admision.admitir_usuario(self.clave_admision)
+        with self.telemetria.traza(user_input):
+            response = self._responder(user_input)
+            self._persistir_turno(user_input, response)
+            return response
+    
+    def _responder(self, user_input: str) -> str:
         try:
+            # Consultas compuestas: herramientas independientes en paralelo
+            response = self._parallel_path(user_input)
+            if response is not None:
+                return response
+            
+            # Ruta rápida: intención clara -> herramienta directa, sin LLM
+            response = self._fast_path(user_input)
+            if response is not None:
+                return response
+            
             if not self.agent:
                 # Fallback sin agente
+                self._contar_ruta("fallback")
                 return self._handle_without_agent(user_input)
             
             # Usar el agente LangChain
-            response = self.agent.run(input=user_input)
-            return response
+            try:
+                with self.admision.recurso("llm"):
+                    self._contar_ruta("agent")
+                    return self.agent.run(input=user_input)
+            except AdmissionRejected:
+                # Cola del LLM saturada: respuesta determinista en vez de esperar
+                self._contar_ruta("shed")
+                return self._handle_without_agent(user_input)
             
         except Exception as e:
             # Fallback en caso de error
-            st.error(f"Error en agente: {e}")
+            _reportar_error(f"Error en agente: {e}")
             return self._handle_without_agent(user_input)
     
-    def _handle_without_agent(self, user_input: str) -> str:
-        """Manejo directo cuando el agente falla"""
-        user_lower = user_input.lower()
+    def chat_stream(self, user_input: str) -> Iterator[str]:
+        """Como chat(), pero entrega la respuesta en fragmentos conforme se genera.
+        
+        La admisión se decide al llamar (no al iterar), para poder rechazar
+        antes de empezar a responder.
+        """
+        self.admision.admitir_usuario(self.clave_admision)
+        return self._chat_stream(user_input)
+    
+    def _chat_stream(self, user_input: str) -> Iterator[str]:
+        with self.telemetria.traza(user_input) as traza:
+            inicio = time.perf_counter()
+            primero = None
+            partes = []
+            for fragmento in self._fragmentos_respuesta(user_input):
+                if primero is None:
+                    primero = traza.ttft = time.perf_counter() - inicio
+                partes.append(fragmento)
+                yield fragmento
+            total = time.perf_counter() - inicio
+            self.latencias.append({"ttft": total if primero is None else primero, "total": total})
+            self._persistir_turno(user_input, "".join(partes))
+    
+    def _persistir_turno(self, user_input: str, response: str):
+        """Guarda el turno y la memoria para que otro proceso pueda reanudar la sesión"""
+        if self.conversaciones is None or not self.session_id:
+            return
+        try:
+            with self.telemetria.span("conversation.save"):
+                self.conversaciones.agregar_turno(self.session_id, user_input, response,
+                                                  self.memory.exportar_estado())
+        except Exception as e:
+            # Sin disco la conversación sigue en memoria; solo se pierde la reanudación
+            logger.warning("No se pudo guardar el turno de %s: %s", self.session_id, e)
+    
+    def _contar_ruta(self, ruta: str):
+        self.routing_counts[ruta] += 1
+        traza = traza_actual()
+        if traza is not None:
+            traza.ruta = ruta
+    
+    def _fragmentos_respuesta(self, user_input: str) -> Iterator[str]:
+        try:
+            # Herramientas directas: su respuesta llega completa en un solo fragmento
+            response = self._parallel_path(user_input)
+            if response is None:
+                response = self._fast_path(user_input)
+            if response is None and not self.agent:
+                self._contar_ruta("fallback")
+                response = self._handle_without_agent(user_input)
+            if response is not None:
+                yield response
+                return
+            
+            with contextlib.ExitStack() as cupo:
+                try:
+                    cupo.enter_context(self.admision.recurso("llm"))
+                except AdmissionRejected:
+                    # Cola del LLM saturada: respuesta determinista en vez de esperar
+                    self._contar_ruta("shed")
+                    yield self._handle_without_agent(user_input)
+                    return
+                self._contar_ruta("agent")
+                yield from self._stream_agent(user_input)
+            
+        except Exception as e:
+            _reportar_error(f"Error en agente: {e}")
+            yield self._handle_without_agent(user_input)
+    
+    def _stream_agent(self, user_input: str) -> Iterator[str]:
+        """Corre el agente en un hilo y entrega los tokens de su respuesta final"""
+        from deepseek_llm import FinalAnswerStreamHandler
         
-        # Consultas bancarias
-        if any(word in user_lower for word in ['banco', 'cuenta', 'credito', 'prestamo', 'tarjeta']):
-            tool = BankingRAGTool(self.rag_system)
-            return tool._run(user_input)
+        cola: "queue.Queue[Optional[str]]" = queue.Queue()
+        resultado: Dict[str, Any] = {}
         
-        # Consultas de estudiantes
-        elif 'estudiante' in user_lower or 'alumno' in user_lower:
-            tool = MyrluxStudentTool()
-            if 'todos' in user_lower:
-                return tool._run('todos')
-            else:
-                # Buscar número en la consulta
-                import re
-                numbers = re.findall(r'\d+', user_input)
-                if numbers:
-                    return tool._run(numbers[0])
-                else:
-                    return "Por favor especifica el ID del estudiante o escribe 'todos'"
+        def ejecutar():
+            try:
+                resultado["output"] = self.agent.run(
+                    input=user_input, callbacks=[FinalAnswerStreamHandler(cola)]
+                )
+            except Exception as e:
+                resultado["error"] = e
+            finally:
+                cola.put(None)
         
-        # Cálculos
-        elif any(word in user_lower for word in ['calcula', 'prestamo', 'ahorro', 'interes']):
-            tool = FinancialCalculatorTool()
-            return tool._run(user_input)
+        # El hilo hereda la traza de la petición para registrar los spans de LLM y herramientas
+        threading.Thread(target=en_contexto(ejecutar), name="agent-stream", daemon=True).start()
+        emitido = []
+        fragmento = cola.get()
+        while fragmento is not None:
+            emitido.append(fragmento)
+            yield fragmento
+            fragmento = cola.get()
         
-        # Clima
-        elif 'clima' in user_lower:
-            tool = WeatherTool()
-            # Extraer ciudad
-            cities = ['mexico', 'guadalajara', 'monterrey', 'cancun', 'veracruz']
-            for city in cities:
-                if city in user_lower:
-                    return tool._run(city)
-            return tool._run('mexico')  # Default
+        texto = "".join(emitido).strip()
+        if "error" in resultado:
+            if not texto:
+                raise resultado["error"]
+            yield f"\n\n⚠️ Respuesta incompleta: {resultado['error']}"
+            return
+        # Respuestas que no pasaron por el prefijo final (p. ej. errores de formato del LLM)
+        output = resultado.get("output") or ""
+        if output.startswith(texto) and output[len(texto):]:
+            yield output[len(texto):]
+    
+    def latency_stats(self) -> Dict[str, float]:
+        """Percentiles de tiempo al primer fragmento (ttft) y total, en segundos"""
+        if not self.latencias:
+            return {}
+        import numpy as np
         
-        # Conversión
-        elif any(word in user_lower for word in ['convierte', 'conversion', 'usd', 'mxn', 'eur']):
-            tool = CurrencyConverterTool()
-            return tool._run(user_input)
+        ttft = np.array([m["ttft"] for m in self.latencias])
+        total = np.array([m["total"] for m in self.latencias])
+        return {
+            "respuestas": len(self.latencias),
+            "ttft_p50": float(np.percentile(ttft, 50)),
+            "ttft_p95": float(np.percentile(ttft, 95)),
+            "total_p50": float(np.percentile(total, 50)),
+            "total_p95": float(np.percentile(total, 95)),
+        }
+    
+    def _parallel_path(self, user_input: str) -> Optional[str]:
+        """Ejecuta concurrentemente las partes de una consulta compuesta"""
+        plan = planificar(user_input, self.router)
+        if plan is None:
+            return None
+        tools = self.tool_registry
+        if any(call.tool not in tools for call in plan):
+            return None
         
-        # Ayuda
-        elif any(word in user_lower for word in ['ayuda', 'help', 'que puedes', 'capacidades']):
-            return self._help_info()
+        self._contar_ruta("parallel")
+        response = combinar_resultados(ejecutar_plan(plan, tools))
+        self.memory.save_context({"input": user_input}, {"output": response})
+        return response
+    
+    def _fast_path(self, user_input: str) -> Optional[str]:
+        """Despacha a la herramienta si el router tiene confianza suficiente"""
+        decision = self.router.route_confident(user_input)
+        if decision is None:
+            return None
+        tool = self._find_tool(decision.tool)
+        if tool is None:
+            return None
         
+        self._contar_ruta("fast_path")
+        response = tool._run(decision.tool_input)
+        # Registrar el turno para que el agente conserve el contexto en turnos siguientes
+        self.memory.save_context({"input": user_input}, {"output": response})
+        return response
+    
+    def routing_stats(self) -> Dict[str, Any]:
+        """Cuántos mensajes evitaron el LLM gracias al router"""
+        total = sum(self.routing_counts.values())
+        return {
+            **self.routing_counts,
+            "total": total,
+            "fast_path_share": (
+                (self.routing_counts["fast_path"] + self.routing_counts["parallel"]) / total if total else 0.0
+            ),
+        }
+    
+    def _handle_without_agent(self, user_input: str) -> str:
+        """Manejo directo cuando el agente falla (tabla de despacho precompilada)"""
+        user_lower = user_input.lower()
+        grupo = self.despacho_fallback.clasificar(user_lower)
         # Default: usar RAG bancario
-        else:
-            tool = BankingRAGTool(self.rag_system)
-            return tool._run(user_input)
+        manejador = self._fallback.get(grupo, self._fallback_rag)
+        return manejador(user_input, user_lower)
+    
+    def _fallback_rag(self, user_input: str, user_lower: str) -> str:
+        return self._find_tool("consulta_bancaria_rag")._run(user_input)
+    
+    def _fallback_estudiante(self, user_input: str, user_lower: str) -> str:
+        tool = self._find_tool("consultar_estudiante")
+        if "todos" in user_lower:
+            return tool._run("todos")
+        numero = _NUMERO.search(user_input)
+        if numero:
+            return tool._run(numero.group())
+        return "Por favor especifica el ID del estudiante o escribe 'todos'"
+    
+    def _fallback_calculo(self, user_input: str, user_lower: str) -> str:
+        return self._find_tool("calculadora_financiera")._run(user_input)
+    
+    def _fallback_clima(self, user_input: str, user_lower: str) -> str:
+        ciudad = self.ciudades_fallback.clasificar(user_lower)
+        return self._find_tool("consultar_clima")._run(ciudad or "mexico")
+    
+    def _fallback_conversion(self, user_input: str, user_lower: str) -> str:
+        return self._find_tool("conversion_moneda")._run(user_input)
+    
+    def _fallback_ayuda(self, user_input: str, user_lower: str) -> str:
+        return self._help_info()
+
+def _herramienta(clase: str, *args) -> Callable[[], Any]:
+    """Fábrica que importa banking_tools (LangChain, httpx, NumPy) al construir"""
+    return lambda: getattr(importlib.import_module("banking_tools"), clase)(*args)
+
+
+def _herramienta_simple(nombre: str, descripcion: str, func: Callable[[str], str]) -> Callable[[], Any]:
+    def fabrica():
+        from langchain_core.tools import Tool
+        return Tool(name=nombre, description=descripcion, func=get_telemetry().medir(f"tool.{nombre}")(func))
+    return fabrica
+
+
+def crear_herramientas(rag_system) -> LazyToolRegistry:
+    """Herramientas del agente; no guardan estado de sesión"""
+    return LazyToolRegistry({
+        "consulta_bancaria_rag": _herramienta("BankingRAGTool", rag_system),
+        "consultar_estudiante": _herramienta("MyrluxStudentTool"),
+        "calculadora_financiera": _herramienta("FinancialCalculatorTool"),
+        "consultar_clima": _herramienta("WeatherTool"),
+        "conversion_moneda": _herramienta("CurrencyConverterTool"),
+        
+        # Herramienta simple de información
+        "informacion_sistema": _herramienta_simple(
+            "informacion_sistema",
+            "Proporciona información sobre las capacidades del sistema",
+            BankingIntelligentAgent._system_info,
+        ),
+        
+        # Herramienta de saludo/ayuda
+        "ayuda_general": _herramienta_simple(
+            "ayuda_general",
+            "Proporciona ayuda y ejemplos de uso",
+            BankingIntelligentAgent._help_info,
+        ),
+    })
+
+
+def crear_router() -> IntentRouter:
+    """Router determinista: comandos y consultas inequívocas no pasan por el LLM"""
+    from banking_tools import CLIMAS_SIMULADOS
+    
+    return IntentRouter(
+        ciudades=CLIMAS_SIMULADOS,
+        monedas=get_rate_store().snapshot.monedas,
+        threshold=ROUTER_CONFIDENCE_THRESHOLD,
+    )
+
+
+def crear_despacho_ciudades() -> KeywordDispatcher:
+    """Ciudades con clima conocido; la primera mencionada en orden de la tabla"""
+    from banking_tools import CLIMAS_SIMULADOS
+    
+    return KeywordDispatcher((ciudad, (ciudad,)) for ciudad in CLIMAS_SIMULADOS)
+
+
+def get_shared_tools(rag_system) -> LazyToolRegistry:
+    """Un solo juego de herramientas por sistema RAG compartido"""
+    return get_registry().get(("herramientas", rag_system), lambda: crear_herramientas(rag_system))
+
+
+def create_shared_agent(session_id: Optional[str] = None) -> "BankingIntelligentAgent":
+    """Agente de una sesión sobre los recursos compartidos del proceso.
+
+    Solo la memoria, el historial y las métricas son propios de la sesión.
+    Con session_id y CONVERSATION_STORE la memoria se reanuda del disco.
+    """
+    rag_system = get_shared_rag_system()
+    return BankingIntelligentAgent(rag_system, tools=get_shared_tools(rag_system), session_id=session_id)
 
 # ============================================================================
-# 3. INTERFAZ STREAMLIT MEJORADA
+# 2. INTERFAZ STREAMLIT MEJORADA
 # ============================================================================
 
+def _session_id_url(st) -> Optional[str]:
+    """Sesión persistente en la URL (?sesion=...) para reanudarla al recargar; None sin CONVERSATION_STORE"""
+    if get_conversation_store() is None:
+        return None
+    if hasattr(st, "query_params"):
+        session_id = st.query_params.get("sesion")
+        if not session_id:
+            session_id = st.query_params["sesion"] = uuid.uuid4().hex
+        return session_id
+    # streamlit < 1.30
+    params = st.experimental_get_query_params()
+    session_id = (params.get("sesion") or [None])[0] or uuid.uuid4().hex
+    st.experimental_set_query_params(**{**params, "sesion": session_id})
+    return session_id
+
+
 def create_intelligent_banking_ui():
     """Interfaz para el agente bancario inteligente"""
+    import streamlit as st
+    from health_monitor import get_health_monitor
     
     st.set_page_config(
         page_title="🤖 Asistente Bancario Inteligente",
@@ -502,23 +550,20 @@ def create_intelligent_banking_ui():
     if 'intelligent_agent' not in st.session_state:
         try:
             with st.spinner("🚀 Inicializando agente inteligente..."):
-                # Usar tu sistema RAG existente
-                if 'rag_system' not in st.session_state:
-                    st.session_state.rag_system = BankingRAGConfigurable()
-                
-                # Crear agente inteligente
-                st.session_state.intelligent_agent = BankingIntelligentAgent(
-                    st.session_state.rag_system
-                )
+                # RAG y herramientas se cargan una vez por proceso; la sesión solo crea su memoria
+                st.session_state.intelligent_agent = create_shared_agent(_session_id_url(st))
+                st.session_state.rag_system = st.session_state.intelligent_agent.rag_system
             
             st.success("✅ Agente inteligente listo!")
             
-            # Mostrar estado de sistemas
+            # Mostrar estado de sistemas (último sondeo en caché; nunca bloquea el render)
+            myrlux = get_health_monitor().estado("myrlux")
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric("🏦 Banking RAG", "✅ Activo")
             with col2:
-                st.metric("👨‍🎓 MyrluxBack", "🔗 Conectado")
+                st.metric("👨‍🎓 MyrluxBack", {"ok": "🔗 Conectado", "caido": "❌ Desconectado"}.get(
+                    myrlux.estado if myrlux else "", "⏳ Verificando"))
             with col3:
                 st.metric("🤖 Agente IA", "✅ Listo")
                 
@@ -531,31 +576,32 @@ def create_intelligent_banking_ui():
     st.subheader("💬 Chat con el Asistente")
     
     # Inicializar historial
+    agente = st.session_state.intelligent_agent
+    persistente = agente.conversaciones is not None and agente.session_id
     if "agent_messages" not in st.session_state:
-        st.session_state.agent_messages = [
-            {
-                "role": "assistant",
-                "content": """¡Hola! Soy tu asistente bancario inteligente 🤖
-
-**Puedo ayudarte con:**
-🏦 **Consultas bancarias** - productos, servicios, cálculos
-👨‍🎓 **Gestión de estudiantes** - consultar información de MyrluxBack  
-🌤️ **Información del clima** - consultas meteorológicas
-💱 **Conversión de monedas** - USD, MXN, EUR
-🧮 **Cálculos financieros** - préstamos, ahorros, intereses
-
-**Ejemplos:**
-• "¿Cómo abrir una cuenta de ahorros?"
-• "Calcula un préstamo de 50000 pesos al 18% por 24 meses"
-• "Muestra información del estudiante 123"
-• "¿Cuál es el clima en Guadalajara?"
-
-¿En qué puedo ayudarte?"""
-            }
-        ]
+        # Al reanudar solo se lee la última página; las anteriores, a pedido
+        previos, st.session_state.historial_desde = (
+            agente.conversaciones.pagina(agente.session_id) if persistente else ([], 0)
+        )
+        st.session_state.agent_messages = previos or [{"role": "assistant", "content": SALUDO}]
+    
+    if persistente and st.session_state.historial_desde:
+        if st.button("⬆️ Cargar mensajes anteriores"):
+            pagina, st.session_state.historial_desde = agente.conversaciones.pagina(
+                agente.session_id, antes=st.session_state.historial_desde)
+            st.session_state.agent_messages[:0] = pagina
+            # El historial creció por el principio: el bloque de anteriores se rehace
+            st.session_state.pop("historial_render", None)
     
-    # Mostrar historial de chat
-    for message in st.session_state.agent_messages:
+    # Mostrar historial de chat: los mensajes viejos en un solo bloque, solo la cola como burbujas
+    if "historial_render" not in st.session_state:
+        st.session_state.historial_render = HistorialRenderizado()
+    anteriores, n_anteriores, recientes = st.session_state.historial_render.actualizar(
+        st.session_state.agent_messages)
+    if n_anteriores:
+        with st.expander(f"🗂️ {n_anteriores} mensajes anteriores"):
+            st.markdown(anteriores)
+    for message in recientes:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
     
@@ -568,14 +614,28 @@ def create_intelligent_banking_ui():
         
         # Generar respuesta del agente
         with st.chat_message("assistant"):
-            with st.spinner("🤔 Procesando..."):
-                try:
-                    response = st.session_state.intelligent_agent.chat(prompt)
-                    st.markdown(response)
-                except Exception as e:
-                    error_msg = f"❌ Error procesando consulta: {str(e)}"
-                    st.error(error_msg)
-                    response = error_msg
+            agent = st.session_state.intelligent_agent
+            placeholder = st.empty()
+            placeholder.markdown("🤔 Procesando...")
+            partes = []
+            try:
+                # Pintar cada fragmento en cuanto llega, con cursor al final
+                for fragmento in agent.chat_stream(prompt):
+                    partes.append(fragmento)
+                    placeholder.markdown("".join(partes) + "▌")
+                response = "".join(partes)
+                placeholder.markdown(response)
+                if agent.latencias:
+                    ultima = agent.latencias[-1]
+                    st.caption(f"⏱️ Primer fragmento: {ultima['ttft']:.2f}s · Total: {ultima['total']:.2f}s")
+            except AdmissionRejected as e:
+                # La sesión superó ADMISSION_USER_RATE: no es un error, solo hay que esperar
+                response = f"⏳ Estás enviando mensajes muy rápido; reintenta en {max(1, round(e.reintento_en))}s"
+                placeholder.warning(response)
+            except Exception as e:
+                error_msg = f"❌ Error procesando consulta: {str(e)}"
+                placeholder.error(error_msg)
+                response = error_msg
         
         # Guardar respuesta
         st.session_state.agent_messages.append({"role": "assistant", "content": response})
@@ -613,6 +673,10 @@ def create_intelligent_banking_ui():
             try:
                 response = st.session_state.intelligent_agent.chat(ejemplo)
                 st.session_state.agent_messages.append({"role": "assistant", "content": response})
+            except AdmissionRejected as e:
+                # Igual que en el chat: superar la tasa de la sesión no es un error
+                aviso = f"⏳ Estás enviando mensajes muy rápido; reintenta en {max(1, round(e.reintento_en))}s"
+                st.session_state.agent_messages.append({"role": "assistant", "content": aviso})
             except Exception as e:
                 error_msg = f"❌ Error: {str(e)}"
                 st.session_state.agent_messages.append({"role": "assistant", "content": error_msg})
@@ -623,26 +687,57 @@ def create_intelligent_banking_ui():
         
         st.subheader("📊 Estado del Sistema")
         
-        # Verificar estado de sistemas
-        try:
-            # Test MyrluxBack
-            response = requests.get("http://localhost:11002/api/home", timeout=5)
-            myrlux_status = "✅ Conectado" if response.status_code == 200 else "❌ Error"
-        except:
-            myrlux_status = "❌ Desconectado"
-        
-        # Test RAG
+        # Estado en caché: lo actualiza el hilo de sondeo, el render solo lo lee
+        estados = get_health_monitor().snapshot()
         rag_status = "✅ Activo" if hasattr(st.session_state, 'rag_system') else "❌ Inactivo"
         
         st.write(f"**Banking RAG:** {rag_status}")
-        st.write(f"**MyrluxBack:** {myrlux_status}")
+        for nombre, titulo in (("myrlux", "MyrluxBack"), ("weaviate", "Weaviate"), ("deepseek", "DeepSeek")):
+            if nombre in estados:
+                st.write(f"**{titulo}:** {estados[nombre].etiqueta()}")
         st.write(f"**Agente IA:** ✅ Funcionando")
         
-        if myrlux_status == "❌ Desconectado":
+        latencias = st.session_state.intelligent_agent.latency_stats()
+        if latencias:
+            st.caption(
+                f"Primer fragmento p50 {latencias['ttft_p50']:.2f}s · "
+                f"Total p50 {latencias['total_p50']:.2f}s ({latencias['respuestas']} respuestas)"
+            )
+        
+        llm = st.session_state.intelligent_agent.admision.stats().get("llm")
+        if llm:
+            st.caption(
+                f"Cola LLM: {llm['en_curso']}/{llm['concurrencia']} en curso · {llm['en_cola']} en espera · "
+                f"{llm['rechazadas_cola_llena'] + llm['rechazadas_espera']} degradadas a respuesta directa"
+            )
+        
+        if "myrlux" in estados and estados["myrlux"].estado == "caido":
             st.warning("⚠️ MyrluxBack no está disponible. Inicia el servidor Java en puerto 11002")
 
+        telemetria = st.session_state.intelligent_agent.telemetria
+        with st.expander("⏱️ Peticiones más lentas"):
+            for traza in telemetria.lentas(5):
+                st.markdown(
+                    f"**{traza.duracion:.2f}s** · {traza.ruta or '—'} · "
+                    f"{traza.iteraciones} llamadas LLM\n\n_{traza.mensaje[:60]}_"
+                )
+                st.caption(" · ".join(f"{s.nombre} {s.duracion * 1000:.0f}ms" for s in traza.spans) or "sin spans")
+
+            resumen = telemetria.resumen()
+            if resumen:
+                st.dataframe(
+                    [{"operación": nombre, "n": d["conteo"], "p50 ms": round(d["p50"] * 1000, 1),
+                      "p95 ms": round(d["p95"] * 1000, 1), "p99 ms": round(d["p99"] * 1000, 1)}
+                     for nombre, d in resumen.items()],
+                    use_container_width=True, hide_index=True,
+                )
+                st.download_button("Métricas (Prometheus)", telemetria.exportar_prometheus(),
+                                   file_name="metrics.txt", use_container_width=True)
+                st.download_button("Trazas (JSON)", telemetria.exportar_json(),
+                                   file_name="trazas.json", use_container_width=True)
+
 # ============================================================================
-# 4. MAIN - EJECUCIÓN
+# 3. MAIN - EJECUCIÓN
 # ============================================================================
 
 def main():
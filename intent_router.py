@@ -0,0 +1,198 @@
+"""
+Router determinista de intenciones
+Envía directo a la herramienta las consultas que una regex resuelve con alta confianza, sin pasar por el LLM
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# ============================================================================
+# 1. DECISIÓN DE RUTEO
+# ============================================================================
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    """Herramienta elegida, entrada ya normalizada para ella y confianza (0-1)"""
+    tool: str
+    tool_input: str
+    confidence: float
+    regla: str
+
+
+@dataclass(frozen=True)
+class Regla:
+    """Patrón compilado + función que arma la entrada y la confianza de la herramienta"""
+    nombre: str
+    tool: str
+    patron: "re.Pattern"
+    extraer: Callable[["re.Match"], Optional[tuple]]  # -> (tool_input, confidence) o None
+
+
+def _sin_marcas(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+# Latín-1 y Latín extendido-A/B precalculados: el caso común evita NFKD
+_TABLA_ACENTOS = {
+    c: _sin_marcas(c) for c in map(chr, range(0x80, 0x250)) if _sin_marcas(c) != c
+}
+_ACENTUADAS = re.compile("[" + "".join(map(re.escape, _TABLA_ACENTOS)) + "]")
+_FUERA_DE_TABLA = re.compile("[^\x00-\u024f]")
+
+
+def quitar_acentos(texto: str) -> str:
+    if texto.isascii():
+        return texto
+    if _FUERA_DE_TABLA.search(texto):
+        return _sin_marcas(texto)
+    for c in set(_ACENTUADAS.findall(texto)):
+        texto = texto.replace(c, _TABLA_ACENTOS[c])
+    return texto
+
+
+# Monto: la coma solo como separador de miles ("1,500,000"); "3,5" no es un monto
+_MONTO = r"(?<![\d.,])(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)(?![.,]?\d)"
+# Tasa: admite coma decimal ("3,5" -> 3.5)
+_TASA = r"(?<![\d.,])(\d+(?:[.,]\d+)?)(?![.,]?\d)"
+# Plazo: sin coma; "12,5" no coincide y el mensaje va al agente
+_PLAZO = r"(?<![\d.,])(\d+(?:\.\d+)?)(?![.,]?\d)"
+# Un préstamo en lenguaje natural necesita un primer número con pinta de monto
+# ("cobra 2 comisiones al 3% en 12 meses" no es un cálculo)
+MONTO_MINIMO_PRESTAMO = 100.0
+
+
+def _numero(valor: str) -> str:
+    return valor.replace(",", "")
+
+
+def _decimal(valor: str) -> str:
+    return valor.replace(",", ".")
+
+
+def _extraer_prestamo(m: "re.Match") -> Optional[tuple]:
+    monto = _numero(m[1])
+    if float(monto) < MONTO_MINIMO_PRESTAMO:
+        return None
+    return f"prestamo {monto} {_decimal(m[2])} {m[3]}", 0.9
+
+# ============================================================================
+# 2. ROUTER
+# ============================================================================
+
+
+class IntentRouter:
+    """Evalúa reglas compiladas en orden y devuelve la primera que aplique.
+
+    Solo las decisiones con confianza >= threshold deben despacharse sin LLM;
+    route() devuelve también las de menor confianza para métricas y pruebas.
+    """
+
+    def __init__(self, ciudades: Iterable[str] = (), monedas: Iterable[str] = (),
+                 threshold: float = 0.85):
+        self.threshold = threshold
+        self.ciudades = sorted({quitar_acentos(c.lower()) for c in ciudades}, key=len, reverse=True)
+        self.monedas = {m.upper() for m in monedas}
+        self.reglas: List[Regla] = self._construir_reglas()
+
+    def _construir_reglas(self) -> List[Regla]:
+        ciudades = "|".join(re.escape(c) for c in self.ciudades) or r"(?!)"
+        return [
+            # "prestamo 75000 16 30", "ahorro 1500 3.5 18", "tabla 50000 18 24"
+            Regla("comando_calculo", "calculadora_financiera",
+                  re.compile(rf"^\s*(prestamo|ahorro|interes|tabla)\s+{_MONTO}\s+{_TASA}\s+{_PLAZO}\s*$"),
+                  lambda m: (f"{m[1]} {_numero(m[2])} {_decimal(m[3])} {m[4]}", 0.99)),
+            Regla("comando_escenarios", "calculadora_financiera",
+                  re.compile(r"^\s*escenarios\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)\s*$"),
+                  lambda m: (f"escenarios {m[1]} {m[2]} {m[3]}", 0.99)),
+            # "Calcula un préstamo de 50000 pesos al 18% por 24 meses"
+            Regla("prestamo_natural", "calculadora_financiera",
+                  re.compile(rf"\b(?:prestamo|credito)\b\D*?{_MONTO}\D*?{_TASA}\s*%\D*?(\d+)\s*mes"),
+                  _extraer_prestamo),
+            Regla("ahorro_natural", "calculadora_financiera",
+                  re.compile(rf"\bahorr\w*\b\D*?{_MONTO}\D*?{_TASA}\s*%\D*?(\d+)\s*mes"),
+                  lambda m: (f"ahorro {_numero(m[1])} {_decimal(m[2])} {m[3]}", 0.9)),
+            # "Convierte 200 USD a MXN", "500 mxn en usd"
+            Regla("conversion", "conversion_moneda",
+                  re.compile(rf"{_MONTO}\s*([a-z]{{3}})\s+(?:a|en|to|por)\s+([a-z]{{3}})\b"),
+                  self._extraer_conversion),
+            # "Muestra todos los estudiantes", "lista de alumnos"
+            Regla("estudiantes_todos", "consultar_estudiante",
+                  re.compile(r"\b(?:todos\s+los|lista(?:r)?(?:\s+de)?(?:\s+los)?)\s+(?:estudiantes|alumnos)\b"),
+                  lambda m: ("todos", 0.95)),
+            # "Consulta el estudiante 123", "alumno id 7"
+            Regla("estudiante_id", "consultar_estudiante",
+                  re.compile(r"\b(?:estudiante|alumno)s?\b(?:\s+(?:con\s+)?(?:id|numero|no\.?|#))?\s*:?\s*(\d+)\b"),
+                  lambda m: (m[1], 0.95)),
+            # "¿Cuál es el clima en Monterrey?"
+            Regla("clima_ciudad", "consultar_clima",
+                  re.compile(rf"\b(?:clima|temperatura|weather)\b.*?\b({ciudades})\b"),
+                  lambda m: (m[1], 0.95)),
+            Regla("clima", "consultar_clima",
+                  re.compile(r"\b(?:clima|temperatura|weather)\b(?:\s+(?:en|de|in)\s+([a-z ]+?))?\s*\??$"),
+                  lambda m: ((m[1] or "mexico").strip(), 0.7)),
+            Regla("ayuda", "ayuda_general",
+                  re.compile(r"^\W*(?:ayuda|help|que puedes hacer|que sabes hacer|como funcionas)\W*$"),
+                  lambda m: ("", 0.95)),
+            Regla("capacidades", "informacion_sistema",
+                  re.compile(r"^\W*(?:capacidades|que capacidades tienes|informacion del sistema)\W*$"),
+                  lambda m: ("", 0.95)),
+        ]
+
+    def _extraer_conversion(self, m: "re.Match") -> Optional[tuple]:
+        origen, destino = m[2].upper(), m[3].upper()
+        conocidas = not self.monedas or (origen in self.monedas and destino in self.monedas)
+        return f"{_numero(m[1])} {origen} a {destino}", 0.95 if conocidas else 0.6
+
+    def route(self, texto: str) -> Optional[RouteDecision]:
+        """Primera regla que coincide (o None)"""
+        normalizado = quitar_acentos(texto.lower()).strip()
+        for regla in self.reglas:
+            m = regla.patron.search(normalizado)
+            if m is None:
+                continue
+            extraido = regla.extraer(m)
+            if extraido is not None:
+                tool_input, confianza = extraido
+                return RouteDecision(regla.tool, tool_input, confianza, regla.nombre)
+        return None
+
+    def route_confident(self, texto: str) -> Optional[RouteDecision]:
+        """Decisión solo si supera el umbral de confianza"""
+        decision = self.route(texto)
+        if decision is not None and decision.confidence >= self.threshold:
+            return decision
+        return None
+
+# ============================================================================
+# 3. DESPACHO POR PALABRAS CLAVE (FALLBACK SIN AGENTE)
+# ============================================================================
+
+
+class KeywordDispatcher:
+    """Tabla precompilada grupo -> palabras clave, evaluada en orden de prioridad.
+
+    Equivale a la cadena if/elif de subcadenas: gana el primer grupo que tenga
+    alguna palabra en el texto. Las palabras se normalizan una sola vez y se
+    buscan con `in` (búsqueda de subcadenas en C). Con ~20 palabras cortas
+    una alternancia regex de una sola pasada resulta más lenta: `re` prueba
+    la alternancia en cada posición del texto en vez de compilarla a un
+    autómata (ver benchmarks/bench_fallback_dispatch.py).
+    """
+
+    def __init__(self, grupos: Iterable[Tuple[str, Iterable[str]]]):
+        self.tabla = tuple(
+            (nombre, tuple(dict.fromkeys(quitar_acentos(p.lower()) for p in palabras)))
+            for nombre, palabras in grupos
+        )
+
+    def clasificar(self, normalizado: str) -> Optional[str]:
+        """Grupo de mayor prioridad presente en el texto (ya normalizado), o None"""
+        for nombre, palabras in self.tabla:
+            for palabra in palabras:
+                if palabra in normalizado:
+                    return nombre
+        return None
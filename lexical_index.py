@@ -0,0 +1,220 @@
+"""
+Índice invertido BM25 del corpus RAG
+Se construye durante la ingesta junto al índice vectorial local y se fusiona con la búsqueda vectorial por RRF
+"""
+
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from semantic_cache import normalizar_pregunta
+
+# Parámetros BM25 (Robertson/Okapi) y constante de reciprocal-rank fusion
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Segmentos (uno por corrida de ingesta) a partir de los cuales se compactan en uno
+BM25_MAX_SEGMENTOS = 8
+
+# Palabras vacías: no distinguen documentos y alargan las listas de postings
+STOPWORDS = frozenset(
+    "a al algo como con cual cuales cuando de del donde el en es esta este hay la las le lo los mas me mi "
+    "mis o para pero por que se si sin sobre son su sus tiene un una uno unos y ya yo".split()
+)
+
+# ============================================================================
+# 1. TOKENIZACIÓN
+# ============================================================================
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Minúsculas y sin acentos: 'Comisión anual' y 'comision ANUAL' dan los mismos términos"""
+    return [t for t in normalizar_pregunta(texto).split() if t not in STOPWORDS]
+
+# ============================================================================
+# 2. SEGMENTOS EN DISCO
+# ============================================================================
+#   bm25_longitudes.npy        términos por fila (uint32), una entrada por fila del índice local
+#   bm25_<inicio>_<fin>.npz    postings de las filas [inicio, fin) en formato CSR:
+#                              vocab (ordenado), indptr, filas (int32), tf (uint16)
+
+
+def _ruta_segmento(ruta: str, inicio: int, fin: int) -> str:
+    return os.path.join(ruta, f"bm25_{inicio:010d}_{fin:010d}.npz")
+
+
+_SEGMENTO = re.compile(r"bm25_(\d+)_(\d+)\.npz")
+
+
+def _segmentos(ruta: str) -> List[Tuple[int, int, str]]:
+    encontrados = []
+    for nombre in os.listdir(ruta):
+        coincidencia = _SEGMENTO.fullmatch(nombre)
+        if coincidencia:
+            encontrados.append((int(coincidencia[1]), int(coincidencia[2]), os.path.join(ruta, nombre)))
+    return sorted(encontrados)
+
+
+def _guardar_segmento(archivo: str, terminos: np.ndarray, filas: np.ndarray, tf: np.ndarray,
+                      vocab: Sequence[str]):
+    """Ordena los postings por (término, fila) y los escribe en CSR con el vocabulario ordenado"""
+    vocab = np.asarray(vocab, dtype=np.str_)
+    orden_vocab = np.argsort(vocab, kind="stable")
+    rango = np.empty_like(orden_vocab)
+    rango[orden_vocab] = np.arange(len(orden_vocab))
+    terminos = rango[terminos]
+    orden = np.lexsort((filas, terminos))
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(terminos, minlength=len(vocab)))]).astype(np.int64)
+    temporal = f"{archivo}.tmp.npz"
+    np.savez(temporal, vocab=vocab[orden_vocab], indptr=indptr, filas=filas[orden].astype(np.int32),
+             tf=np.minimum(tf[orden], np.iinfo(np.uint16).max).astype(np.uint16))
+    os.replace(temporal, archivo)
+
+
+class _Segmento:
+    def __init__(self, archivo: str):
+        datos = np.load(archivo)
+        self.vocab, self.indptr, self.filas, self.tf = datos["vocab"], datos["indptr"], datos["filas"], datos["tf"]
+
+    def postings(self, termino: str) -> Tuple[np.ndarray, np.ndarray]:
+        i = int(np.searchsorted(self.vocab, termino))
+        if i == len(self.vocab) or self.vocab[i] != termino:
+            return self.filas[:0], self.tf[:0]
+        return self.filas[self.indptr[i]:self.indptr[i + 1]], self.tf[self.indptr[i]:self.indptr[i + 1]]
+
+    def triples(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        terminos = np.repeat(np.arange(len(self.vocab)), np.diff(self.indptr))
+        return self.vocab.tolist(), terminos, self.filas, self.tf
+
+
+class BM25Writer:
+    """Acumula los términos de las filas nuevas y los escribe como un segmento al cerrar.
+
+    Lo usa LocalIndexSink: las filas solo se agregan, así que cada corrida
+    de ingesta produce un segmento [inicio, fin) y las filas reemplazadas
+    se descartan en la búsqueda con la máscara de vivos del índice.
+    """
+
+    def __init__(self, ruta: str, filas: int):
+        self.ruta = ruta
+        self.inicio = filas
+        archivo = os.path.join(ruta, "bm25_longitudes.npy")
+        self.longitudes: List[int] = np.load(archivo)[:filas].tolist() if os.path.exists(archivo) else []
+        # Segmentos escritos después de la última confirmación de meta.json
+        for _, fin, segmento in _segmentos(ruta):
+            if fin > filas:
+                os.remove(segmento)
+        self._vocab: Dict[str, int] = {}
+        self._terminos: List[int] = []
+        self._filas: List[int] = []
+        self._tf: List[int] = []
+
+    @property
+    def completo(self) -> bool:
+        """Hay longitudes para todas las filas (un índice anterior a BM25 no las tiene)"""
+        return len(self.longitudes) == self.inicio
+
+    def agregar(self, fila: int, texto: str):
+        conteo = Counter(tokenizar(texto))
+        if fila >= len(self.longitudes):
+            self.longitudes.extend([0] * (fila + 1 - len(self.longitudes)))
+        self.longitudes[fila] = sum(conteo.values())
+        for termino, tf in conteo.items():
+            self._terminos.append(self._vocab.setdefault(termino, len(self._vocab)))
+            self._filas.append(fila)
+            self._tf.append(tf)
+
+    def cerrar(self, filas: int, vivos: Optional[np.ndarray] = None):
+        """Escribe el segmento de esta corrida y compacta si hay demasiados (antes de confirmar meta.json)"""
+        del self.longitudes[filas:]
+        self.longitudes.extend([0] * (filas - len(self.longitudes)))
+        if self._filas:
+            inicio = min(self._filas)
+            _guardar_segmento(_ruta_segmento(self.ruta, inicio, filas), np.asarray(self._terminos, dtype=np.int64),
+                              np.asarray(self._filas, dtype=np.int64), np.asarray(self._tf, dtype=np.int64),
+                              list(self._vocab))
+        temporal = os.path.join(self.ruta, "bm25_longitudes.tmp.npy")
+        np.save(temporal, np.asarray(self.longitudes, dtype=np.uint32))
+        os.replace(temporal, os.path.join(self.ruta, "bm25_longitudes.npy"))
+        segmentos = _segmentos(self.ruta)
+        if len(segmentos) > BM25_MAX_SEGMENTOS:
+            compactar(self.ruta, segmentos, filas, vivos)
+
+
+def compactar(ruta: str, segmentos: Iterable[Tuple[int, int, str]], filas: int,
+              vivos: Optional[np.ndarray] = None):
+    """Fusiona los segmentos en uno solo, descartando postings de filas muertas"""
+    segmentos = list(segmentos)
+    vocab: Dict[str, int] = {}
+    partes_t, partes_f, partes_tf = [], [], []
+    for _, _, archivo in segmentos:
+        terminos_seg, terminos, filas_seg, tf = _Segmento(archivo).triples()
+        global_ = np.asarray([vocab.setdefault(t, len(vocab)) for t in terminos_seg], dtype=np.int64)
+        mascara = vivos[filas_seg] if vivos is not None else slice(None)
+        partes_t.append(global_[terminos][mascara])
+        partes_f.append(filas_seg[mascara].astype(np.int64))
+        partes_tf.append(tf[mascara].astype(np.int64))
+    _guardar_segmento(_ruta_segmento(ruta, 0, filas), np.concatenate(partes_t), np.concatenate(partes_f),
+                      np.concatenate(partes_tf), list(vocab))
+    for _, _, archivo in segmentos:
+        if archivo != _ruta_segmento(ruta, 0, filas):
+            os.remove(archivo)
+
+# ============================================================================
+# 3. BÚSQUEDA BM25 Y FUSIÓN
+# ============================================================================
+
+
+def existe_bm25(ruta: str) -> bool:
+    return bool(ruta) and os.path.exists(os.path.join(ruta, "bm25_longitudes.npy"))
+
+
+class BM25Index:
+    """Lectura de los segmentos de un índice local confirmado (filas = meta.json)"""
+
+    def __init__(self, ruta: str, filas: int, vivos: np.ndarray, k1: float = BM25_K1, b: float = BM25_B):
+        self.longitudes = np.load(os.path.join(ruta, "bm25_longitudes.npy"))[:filas].astype(np.float32)
+        self.segmentos = [_Segmento(archivo) for _, fin, archivo in _segmentos(ruta) if fin <= filas]
+        self.vivos = vivos[:filas]
+        self.k1, self.b = k1, b
+        self.documentos = int(self.vivos.sum())
+        self.longitud_media = float(self.longitudes[self.vivos].mean()) if self.documentos else 0.0
+
+    def buscar(self, texto: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """(puntajes, filas) de las k filas vivas con mayor BM25, de mayor a menor"""
+        filas_q, puntajes_q = [], []
+        for termino in set(tokenizar(texto)):
+            filas, tf = [], []
+            for segmento in self.segmentos:
+                f, t = segmento.postings(termino)
+                filas.append(f)
+                tf.append(t)
+            filas, tf = np.concatenate(filas), np.concatenate(tf).astype(np.float32)
+            vivas = self.vivos[filas]
+            filas, tf = filas[vivas], tf[vivas]
+            if not len(filas):
+                continue
+            idf = np.log1p((self.documentos - len(filas) + 0.5) / (len(filas) + 0.5))
+            norma = self.k1 * (1 - self.b + self.b * self.longitudes[filas] / max(self.longitud_media, 1e-9))
+            filas_q.append(filas)
+            puntajes_q.append(idf * tf * (self.k1 + 1) / (tf + norma))
+        if not filas_q:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+        filas, inversa = np.unique(np.concatenate(filas_q), return_inverse=True)
+        puntajes = np.bincount(inversa, weights=np.concatenate(puntajes_q))
+        kk = min(k, len(filas))
+        mejores = np.argpartition(-puntajes, kk - 1)[:kk]
+        mejores = mejores[np.argsort(-puntajes[mejores], kind="stable")]
+        return puntajes[mejores].astype(np.float32), filas[mejores].astype(np.int64)
+
+
+def fusion_rrf(rankings: Sequence[Sequence[int]], k: int, constante: int = RRF_K) -> List[Tuple[int, float]]:
+    """Reciprocal-rank fusion: suma 1 / (constante + posición) de cada lista; solo usa rangos, no puntajes"""
+    puntajes: Dict[int, float] = {}
+    for ranking in rankings:
+        for posicion, fila in enumerate(ranking, start=1):
+            puntajes[fila] = puntajes.get(fila, 0.0) + 1.0 / (constante + posicion)
+    return sorted(puntajes.items(), key=lambda item: -item[1])[:k]
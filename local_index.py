@@ -0,0 +1,560 @@
+"""
+Índice vectorial local del corpus RAG
+Embeddings en una matriz float32 mapeada en memoria, búsqueda top-k exacta vectorizada o IVF aproximada, sin Weaviate
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from context_packer import RAG_CONTEXT_TOKENS, empaquetar_contexto
+from lexical_index import BM25Index, BM25Writer, existe_bm25, fusion_rrf
+
+logger = logging.getLogger(__name__)
+
+# Directorio del índice (lo escribe ingestion_pipeline --local-index); vacío = sin índice local
+RAG_LOCAL_INDEX = os.getenv("RAG_LOCAL_INDEX", "")
+# weaviate: nunca el índice local | local: siempre | auto: solo con el circuito de Weaviate abierto
+RAG_RETRIEVAL = os.getenv("RAG_RETRIEVAL", "auto").lower()
+# Desde cuántos fragmentos se usa IVF en lugar de la búsqueda exacta (se entrena al ingerir, no al consultar)
+LOCAL_INDEX_IVF_MIN = int(os.getenv("LOCAL_INDEX_IVF_MIN", "200000"))
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "16"))
+# Fusión BM25 + vectores (si el índice tiene BM25) y candidatos que aporta cada lista a la fusión
+RAG_HYBRID = os.getenv("RAG_HYBRID", "true").lower() == "true"
+RAG_HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))
+# Fracción de filas muertas (lápidas) a partir de la cual la ingesta compacta el índice
+LOCAL_INDEX_COMPACT_RATIO = float(os.getenv("LOCAL_INDEX_COMPACT_RATIO", "0.25"))
+# Filas por bloque de la búsqueda exacta: acota la matriz de similitudes temporal
+BLOQUE_FILAS = 65536
+
+# ============================================================================
+# 1. ALMACÉN EN DISCO
+# ============================================================================
+#   meta.json          dimensión, filas confirmadas y directorio de datos de la generación vigente
+#   [g<N>/]            datos de la generación N (la 0, sin compactar nunca, vive en la raíz):
+#     vectores.f32       matriz (filas, dimensión) float32 normalizada, mapeada con np.memmap
+#     fragmentos.jsonl   una línea por fila: id, source, chunk_index, content, sha256
+#     offsets.npy        inicio de cada línea en fragmentos.jsonl (filas + 1)
+#     vivos.npy          False en filas reemplazadas o borradas (lápidas)
+#     bm25_*             índice invertido de los textos (ver lexical_index)
+#     ivf*               listas IVF, entrenadas por la ingesta
+# Compactar escribe una generación nueva y la confirma reescribiendo meta.json.
+
+ARCHIVOS_DATOS = ("vectores.f32", "fragmentos.jsonl", "offsets.npy", "vivos.npy")
+_GENERACION = re.compile(r"g\d+")
+
+
+def _rutas(ruta: str, datos: str = "") -> Dict[str, str]:
+    rutas = {n.split(".")[0]: os.path.join(ruta, datos, n) for n in ARCHIVOS_DATOS}
+    rutas["meta"] = os.path.join(ruta, "meta.json")
+    return rutas
+
+
+def existe_indice(ruta: str) -> bool:
+    return bool(ruta) and os.path.exists(_rutas(ruta)["meta"])
+
+
+def _leer_meta(ruta: str) -> Dict[str, Any]:
+    with open(_rutas(ruta)["meta"], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _escribir_meta(ruta: str, meta: Dict[str, Any]):
+    destino = _rutas(ruta)["meta"]
+    temporal = f"{destino}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temporal, destino)
+
+
+def _guardar_npy(ruta: str, arreglo: np.ndarray):
+    temporal = f"{ruta}.tmp.npy"
+    np.save(temporal, arreglo)
+    os.replace(temporal, ruta)
+
+
+def _borrar_generacion(ruta: str, datos: str):
+    """Borra los datos de una generación ya reemplazada (los mmaps abiertos siguen siendo válidos)"""
+    if datos:
+        shutil.rmtree(os.path.join(ruta, datos), ignore_errors=True)
+        return
+    for nombre in os.listdir(ruta):
+        if nombre in ARCHIVOS_DATOS or nombre.startswith(("bm25_", "ivf")):
+            os.remove(os.path.join(ruta, nombre))
+
+
+class VectorStore:
+    """Lectura del índice: la matriz no se carga en RAM, el sistema operativo pagina lo que se usa"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        meta = _leer_meta(ruta)
+        rutas = _rutas(ruta, meta.get("datos", ""))
+        # Directorio de la generación vigente: BM25 e IVF viven junto a los vectores
+        self.datos = os.path.dirname(rutas["vectores"])
+        self.dimension: int = meta["dimension"]
+        self.filas: int = meta["filas"]
+        self.vectores = (np.memmap(rutas["vectores"], dtype=np.float32, mode="r", shape=(self.filas, self.dimension))
+                         if self.filas else np.zeros((0, self.dimension), dtype=np.float32))
+        self.offsets = np.load(rutas["offsets"])
+        self.vivos = np.load(rutas["vivos"])
+        self._archivo = open(rutas["fragmentos"], "rb")
+        self._textos = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ) if self.filas else b""
+
+    def __len__(self) -> int:
+        return int(self.vivos.sum())
+
+    def fragmento(self, fila: int) -> Dict[str, Any]:
+        return json.loads(self._textos[self.offsets[fila]:self.offsets[fila + 1]])
+
+    def cerrar(self):
+        if isinstance(self._textos, mmap.mmap):
+            self._textos.close()
+        self._archivo.close()
+
+
+class LocalIndexSink:
+    """Destino de ingestion_pipeline que escribe el almacén local (mismo contrato que WeaviateSink).
+
+    Solo agrega filas: un upsert de un id existente deja lápida en la fila
+    anterior. meta.json se escribe al cerrar y es la fuente de verdad; al
+    reabrir se descarta lo que quedó escrito después de la última confirmación.
+    Al cerrar, si las lápidas superan LOCAL_INDEX_COMPACT_RATIO se compacta,
+    y con ivf_min filas o más se entrena el IVF: las consultas solo lo cargan.
+    """
+
+    def __init__(self, ruta: str, dimension: Optional[int] = None, ivf_min: Optional[int] = LOCAL_INDEX_IVF_MIN,
+                 umbral_compactacion: float = LOCAL_INDEX_COMPACT_RATIO):
+        os.makedirs(ruta, exist_ok=True)
+        self.ruta = ruta
+        self.ivf_min = ivf_min
+        self.umbral_compactacion = umbral_compactacion
+        self.dimension = dimension
+        self._meta: Dict[str, Any] = {"version": 1}
+        self._offsets: List[int] = [0]
+        self._vivos = bytearray()
+        self._ids: Dict[str, int] = {}
+        self._por_fuente: Dict[str, Dict[int, int]] = {}
+        filas = 0
+        if existe_indice(ruta):
+            self._meta = _leer_meta(ruta)
+            self.dimension, filas = self._meta["dimension"], self._meta["filas"]
+        generacion = self._meta.get("datos", "")
+        self._limpiar_generaciones(generacion)
+        self._rutas = _rutas(ruta, generacion)
+        if filas:
+            self._offsets = np.load(self._rutas["offsets"]).tolist()[:filas + 1]
+            self._vivos = bytearray(np.load(self._rutas["vivos"])[:filas].astype(np.uint8).tobytes())
+        self._bm25 = BM25Writer(os.path.dirname(self._rutas["vectores"]), filas)
+        # Índice creado antes de BM25: sus textos se indexan una sola vez
+        reindexar = not self._bm25.completo
+        if filas:
+            with open(self._rutas["fragmentos"], "rb") as f:
+                for fila in range(filas):
+                    datos = json.loads(f.readline())
+                    if self._vivos[fila]:
+                        self._registrar(datos["id"], datos["source"], datos["chunk_index"], fila)
+                        if reindexar:
+                            self._bm25.agregar(fila, datos["content"])
+        self._archivo_vectores = open(self._rutas["vectores"], "ab")
+        self._archivo_textos = open(self._rutas["fragmentos"], "ab")
+        self._archivo_vectores.truncate(filas * (self.dimension or 0) * 4)
+        self._archivo_textos.truncate(self._offsets[-1])
+
+    def _limpiar_generaciones(self, vigente: str):
+        """Generaciones que una compactación interrumpida dejó sin confirmar (o sin borrar)"""
+        for nombre in os.listdir(self.ruta):
+            if _GENERACION.fullmatch(nombre) and nombre != vigente:
+                _borrar_generacion(self.ruta, nombre)
+        if vigente:
+            _borrar_generacion(self.ruta, "")
+
+    def _registrar(self, id_: str, fuente: str, indice: int, fila: int):
+        self._ids[id_] = fila
+        self._por_fuente.setdefault(fuente, {})[indice] = fila
+
+    def upsert(self, fragmentos: Sequence[Any], vectores: np.ndarray):
+        vectores = np.ascontiguousarray(vectores, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = vectores.shape[1]
+        elif vectores.shape[1] != self.dimension:
+            raise ValueError(f"dimensión {vectores.shape[1]} distinta de la del índice ({self.dimension})")
+        normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+        self._archivo_vectores.write((vectores / np.maximum(normas, 1e-12)).tobytes())
+        for f in fragmentos:
+            previa = self._ids.get(f.id)
+            if previa is not None:
+                self._vivos[previa] = 0
+            linea = json.dumps({"id": f.id, "source": f.fuente, "chunk_index": f.indice, "content": f.texto,
+                                "sha256": f.sha256}, ensure_ascii=False).encode("utf-8") + b"\n"
+            self._archivo_textos.write(linea)
+            self._registrar(f.id, f.fuente, f.indice, len(self._vivos))
+            self._bm25.agregar(len(self._vivos), f.texto)
+            self._vivos.append(1)
+            self._offsets.append(self._offsets[-1] + len(linea))
+
+    def borrar(self, fuente: str, desde_indice: int = 0):
+        filas = self._por_fuente.get(fuente, {})
+        for indice in [i for i in filas if i >= desde_indice]:
+            self._vivos[filas.pop(indice)] = 0
+        if not filas:
+            self._por_fuente.pop(fuente, None)
+
+    def cerrar(self):
+        self._archivo_vectores.close()
+        self._archivo_textos.close()
+        _guardar_npy(self._rutas["offsets"], np.asarray(self._offsets, dtype=np.int64))
+        vivos = np.frombuffer(bytes(self._vivos), dtype=np.uint8).astype(bool)
+        _guardar_npy(self._rutas["vivos"], vivos)
+        self._bm25.cerrar(len(self._vivos), vivos)
+        _escribir_meta(self.ruta, {**self._meta, "dimension": self.dimension or 0, "filas": len(self._vivos)})
+        if len(vivos) and (~vivos).sum() > self.umbral_compactacion * len(vivos):
+            compactar_indice(self.ruta)
+        if self.ivf_min is not None:
+            entrenar_ivf(self.ruta, self.ivf_min)
+
+
+def compactar_indice(ruta: str) -> int:
+    """Reescribe solo las filas vivas en una generación nueva y la confirma en meta.json.
+
+    Las filas se renumeran, así que BM25 se reconstruye y el IVF queda por
+    reentrenar. Un proceso con el índice abierto sigue leyendo la generación
+    anterior hasta reabrirlo. Devuelve cuántas filas se eliminaron.
+    """
+    meta = _leer_meta(ruta)
+    generacion = meta.get("generacion", 0) + 1
+    nombre = f"g{generacion}"
+    destino = os.path.join(ruta, nombre)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.makedirs(destino)
+    rutas = _rutas(ruta, nombre)
+    store = VectorStore(ruta)
+    try:
+        vivas = np.flatnonzero(store.vivos)
+        offsets = [0]
+        bm25 = BM25Writer(destino, 0)
+        with open(rutas["vectores"], "wb") as vectores, open(rutas["fragmentos"], "wb") as textos:
+            for inicio in range(0, len(vivas), BLOQUE_FILAS):
+                bloque = vivas[inicio:inicio + BLOQUE_FILAS]
+                vectores.write(np.ascontiguousarray(store.vectores[bloque]).tobytes())
+                for nueva, fila in enumerate(bloque, inicio):
+                    linea = store._textos[store.offsets[fila]:store.offsets[fila + 1]]
+                    textos.write(linea)
+                    offsets.append(offsets[-1] + len(linea))
+                    bm25.agregar(nueva, json.loads(linea)["content"])
+        todas = np.ones(len(vivas), dtype=bool)
+        _guardar_npy(rutas["offsets"], np.asarray(offsets, dtype=np.int64))
+        _guardar_npy(rutas["vivos"], todas)
+        bm25.cerrar(len(vivas), todas)
+    finally:
+        store.cerrar()
+    _escribir_meta(ruta, {**meta, "filas": len(vivas), "generacion": generacion, "datos": nombre})
+    _borrar_generacion(ruta, meta.get("datos", ""))
+    logger.info("Índice local compactado: %d -> %d filas", meta["filas"], len(vivas))
+    return meta["filas"] - len(vivas)
+
+
+def entrenar_ivf(ruta: str, ivf_min: int = LOCAL_INDEX_IVF_MIN) -> bool:
+    """Entrena el IVF de un índice confirmado si tiene ivf_min filas y falta o quedó desactualizado"""
+    store = VectorStore(ruta)
+    try:
+        if store.filas < ivf_min:
+            return False
+        ivf = IVFIndex(store)
+        if ivf.cargar() and not ivf.desactualizado:
+            return False
+        logger.info("Entrenando IVF local sobre %d fragmentos", store.filas)
+        ivf.entrenar()
+        return True
+    finally:
+        store.cerrar()
+
+
+# ============================================================================
+# 2. BÚSQUEDA EXACTA
+# ============================================================================
+
+
+def top_k(matriz: np.ndarray, consultas: np.ndarray, k: int, vivos: Optional[np.ndarray] = None,
+          bloque: int = BLOQUE_FILAS) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k por producto interno de cada consulta contra todas las filas.
+
+    Recorre la matriz en bloques contiguos (lectura secuencial del memmap) y
+    conserva k candidatos por bloque con argpartition; nunca materializa la
+    matriz completa de similitudes. Devuelve (puntajes, filas) de forma
+    (consultas, k), ordenados de mayor a menor; -1 donde no hay filas suficientes.
+    """
+    consultas = np.atleast_2d(consultas).astype(np.float32, copy=False)
+    candidatos_p, candidatos_f = [], []
+    for inicio in range(0, len(matriz), bloque):
+        puntajes = consultas @ np.asarray(matriz[inicio:inicio + bloque]).T
+        if vivos is not None:
+            puntajes[:, ~vivos[inicio:inicio + bloque]] = -np.inf
+        kk = min(k, puntajes.shape[1])
+        mejores = np.argpartition(-puntajes, kk - 1, axis=1)[:, :kk]
+        candidatos_p.append(np.take_along_axis(puntajes, mejores, axis=1))
+        candidatos_f.append(mejores + inicio)
+    return _fusionar(candidatos_p, candidatos_f, k, len(consultas))
+
+
+def _fusionar(puntajes: List[np.ndarray], filas: List[np.ndarray], k: int,
+              n_consultas: int) -> Tuple[np.ndarray, np.ndarray]:
+    if not puntajes:
+        return np.full((n_consultas, 0), -np.inf, dtype=np.float32), np.full((n_consultas, 0), -1)
+    puntajes_c, filas_c = np.hstack(puntajes), np.hstack(filas)
+    orden = np.argsort(-puntajes_c, axis=1, kind="stable")[:, :k]
+    puntajes_c = np.take_along_axis(puntajes_c, orden, axis=1)
+    filas_c = np.where(np.isfinite(puntajes_c), np.take_along_axis(filas_c, orden, axis=1), -1)
+    return puntajes_c, filas_c
+
+# ============================================================================
+# 3. ÍNDICE IVF (APROXIMADO)
+# ============================================================================
+
+
+class IVFIndex:
+    """Listas invertidas sobre centroides k-means esféricos.
+
+    Las filas se reordenan por lista en una copia (ivf_vectores.f32): cada
+    lista sondeada es un tramo contiguo del memmap. Una consulta compara
+    contra los centroides y solo contra las filas de las nprobe listas más
+    cercanas. Las filas agregadas después del entrenamiento (la cola) se
+    buscan de forma exacta hasta reentrenar.
+    """
+
+    def __init__(self, store: VectorStore, nprobe: int = LOCAL_INDEX_NPROBE):
+        self.store = store
+        self.nprobe = nprobe
+        self.filas_entrenadas = 0
+        self.centroides: Optional[np.ndarray] = None
+        self.orden: Optional[np.ndarray] = None
+        self.limites: Optional[np.ndarray] = None
+        self.vectores: Optional[np.ndarray] = None
+        self._meta = os.path.join(store.datos, "ivf.json")
+
+    @property
+    def entrenado(self) -> bool:
+        return self.centroides is not None
+
+    @property
+    def desactualizado(self) -> bool:
+        """Más del 10% de las filas quedó fuera de las listas"""
+        return not self.entrenado or self.store.filas - self.filas_entrenadas > 0.1 * self.store.filas
+
+    def cargar(self) -> bool:
+        if not os.path.exists(self._meta):
+            return False
+        with open(self._meta, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["filas"] > self.store.filas or meta["dimension"] != self.store.dimension:
+            return False
+        datos = np.load(os.path.join(self.store.datos, "ivf.npz"))
+        if len(datos["orden"]) != meta["filas"]:
+            return False
+        self.filas_entrenadas = meta["filas"]
+        self.centroides, self.orden, self.limites = datos["centroides"], datos["orden"], datos["limites"]
+        self.vectores = np.memmap(os.path.join(self.store.datos, "ivf_vectores.f32"), dtype=np.float32, mode="r",
+                                  shape=(self.filas_entrenadas, self.store.dimension))
+        return True
+
+    def entrenar(self, listas: Optional[int] = None, iteraciones: int = 10, por_lista: int = 32, semilla: int = 0):
+        """k-means sobre una muestra (por_lista filas por centroide) y asignación de todas las filas"""
+        store = self.store
+        n = store.filas
+        listas = listas or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(semilla)
+        muestra = np.asarray(store.vectores[np.sort(rng.choice(n, min(n, listas * por_lista), replace=False))])
+        centroides = muestra[rng.choice(len(muestra), listas, replace=False)].copy()
+        for _ in range(iteraciones):
+            asignacion = self._asignar(muestra, centroides)
+            sumas = np.zeros_like(centroides)
+            np.add.at(sumas, asignacion, muestra)
+            vacias = np.bincount(asignacion, minlength=listas) == 0
+            sumas[vacias] = muestra[rng.choice(len(muestra), int(vacias.sum()))]
+            centroides = sumas / np.maximum(np.linalg.norm(sumas, axis=1, keepdims=True), 1e-12)
+
+        asignacion = np.concatenate([self._asignar(np.asarray(store.vectores[i:i + BLOQUE_FILAS]), centroides)
+                                     for i in range(0, n, BLOQUE_FILAS)])
+        orden = np.argsort(asignacion, kind="stable").astype(np.int64)
+        limites = np.searchsorted(asignacion[orden], np.arange(listas + 1)).astype(np.int64)
+
+        ruta_vectores = os.path.join(store.datos, "ivf_vectores.f32")
+        copia = np.memmap(f"{ruta_vectores}.tmp", dtype=np.float32, mode="w+", shape=(n, store.dimension))
+        for i in range(0, n, BLOQUE_FILAS):
+            filas = orden[i:i + BLOQUE_FILAS]
+            # Lectura en orden creciente dentro del bloque: el memmap se recorre hacia adelante
+            por_fila = np.argsort(filas)
+            copia[i + por_fila] = store.vectores[filas[por_fila]]
+        copia.flush()
+        del copia
+        os.replace(f"{ruta_vectores}.tmp", ruta_vectores)
+        ruta_listas = os.path.join(store.datos, "ivf.npz")
+        np.savez(f"{ruta_listas}.tmp.npz", centroides=centroides, orden=orden, limites=limites)
+        os.replace(f"{ruta_listas}.tmp.npz", ruta_listas)
+        # ivf.json al final: confirma las listas
+        with open(f"{self._meta}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"filas": n, "listas": listas, "dimension": store.dimension}, f)
+        os.replace(f"{self._meta}.tmp", self._meta)
+        self.cargar()
+
+    @staticmethod
+    def _asignar(filas: np.ndarray, centroides: np.ndarray) -> np.ndarray:
+        return np.argmax(filas @ centroides.T, axis=1)
+
+    def buscar(self, consultas: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        consultas = np.atleast_2d(consultas).astype(np.float32, copy=False)
+        nprobe = min(self.nprobe, len(self.centroides))
+        sondeos = np.argpartition(-(consultas @ self.centroides.T), nprobe - 1, axis=1)[:, :nprobe]
+        vivos = self.store.vivos
+        puntajes_q, filas_q = [], []
+        for consulta, listas in zip(consultas, sondeos):
+            tramos = [(self.limites[l], self.limites[l + 1]) for l in listas]
+            posiciones = np.concatenate([np.arange(a, b) for a, b in tramos])
+            puntajes = np.concatenate([np.asarray(self.vectores[a:b]) @ consulta for a, b in tramos])
+            filas = self.orden[posiciones]
+            puntajes[~vivos[filas]] = -np.inf
+            kk = min(k, len(puntajes))
+            mejores = np.argpartition(-puntajes, kk - 1)[:kk] if kk else np.zeros(0, dtype=np.int64)
+            puntajes_q.append(puntajes[mejores][None, :])
+            filas_q.append(filas[mejores][None, :])
+        candidatos_p = [np.vstack([_rellenar(p, k) for p in puntajes_q])]
+        candidatos_f = [np.vstack([_rellenar(f, k, -1) for f in filas_q])]
+        if self.store.filas > self.filas_entrenadas:
+            cola = self.store.vectores[self.filas_entrenadas:]
+            p, f = top_k(cola, consultas, k, vivos[self.filas_entrenadas:])
+            candidatos_p.append(p)
+            candidatos_f.append(np.where(f >= 0, f + self.filas_entrenadas, -1))
+        return _fusionar(candidatos_p, candidatos_f, k, len(consultas))
+
+
+def _rellenar(fila: np.ndarray, k: int, valor: float = -np.inf) -> np.ndarray:
+    if fila.shape[1] >= k:
+        return fila
+    return np.hstack([fila, np.full((1, k - fila.shape[1]), valor, dtype=fila.dtype)])
+
+# ============================================================================
+# 4. RECUPERACIÓN LOCAL PARA EL RAG
+# ============================================================================
+
+
+class LocalRetriever:
+    """rag_query sobre el índice local: embedding de la pregunta -> top-k -> DeepSeek con el contexto.
+
+    Con menos de ivf_min fragmentos busca de forma exacta; con más usa el
+    IVF que entrenó la ingesta (sin él, búsqueda exacta: entrenar aquí
+    bloquearía la primera consulta y cada worker escribiría los mismos
+    archivos). Si el índice tiene BM25 y hibrido=True, los candidatos
+    vectoriales y los léxicos se fusionan por RRF: los términos exactos
+    ("CAT", "Oro") cuentan aunque el embedding los diluya.
+    """
+
+    def __init__(self, ruta: str, embedder: Callable[[str], Any], generar: Optional[Callable[[str], str]] = None,
+                 ivf_min: int = LOCAL_INDEX_IVF_MIN, nprobe: int = LOCAL_INDEX_NPROBE, hibrido: bool = RAG_HYBRID,
+                 candidatos: int = RAG_HYBRID_CANDIDATES, presupuesto_contexto: int = RAG_CONTEXT_TOKENS):
+        self.store = VectorStore(ruta)
+        self.embedder = embedder
+        self.generar = generar
+        self.candidatos = candidatos
+        self.presupuesto_contexto = presupuesto_contexto
+        self.bm25: Optional[BM25Index] = (BM25Index(self.store.datos, self.store.filas, self.store.vivos)
+                                          if hibrido and existe_bm25(self.store.datos) else None)
+        self.ivf: Optional[IVFIndex] = None
+        if self.store.filas >= ivf_min:
+            ivf = IVFIndex(self.store, nprobe)
+            if not ivf.cargar():
+                logger.warning("Índice local de %d fragmentos sin IVF: búsqueda exacta hasta reingestar "
+                               "(ingestion_pipeline --local-index lo entrena)", self.store.filas)
+            else:
+                self.ivf = ivf
+                if ivf.desactualizado:
+                    logger.warning("IVF local desactualizado (%d de %d filas): las nuevas se buscan de forma "
+                                   "exacta hasta reingestar", ivf.filas_entrenadas, self.store.filas)
+
+    def buscar_vectores(self, consultas: np.ndarray, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        if self.ivf is not None:
+            return self.ivf.buscar(consultas, k)
+        return top_k(self.store.vectores, consultas, k, self.store.vivos)
+
+    def _vector(self, texto: str) -> np.ndarray:
+        vector = np.asarray(self.embedder(texto), dtype=np.float32).ravel()
+        if vector.shape[0] != self.store.dimension:
+            raise ValueError(f"el embedder produce dimensión {vector.shape[0]}, el índice {self.store.dimension}")
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def buscar(self, texto: str, k: int = 3, modo: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top-k fragmentos; modo 'vector', 'bm25' o 'hibrido' (por defecto híbrido si hay BM25)"""
+        modo = modo or ("hibrido" if self.bm25 is not None else "vector")
+        if modo == "vector":
+            puntajes, filas = self.buscar_vectores(self._vector(texto), k)
+            resultado = [(int(f), float(p)) for p, f in zip(puntajes[0], filas[0]) if f >= 0]
+        elif self.bm25 is None:
+            raise ValueError(f"modo {modo!r} sin índice BM25 (reingestar con ingestion_pipeline --local-index)")
+        elif modo == "bm25":
+            puntajes, filas = self.bm25.buscar(texto, k)
+            resultado = [(int(f), float(p)) for p, f in zip(puntajes, filas)]
+        else:
+            _, vectoriales = self.buscar_vectores(self._vector(texto), self.candidatos)
+            _, lexicas = self.bm25.buscar(texto, self.candidatos)
+            resultado = fusion_rrf([[int(f) for f in vectoriales[0] if f >= 0], lexicas.tolist()], k)
+        return [{**self.store.fragmento(f), "score": p} for f, p in resultado]
+
+    def rag_query(self, pregunta: str, k: int = 3) -> dict:
+        fragmentos = self.buscar(pregunta, k)
+        # Sin solapes ni frases repetidas y dentro de RAG_CONTEXT_TOKENS: el prompt no crece con k
+        contexto = empaquetar_contexto(pregunta, fragmentos, self.presupuesto_contexto)
+        prompt = ("Responde la pregunta usando solo el contexto de documentos bancarios.\n\n"
+                  f"Contexto:\n{contexto.texto}\n\nPregunta: {pregunta}\nRespuesta:")
+        respuesta = self.generar(prompt) if self.generar else contexto.texto
+        fuentes = [{"source": f["source"], "chunk_index": f["chunk_index"], "score": f["score"]} for f in fragmentos]
+        return {"response": respuesta, "sources": fuentes, "context_tokens": contexto.tokens,
+                "context_tokens_saved": contexto.tokens_ahorrados}
+
+
+# Por sistema RAG (referencia débil: un sistema reemplazado no hereda el recuperador de otro)
+_retrievers: "weakref.WeakKeyDictionary[Any, Tuple[tuple, Optional[LocalRetriever]]]" = weakref.WeakKeyDictionary()
+_retrievers_lock = threading.Lock()
+
+
+def _version_indice(ruta: str) -> tuple:
+    """Filas confirmadas y generación: cambian con cada ingesta que agrega filas o compacta"""
+    meta = _leer_meta(ruta)
+    return meta["filas"], meta.get("datos", "")
+
+
+def get_local_retriever(rag_system) -> Optional[LocalRetriever]:
+    """Recuperador local del sistema RAG (None si RAG_LOCAL_INDEX no apunta a un índice).
+
+    Se reconstruye cuando meta.json confirma otra versión del índice: una
+    reingesta con el proceso en marcha no deja filas ni IDF viejos.
+    """
+    if RAG_RETRIEVAL == "weaviate" or not existe_indice(RAG_LOCAL_INDEX):
+        return None
+    version = _version_indice(RAG_LOCAL_INDEX)
+    with _retrievers_lock:
+        try:
+            previo = _retrievers.get(rag_system)
+        except TypeError:
+            previo = None  # Objeto sin weakref/hash: recuperador no compartido
+        if previo is not None and previo[0] == version:
+            return previo[1]
+        from semantic_cache import resolver_embedder
+
+        embedder = resolver_embedder(rag_system)
+        retriever = (LocalRetriever(RAG_LOCAL_INDEX, embedder, getattr(rag_system, "query_deepseek", None))
+                     if embedder else None)
+        if previo is not None:
+            logger.info("Índice local %s cambió (%s -> %s): recuperador recargado",
+                        RAG_LOCAL_INDEX, previo[0], version)
+        try:
+            _retrievers[rag_system] = (version, retriever)
+        except TypeError:
+            pass
+        return retriever
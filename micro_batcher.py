@@ -0,0 +1,237 @@
+"""
+Micro-lotes para el sistema RAG compartido
+Junta llamadas concurrentes de embeddings y generación en una sola llamada por lote y reparte los resultados
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence
+
+from semantic_cache import resolver_embedder
+from telemetry import get_telemetry
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima (s) desde la primera petición del lote y tamaño máximo del lote
+RAG_BATCH_WINDOW = float(os.getenv("RAG_BATCH_WINDOW", "0.005"))
+RAG_BATCH_MAX_SIZE = int(os.getenv("RAG_BATCH_MAX_SIZE", "16"))
+# Peticiones encoladas antes de rechazar (protege la memoria si el modelo se atasca)
+RAG_BATCH_MAX_QUEUE = int(os.getenv("RAG_BATCH_MAX_QUEUE", "1024"))
+
+# ============================================================================
+# 1. PLANIFICADOR DE LOTES
+# ============================================================================
+
+
+class BatchQueueFull(RuntimeError):
+    """La cola del lote está llena: el llamador debe reintentar o degradarse"""
+
+
+class _Pendiente:
+    __slots__ = ("item", "futuro", "encolado")
+
+    def __init__(self, item):
+        self.item = item
+        self.futuro: Future = Future()
+        self.encolado = time.monotonic()
+
+
+class MicroBatcher:
+    """Agrupa peticiones concurrentes y las procesa con una sola llamada.
+
+    Un hilo despachador toma la primera petición pendiente, espera hasta
+    `ventana` segundos (o hasta juntar `max_lote`) y llama
+    procesar_lote(items) -> resultados en el mismo orden. Mientras un lote
+    se procesa, el siguiente se va llenando: con poca carga cada petición
+    espera como mucho la ventana; con mucha, los lotes crecen solos.
+    Con deduplicar=True los items idénticos del lote se calculan una vez.
+    """
+
+    def __init__(self, procesar_lote: Callable[[List[Any]], Sequence[Any]], nombre: str,
+                 ventana: float = RAG_BATCH_WINDOW, max_lote: int = RAG_BATCH_MAX_SIZE,
+                 max_cola: int = RAG_BATCH_MAX_QUEUE, deduplicar: bool = True):
+        self.procesar_lote = procesar_lote
+        self.nombre = nombre
+        self.ventana = ventana
+        self.max_lote = max_lote
+        self.max_cola = max_cola
+        self.deduplicar = deduplicar
+        self._cola: Deque[_Pendiente] = deque()
+        self._cond = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+        self._telemetria = get_telemetry()
+        self.lotes = 0
+        self.elementos = 0
+        self.calculados = 0
+        self.rechazados = 0
+        self.lote_max = 0
+        self.profundidad_max = 0
+        self.espera_total = 0.0
+
+    def enviar(self, item: Hashable, timeout: Optional[float] = None) -> Any:
+        """Encola el item y bloquea hasta que su lote termine"""
+        pendiente = _Pendiente(item)
+        with self._cond:
+            if len(self._cola) >= self.max_cola:
+                self.rechazados += 1
+                raise BatchQueueFull(f"cola de {self.nombre} llena ({self.max_cola})")
+            self._cola.append(pendiente)
+            self.profundidad_max = max(self.profundidad_max, len(self._cola))
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name=f"lote-{self.nombre}", daemon=True)
+                self._hilo.start()
+            self._cond.notify()
+        return pendiente.futuro.result(timeout)
+
+    def _tomar_lote(self) -> List[_Pendiente]:
+        with self._cond:
+            while not self._cola:
+                self._cond.wait()
+            limite = self._cola[0].encolado + self.ventana
+            while len(self._cola) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._cond.wait(restante)
+            return [self._cola.popleft() for _ in range(min(self.max_lote, len(self._cola)))]
+
+    def _ciclo(self):
+        while True:
+            lote = self._tomar_lote()
+            inicio = time.monotonic()
+            for pendiente in lote:
+                self.espera_total += inicio - pendiente.encolado
+            try:
+                self._resolver(lote)
+            except Exception as e:
+                logger.warning("Lote de %s (%d peticiones) falló: %s", self.nombre, len(lote), e)
+                for pendiente in lote:
+                    if not pendiente.futuro.done():
+                        pendiente.futuro.set_exception(e)
+
+    def _resolver(self, lote: List[_Pendiente]):
+        if self.deduplicar:
+            # dict conserva el orden de inserción: primer item de cada grupo
+            grupos: Dict[Hashable, List[_Pendiente]] = {}
+            for pendiente in lote:
+                grupos.setdefault(pendiente.item, []).append(pendiente)
+            items = list(grupos)
+        else:
+            grupos = None
+            items = [p.item for p in lote]
+
+        with self._telemetria.span(f"batch.{self.nombre}", tamano=len(lote), calculados=len(items)):
+            resultados = list(self.procesar_lote(items))
+        if len(resultados) != len(items):
+            raise RuntimeError(f"{self.nombre}: {len(resultados)} resultados para {len(items)} entradas")
+
+        self.lotes += 1
+        self.elementos += len(lote)
+        self.calculados += len(items)
+        self.lote_max = max(self.lote_max, len(lote))
+        if grupos is None:
+            for pendiente, resultado in zip(lote, resultados):
+                pendiente.futuro.set_result(resultado)
+        else:
+            for (_, pendientes), resultado in zip(grupos.items(), resultados):
+                for pendiente in pendientes:
+                    pendiente.futuro.set_result(resultado)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lotes": self.lotes,
+            "elementos": self.elementos,
+            "calculados": self.calculados,
+            "lote_medio": self.elementos / self.lotes if self.lotes else 0.0,
+            "lote_max": self.lote_max,
+            "profundidad_cola": len(self._cola),
+            "profundidad_max": self.profundidad_max,
+            "espera_media": self.espera_total / self.elementos if self.elementos else 0.0,
+            "rechazados": self.rechazados,
+        }
+
+# ============================================================================
+# 2. SISTEMA RAG CON MICRO-LOTES
+# ============================================================================
+
+
+class BatchingRAGSystem:
+    """Envoltura del sistema RAG compartido que hace pasar por micro-lotes
+    embed_query, query_deepseek y rag_query.
+
+    Solo se agrupan las operaciones para las que el sistema tiene método
+    por lotes (embed_documents o un SentenceTransformer, query_deepseek_batch,
+    rag_query_batch). Las demás se delegan tal cual: repartir un lote sobre
+    el método individual no ahorra pasadas del modelo y solo añade la
+    ventana y el bloqueo detrás del lote anterior. query_deepseek_stream y
+    el resto de atributos también se delegan sin cambios.
+    """
+
+    def __init__(self, rag_system, ventana: float = RAG_BATCH_WINDOW, max_lote: int = RAG_BATCH_MAX_SIZE):
+        self._rag_system = rag_system
+        procesadores = {
+            "embed_query": resolver_embedder(rag_system, lote=True),
+            "query_deepseek": getattr(rag_system, "query_deepseek_batch", None),
+            "rag_query": self._consultas if callable(getattr(rag_system, "rag_query_batch", None)) else None,
+        }
+        self.lotes: Dict[str, MicroBatcher] = {
+            nombre: MicroBatcher(procesar, nombre, ventana, max_lote)
+            for nombre, procesar in procesadores.items() if callable(procesar)
+        }
+
+    @property
+    def sistema(self):
+        return getattr(self._rag_system, "sistema", self._rag_system)
+
+    def __getattr__(self, nombre: str):
+        return getattr(self._rag_system, nombre)
+
+    def _consultas(self, items: List[tuple]) -> List[dict]:
+        # Un lote por cada k distinto (casi siempre uno solo)
+        resultados: Dict[tuple, dict] = {}
+        for k in {k for _, k in items}:
+            preguntas = [p for p, kk in items if kk == k]
+            for pregunta, resultado in zip(preguntas, self._rag_system.rag_query_batch(preguntas, k=k)):
+                resultados[(pregunta, k)] = resultado
+        return [resultados[item] for item in items]
+
+    # ---- interfaz del sistema RAG ----
+
+    @property
+    def embed_query(self) -> Callable[[str], Any]:
+        # Propiedad y no método: sin embedder el AttributeError del sistema envuelto llega a
+        # resolver_embedder y la caché semántica se degrada a coincidencia exacta, como sin lotes
+        lote = self.lotes.get("embed_query")
+        return lote.enviar if lote is not None else self._rag_system.embed_query
+
+    def query_deepseek(self, prompt: str) -> str:
+        lote = self.lotes.get("query_deepseek")
+        return lote.enviar(prompt) if lote is not None else self._rag_system.query_deepseek(prompt)
+
+    def rag_query(self, pregunta: str, k: int = 3) -> dict:
+        lote = self.lotes.get("rag_query")
+        return lote.enviar((pregunta, k)) if lote is not None else self._rag_system.rag_query(pregunta, k=k)
+
+    def batch_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {nombre: lote.stats() for nombre, lote in self.lotes.items()}
+
+
+def metricas_prometheus(stats: Dict[str, Dict[str, Any]], prefijo: str = "banking_agent") -> str:
+    """Profundidad de cola y tamaño de lote en formato de texto de Prometheus"""
+    series = (
+        ("batch_queue_depth", "gauge", "profundidad_cola", "Peticiones esperando lote"),
+        ("batch_queue_depth_max", "gauge", "profundidad_max", "Máxima profundidad de cola observada"),
+        ("batch_size_mean", "gauge", "lote_medio", "Tamaño medio de lote"),
+        ("batches_total", "counter", "lotes", "Lotes procesados"),
+        ("batch_items_total", "counter", "elementos", "Peticiones atendidas por lotes"),
+        ("batch_rejected_total", "counter", "rechazados", "Peticiones rechazadas con la cola llena"),
+    )
+    lineas = []
+    for metrica, tipo, clave, ayuda in series:
+        lineas += [f"# HELP {prefijo}_{metrica} {ayuda}", f"# TYPE {prefijo}_{metrica} {tipo}"]
+        lineas += [f'{prefijo}_{metrica}{{operacion="{nombre}"}} {datos[clave]:g}' for nombre, datos in stats.items()]
+    return "\n".join(lineas) + "\n"
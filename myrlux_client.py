@@ -0,0 +1,333 @@
+"""
+Cliente HTTP compartido para MyrluxBack
+Pool de conexiones keep-alive (sync + async) reutilizado por todas las sesiones del agente
+"""
+
+import asyncio
+import codecs
+import json
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# ============================================================================
+# 1. CONFIGURACIÓN
+# ============================================================================
+
+MYRLUX_BASE_URL = os.getenv("MYRLUX_API_URL", "http://localhost:11002/api")
+
+
+@dataclass(frozen=True)
+class MyrluxClientConfig:
+    """Límites del pool y timeouts del cliente MyrluxBack"""
+    base_url: str = MYRLUX_BASE_URL
+    max_connections: int = 20           # Conexiones simultáneas por host
+    max_keepalive_connections: int = 10  # Conexiones ociosas que se conservan abiertas
+    keepalive_expiry: float = 30.0      # Segundos antes de cerrar una conexión ociosa
+    connect_timeout: float = 2.0
+    read_timeout: float = 10.0
+    # Envía page/size (Spring Pageable) en los listados. Solo para un servidor que responda Page:
+    # uno que respete size pero devuelva un arreglo plano haría que el total fuera el tamaño de página
+    paginate_lists: bool = False
+
+    @classmethod
+    def from_env(cls, base_url: Optional[str] = None) -> "MyrluxClientConfig":
+        """Construye la configuración a partir de variables de entorno"""
+        return cls(
+            base_url=base_url or MYRLUX_BASE_URL,
+            max_connections=int(os.getenv("MYRLUX_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("MYRLUX_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("MYRLUX_KEEPALIVE_EXPIRY", "30")),
+            connect_timeout=float(os.getenv("MYRLUX_CONNECT_TIMEOUT", "2")),
+            read_timeout=float(os.getenv("MYRLUX_READ_TIMEOUT", "10")),
+            paginate_lists=os.getenv("MYRLUX_LIST_PAGINATION", "0") != "0",
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+# ============================================================================
+# 2. PARSEO INCREMENTAL DE LISTADOS
+# ============================================================================
+
+class JSONArrayParser:
+    """Parser incremental de un arreglo JSON de nivel superior.
+
+    Se alimenta con fragmentos de bytes conforme llegan de la red y devuelve
+    los elementos completos, de modo que nunca se materializa el arreglo
+    entero. Cada elemento se decodifica con json (C) por separado.
+    """
+
+    _ESPACIOS = " \t\r\n"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._pos = 0
+        self._abierto = False     # Ya se consumió "["
+        self.terminado = False    # Ya se consumió "]"
+
+    def _saltar_espacios(self):
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in self._ESPACIOS:
+            pos += 1
+        self._pos = pos
+
+    def feed(self, fragmento: bytes, final: bool = False) -> List[Any]:
+        """Agrega bytes y devuelve los elementos que quedaron completos"""
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(fragmento, final)
+        self._pos = 0
+        elementos = []
+        while not self.terminado:
+            self._saltar_espacios()
+            if self._pos >= len(self._buffer):
+                break
+            caracter = self._buffer[self._pos]
+            if not self._abierto:
+                if caracter != "[":
+                    raise ValueError("Se esperaba un arreglo JSON")
+                self._abierto = True
+                self._pos += 1
+                continue
+            if caracter == "]":
+                self.terminado = True
+                self._pos += 1
+                break
+            if caracter == ",":
+                self._pos += 1
+                continue
+            try:
+                valor, fin = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # Elemento incompleto: esperar más bytes
+            # El elemento solo está completo si le sigue "," o "]": un número como
+            # "2." o "12" al final del buffer podría continuar en el siguiente fragmento
+            siguiente = fin
+            while siguiente < len(self._buffer) and self._buffer[siguiente] in self._ESPACIOS:
+                siguiente += 1
+            if siguiente >= len(self._buffer) or self._buffer[siguiente] not in ",]":
+                if final:
+                    raise ValueError("Arreglo JSON mal formado")
+                break
+            elementos.append(valor)
+            self._pos = fin
+        if final and not self.terminado:
+            raise ValueError("Arreglo JSON incompleto")
+        return elementos
+
+
+def _primer_caracter(fragmento: bytes) -> Optional[str]:
+    texto = fragmento.lstrip()
+    if texto.startswith(codecs.BOM_UTF8):
+        texto = texto[len(codecs.BOM_UTF8):].lstrip()
+    return chr(texto[0]) if texto else None
+
+
+class _VistaPrevia:
+    """Acumula las primeras filas de un listado y cuenta el resto sin guardarlo"""
+
+    def __init__(self, limite: int, contar_total: bool):
+        self.limite = limite
+        self.contar_total = contar_total
+        self.filas: List[Any] = []
+        self.total = 0
+        self.completo = False    # Ya no hace falta leer más
+        self._parser: Optional[JSONArrayParser] = None
+        self._pagina: Optional[List[bytes]] = None
+
+    def feed(self, fragmento: bytes, final: bool = False):
+        if self._parser is None and self._pagina is None:
+            primero = _primer_caracter(fragmento)
+            if primero is None and not final:
+                return
+            if primero == "{":
+                # Respuesta paginada del servidor (Spring Page): es pequeña, se lee completa
+                self._pagina = []
+            else:
+                self._parser = JSONArrayParser()
+        if self._pagina is not None:
+            self._pagina.append(fragmento)
+            if final:
+                pagina = json.loads(b"".join(self._pagina) or b"{}")
+                contenido = pagina.get("content") or []
+                self.filas = contenido[:self.limite]
+                self.total = int(pagina.get("totalElements", len(contenido)))
+                self.completo = True
+            return
+        for elemento in self._parser.feed(fragmento, final):
+            if len(self.filas) < self.limite:
+                self.filas.append(elemento)
+            self.total += 1
+        if self._parser.terminado or (not self.contar_total and len(self.filas) >= self.limite):
+            self.completo = True
+
+# ============================================================================
+# 3. CLIENTE CON POOL DE CONEXIONES
+# ============================================================================
+
+class MyrluxAPIError(Exception):
+    """Respuesta no exitosa de MyrluxBack (conserva el status HTTP)"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"MyrluxBack respondió {status_code}")
+        self.status_code = status_code
+
+
+class MyrluxHTTPClient:
+    """Cliente con pool de conexiones para un host de MyrluxBack.
+
+    El cliente síncrono es thread-safe y se comparte entre los workers de
+    Streamlit. Los clientes async quedan ligados a su event loop, así que se
+    mantiene uno por loop.
+    """
+
+    def __init__(self, config: Optional[MyrluxClientConfig] = None):
+        self.config = config or MyrluxClientConfig.from_env()
+        self.base_url = self.config.base_url.rstrip("/")
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=self.base_url,
+                        limits=self.config.limits,
+                        timeout=self.config.timeout,
+                    )
+        return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    limits=self.config.limits,
+                    timeout=self.config.timeout,
+                )
+                self._async_clients[loop] = client
+        return client
+
+    def get(self, ruta: str, **kwargs) -> httpx.Response:
+        """GET síncrono reutilizando conexiones del pool"""
+        return self.client.get(ruta, **kwargs)
+
+    async def aget(self, ruta: str, **kwargs) -> httpx.Response:
+        """GET asíncrono reutilizando conexiones del pool del loop actual"""
+        return await self._async_client().get(ruta, **kwargs)
+
+    def get_json(self, ruta: str, **kwargs):
+        """GET que devuelve el JSON decodificado o lanza MyrluxAPIError"""
+        response = self.get(ruta, **kwargs)
+        if response.status_code != 200:
+            raise MyrluxAPIError(response.status_code)
+        return response.json()
+
+    async def aget_json(self, ruta: str, **kwargs):
+        """Versión async de get_json"""
+        response = await self.aget(ruta, **kwargs)
+        if response.status_code != 200:
+            raise MyrluxAPIError(response.status_code)
+        return response.json()
+
+    def _params_pagina(self, limite: int) -> Optional[Dict[str, int]]:
+        # Opcional (MYRLUX_LIST_PAGINATION=1): sin ellos el total se cuenta sobre el arreglo completo
+        return {"page": 0, "size": limite} if self.config.paginate_lists else None
+
+    def get_list_preview(self, ruta: str, limite: int = 10, contar_total: bool = True) -> Tuple[List[Any], int]:
+        """Primeras `limite` filas de un listado y su total, sin materializar el arreglo.
+
+        Si el servidor pagina (Spring Page con content/totalElements) se usa su
+        total; si devuelve el arreglo completo se parsea en streaming y el resto
+        de elementos solo se cuenta.
+        """
+        vista = _VistaPrevia(limite, contar_total)
+        with self.client.stream("GET", ruta, params=self._params_pagina(limite)) as response:
+            if response.status_code != 200:
+                raise MyrluxAPIError(response.status_code)
+            for fragmento in response.iter_bytes():
+                vista.feed(fragmento)
+                if vista.completo:
+                    break
+            else:
+                vista.feed(b"", final=True)
+        return vista.filas, vista.total
+
+    async def aget_list_preview(self, ruta: str, limite: int = 10, contar_total: bool = True) -> Tuple[List[Any], int]:
+        """Versión async de get_list_preview"""
+        vista = _VistaPrevia(limite, contar_total)
+        async with self._async_client().stream("GET", ruta, params=self._params_pagina(limite)) as response:
+            if response.status_code != 200:
+                raise MyrluxAPIError(response.status_code)
+            async for fragmento in response.aiter_bytes():
+                vista.feed(fragmento)
+                if vista.completo:
+                    break
+            else:
+                vista.feed(b"", final=True)
+        return vista.filas, vista.total
+
+    def close(self):
+        """Cierra el pool síncrono (los async se cierran con aclose)"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self):
+        """Cierra el cliente async del loop actual"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+# ============================================================================
+# 4. REGISTRO DE CLIENTES COMPARTIDOS (uno por host)
+# ============================================================================
+
+_clients: Dict[str, MyrluxHTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_myrlux_client(base_url: Optional[str] = None) -> MyrluxHTTPClient:
+    """Devuelve el cliente compartido del proceso para base_url"""
+    url = (base_url or MYRLUX_BASE_URL).rstrip("/")
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = MyrluxHTTPClient(MyrluxClientConfig.from_env(url))
+            _clients[url] = client
+        return client
+
+
+def close_myrlux_clients():
+    """Cierra todos los pools síncronos (útil al apagar el proceso)"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
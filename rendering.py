@@ -0,0 +1,207 @@
+"""
+Renderizado de respuestas de herramientas y del historial del chat
+Plantillas unidas una vez al importar (una sola llamada a format por respuesta) y bloque incremental de mensajes anteriores
+"""
+
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Mensajes del historial que se pintan como burbujas individuales; los anteriores van en un solo bloque
+UI_HISTORY_TAIL = int(os.getenv("UI_HISTORY_TAIL", "40"))
+
+# ============================================================================
+# 1. PLANTILLAS DE HERRAMIENTAS
+# ============================================================================
+# Cada plantilla se une una vez al importar; renderizar() es un único str.format
+
+
+def _plantilla(*lineas: str) -> str:
+    return "\n".join(lineas)
+
+
+PLANTILLAS: Dict[str, str] = {
+    "estudiante": _plantilla(
+        "👨‍🎓 Información del Estudiante:\n",
+        "ID: {id}",
+        "Nombre: {nombres} {apellidos}",
+        "Email: {email}",
+        "Teléfono: {telefono}",
+        "Dirección: {direccion}\n",
+    ),
+    "estudiante_fila": _plantilla(
+        "ID: {id}",
+        "Nombre: {nombres} {apellidos}",
+        "Email: {email}",
+        "Teléfono: {telefono}",
+        "---\n",
+    ),
+    "prestamo": _plantilla(
+        "💰 Cálculo de Préstamo:\n",
+        "Monto solicitado: ${monto:,.2f}",
+        "Tasa anual: {tasa_anual}%",
+        "Plazo: {meses} meses",
+        "Pago mensual: ${pago_mensual:,.2f}",
+        "Total a pagar: ${total_pagado:,.2f}",
+        "Intereses totales: ${intereses:,.2f}",
+    ),
+    "ahorro": _plantilla(
+        "🐷 Cálculo de Ahorro:\n",
+        "Depósito mensual: ${deposito_mensual:,.2f}",
+        "Tasa anual: {tasa_anual}%",
+        "Plazo: {meses} meses",
+        "Total depositado: ${total_depositado:,.2f}",
+        "Valor final: ${valor_futuro:,.2f}",
+        "Ganancias: ${ganancias:,.2f}",
+    ),
+    "interes": _plantilla(
+        "📈 Cálculo de Intereses:\n",
+        "Capital inicial: ${capital:,.2f}",
+        "Tasa anual: {tasa_anual}%",
+        "Tiempo: {anios} años\n",
+        "Interés simple: ${interes_simple:,.2f}",
+        "Monto final (simple): ${monto_simple:,.2f}\n",
+        "Interés compuesto: ${interes_compuesto:,.2f}",
+        "Monto final (compuesto): ${monto_compuesto:,.2f}",
+    ),
+    "clima": _plantilla(
+        "🌤️ Clima en {ciudad}:\n",
+        "Temperatura: {temp}°C",
+        "Condiciones: {desc}",
+        "Humedad: {humedad}%",
+        "Actualizado: {hora}",
+    ),
+    "conversion": _plantilla(
+        "💱 Conversión de Moneda:\n",
+        "{cantidad:,.2f} {origen} = {resultado:,.2f} {destino}",
+        "Tasa de cambio: 1 {origen} = {tasa:.4f} {destino}",
+        "{nota}Actualizado: {actualizado}",
+    ),
+}
+NOTA_TASA_CRUZADA = "Tasa cruzada (triangulada entre cotizaciones disponibles)\n"
+
+_CAMPOS_ESTUDIANTE = {"id": "N/A", "nombres": "", "apellidos": "", "email": "N/A", "telefono": "N/A",
+                      "direccion": "N/A"}
+
+
+def renderizar(nombre: str, **campos: Any) -> str:
+    return PLANTILLAS[nombre].format(**campos)
+
+
+def renderizar_estudiante(estudiante: Dict[str, Any]) -> str:
+    return PLANTILLAS["estudiante"].format(**{c: estudiante.get(c, v) for c, v in _CAMPOS_ESTUDIANTE.items()})
+
+
+def renderizar_lista_estudiantes(estudiantes: Sequence[Dict[str, Any]], total: int) -> str:
+    fila = PLANTILLAS["estudiante_fila"]
+    partes = ["📚 Lista de Estudiantes:\n\n"]
+    partes.extend(fila.format(**{c: e.get(c, v) for c, v in _CAMPOS_ESTUDIANTE.items()}) for e in estudiantes)
+    if total > len(estudiantes):
+        partes.append(f"\n... y {total - len(estudiantes)} estudiantes más.")
+    return "".join(partes)
+
+# ============================================================================
+# 2. TEXTOS ESTÁTICOS
+# ============================================================================
+
+INFO_SISTEMA = """🤖 Capacidades del Asistente Inteligente:
+
+🏦 **Servicios Bancarios:**
+• Consultas sobre productos bancarios (cuentas, préstamos, tarjetas)
+• Cálculos financieros (préstamos, ahorros, intereses)
+• Información sobre tarifas y comisiones
+
+👨‍🎓 **Sistema Educativo (MyrluxBack):**
+• Consultar información de estudiantes
+• Listar todos los estudiantes registrados
+
+🌐 **Servicios Generales:**
+• Información del clima por ciudad
+• Conversión entre monedas (USD, MXN, EUR)
+• Calculadora financiera avanzada
+
+💬 **Ejemplos de uso:**
+• "¿Cómo abrir una cuenta de ahorros?"
+• "Calcula un préstamo de 50000 pesos a 18% por 24 meses"
+• "Muestra información del estudiante ID 123"
+• "¿Cuál es el clima en Guadalajara?"
+• "Convierte 100 USD a MXN"
+"""
+
+INFO_AYUDA = """📋 **Ejemplos de Consultas:**
+
+**Bancarias:**
+• "¿Qué documentos necesito para un crédito personal?"
+• "¿Cuáles son las comisiones de la tarjeta de crédito?"
+• "prestamo 100000 15 36" (cálculo de préstamo)
+
+**Estudiantes:**
+• "Consulta el estudiante 123"
+• "Muestra todos los estudiantes"
+
+**Utilidades:**
+• "¿Cuál es el clima en Monterrey?"
+• "Convierte 500 MXN a USD"
+• "ahorro 2000 4 24" (cálculo de ahorro)
+
+**Conversacional:**
+• Puedo recordar nuestra conversación
+• Hago preguntas de seguimiento
+• Combino información de múltiples fuentes
+"""
+
+SALUDO = """¡Hola! Soy tu asistente bancario inteligente 🤖
+
+**Puedo ayudarte con:**
+🏦 **Consultas bancarias** - productos, servicios, cálculos
+👨‍🎓 **Gestión de estudiantes** - consultar información de MyrluxBack  
+🌤️ **Información del clima** - consultas meteorológicas
+💱 **Conversión de monedas** - USD, MXN, EUR
+🧮 **Cálculos financieros** - préstamos, ahorros, intereses
+
+**Ejemplos:**
+• "¿Cómo abrir una cuenta de ahorros?"
+• "Calcula un préstamo de 50000 pesos al 18% por 24 meses"
+• "Muestra información del estudiante 123"
+• "¿Cuál es el clima en Guadalajara?"
+
+¿En qué puedo ayudarte?"""
+
+# ============================================================================
+# 3. HISTORIAL DEL CHAT
+# ============================================================================
+
+
+class HistorialRenderizado:
+    """Historial del chat dividido en bloque de mensajes anteriores + cola, incremental entre reruns.
+
+    Streamlit vuelve a ejecutar el script completo en cada interacción y
+    pintar cada mensaje como burbuja cuesta dos elementos por mensaje. Los
+    mensajes ya enviados no cambian, así que los anteriores a la cola se
+    formatean una sola vez (al salir de la cola) y se unen en un solo
+    markdown que la UI pinta como un elemento, más `cola` burbujas.
+    """
+
+    SEPARADOR = "\n\n---\n\n"
+
+    def __init__(self, cola: int = UI_HISTORY_TAIL):
+        self.cola = cola
+        self._anteriores = 0
+        self._partes: List[str] = []
+        self._bloque = ""
+
+    def actualizar(self, mensajes: Sequence[Dict[str, str]]) -> Tuple[str, int, Sequence[Dict[str, str]]]:
+        """(markdown de los mensajes anteriores, cuántos son, mensajes de la cola)"""
+        if len(mensajes) < self._anteriores:
+            # El historial se reinició (nueva conversación)
+            self.__init__(self.cola)
+        corte = max(0, len(mensajes) - self.cola)
+        if corte > self._anteriores:
+            self._partes.extend(self._formatear(m) for m in mensajes[self._anteriores:corte])
+            self._bloque = self.SEPARADOR.join(self._partes)
+            self._anteriores = corte
+        return self._bloque, self._anteriores, mensajes[corte:]
+
+    @staticmethod
+    def _formatear(mensaje: Dict[str, str]) -> str:
+        autor = "🧑 Tú" if mensaje["role"] == "user" else "🤖 Asistente"
+        return f"**{autor}:**\n\n{mensaje['content']}"
@@ -0,0 +1,203 @@
+"""
+Caché de respuestas con TTL + LRU
+Deduplica cargas concurrentes de la misma clave (single-flight) y expone contadores
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Vuelo:
+    """Carga en curso: los demás hilos esperan su resultado en lugar de repetirla"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """Caché acotada con expiración por entrada y desalojo LRU.
+
+    Solo se guardan cargas exitosas: si el loader lanza una excepción se
+    propaga a todos los que esperaban esa clave y no queda nada en caché.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0, nombre: str = "cache"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.nombre = nombre
+        self._datos: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._vuelos: Dict[Hashable, _Vuelo] = {}
+        self._vuelos_async: Dict[Tuple[int, Hashable], "asyncio.Future"] = {}
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    # ------------------------------------------------------------------
+    # Acceso básico
+    # ------------------------------------------------------------------
+
+    def _leer(self, key: Hashable) -> Tuple[bool, Any]:
+        """Busca key (con el lock tomado); actualiza contadores y orden LRU"""
+        entrada = self._datos.get(key)
+        if entrada is not None:
+            expira, valor = entrada
+            if expira > time.monotonic():
+                self._datos.move_to_end(key)
+                self.hits += 1
+                return True, valor
+            del self._datos[key]
+            self.expirations += 1
+        self.misses += 1
+        return False, None
+
+    def _escribir(self, key: Hashable, valor: Any, ttl: Optional[float]):
+        """Inserta key (con el lock tomado) y desaloja las entradas menos usadas"""
+        self._datos[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+        self._datos.move_to_end(key)
+        while len(self._datos) > self.max_entries:
+            self._datos.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            encontrado, valor = self._leer(key)
+        return valor if encontrado else default
+
+    def set(self, key: Hashable, valor: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._escribir(key, valor, ttl)
+
+    # ------------------------------------------------------------------
+    # Carga con single-flight
+    # ------------------------------------------------------------------
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Devuelve key desde caché o la carga una sola vez aunque haya llamadas concurrentes"""
+        with self._lock:
+            encontrado, valor = self._leer(key)
+            if encontrado:
+                return valor
+            vuelo = self._vuelos.get(key)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[key] = _Vuelo()
+                generacion = self._generacion
+            else:
+                self.coalesced += 1
+
+        if not lider:
+            vuelo.evento.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.valor
+
+        try:
+            vuelo.valor = loader()
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        else:
+            with self._lock:
+                # Una invalidación durante la carga deja el valor obsoleto fuera de caché
+                if generacion == self._generacion:
+                    self._escribir(key, vuelo.valor, ttl)
+            return vuelo.valor
+        finally:
+            with self._lock:
+                self._vuelos.pop(key, None)
+            vuelo.evento.set()
+
+    async def aget_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None
+    ) -> Any:
+        """Versión async de get_or_load (deduplica dentro del mismo event loop)"""
+        loop = asyncio.get_running_loop()
+        clave_vuelo = (id(loop), key)
+        with self._lock:
+            encontrado, valor = self._leer(key)
+            if encontrado:
+                return valor
+            futuro = self._vuelos_async.get(clave_vuelo)
+            lider = futuro is None
+            if lider:
+                futuro = self._vuelos_async[clave_vuelo] = loop.create_future()
+                generacion = self._generacion
+            else:
+                self.coalesced += 1
+
+        if not lider:
+            return await asyncio.shield(futuro)
+
+        try:
+            valor = await loader()
+        except BaseException as e:
+            futuro.set_exception(e)
+            # Evita "exception was never retrieved" si nadie más esperaba
+            futuro.exception()
+            raise
+        else:
+            with self._lock:
+                if generacion == self._generacion:
+                    self._escribir(key, valor, ttl)
+            futuro.set_result(valor)
+            return valor
+        finally:
+            with self._lock:
+                self._vuelos_async.pop(clave_vuelo, None)
+
+    # ------------------------------------------------------------------
+    # Invalidación y métricas
+    # ------------------------------------------------------------------
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Elimina una clave; devuelve True si existía"""
+        with self._lock:
+            self._generacion += 1
+            self.invalidations += 1
+            return self._datos.pop(key, None) is not None
+
+    def invalidate_where(self, predicado: Callable[[Hashable], bool]) -> int:
+        """Elimina todas las claves que cumplan el predicado"""
+        with self._lock:
+            self._generacion += 1
+            claves = [k for k in self._datos if predicado(k)]
+            for k in claves:
+                del self._datos[k]
+            self.invalidations += len(claves)
+            return len(claves)
+
+    def clear(self):
+        with self._lock:
+            self._generacion += 1
+            self.invalidations += len(self._datos)
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "nombre": self.nombre,
+                "entries": len(self._datos),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+            }
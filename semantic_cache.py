@@ -0,0 +1,325 @@
+"""
+Caché semántica de respuestas RAG
+Reutiliza respuestas de preguntas casi idénticas comparando embeddings de la pregunta
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# 1. UTILIDADES
+# ============================================================================
+
+_NO_ALFANUMERICO = re.compile(r"[^\w\s]+")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_pregunta(texto: str) -> str:
+    """Minúsculas, sin acentos ni signos: '¿Cómo abro...?' == 'como abro...'"""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _NO_ALFANUMERICO.sub(" ", texto)
+    return _ESPACIOS.sub(" ", texto).strip()
+
+
+def _es_sentence_transformer(modelo) -> bool:
+    # Sin importar sentence_transformers: si el modelo es suyo, el módulo ya está cargado
+    modulo = sys.modules.get("sentence_transformers")
+    return modulo is not None and isinstance(modelo, modulo.SentenceTransformer)
+
+
+def resolver_embedder(rag_system, lote: bool = False) -> Optional[Callable[[Any], Any]]:
+    """Busca en el sistema RAG una función texto -> embedding (con lote=True,
+    lista de textos -> lista de embeddings, para micro_batcher).
+
+    Acepta un método embed_query / embed_documents propio o un modelo expuesto
+    como embeddings / embedding_model / encoder / model: con ese método
+    (LangChain) o un SentenceTransformer. Un .encode cualquiera no basta:
+    las cadenas de configuración (embedding_model="sentence-transformers/...",
+    model="deepseek-r1:7b") también lo tienen.
+    """
+    metodo = "embed_documents" if lote else "embed_query"
+    if callable(getattr(rag_system, metodo, None)):
+        return getattr(rag_system, metodo)
+    for atributo in ("embeddings", "embedding_model", "encoder", "model"):
+        modelo = getattr(rag_system, atributo, None)
+        if modelo is None or isinstance(modelo, (str, bytes)):
+            continue
+        if callable(getattr(modelo, metodo, None)):
+            return getattr(modelo, metodo)
+        if _es_sentence_transformer(modelo):
+            if lote:
+                return lambda textos, modelo=modelo: list(modelo.encode(textos))
+            return lambda texto, modelo=modelo: modelo.encode(texto)
+    return None
+
+
+def huella_directorio(ruta: str) -> Optional[tuple]:
+    """Huella barata (nombre, tamaño, mtime) de los documentos de un corpus"""
+    try:
+        entradas = sorted(os.scandir(ruta), key=lambda e: e.name)
+    except OSError:
+        return None
+    return tuple((e.name, e.stat().st_size, e.stat().st_mtime_ns) for e in entradas if e.is_file())
+
+# ============================================================================
+# 2. CACHÉ SEMÁNTICA
+# ============================================================================
+
+class SemanticCache:
+    """Caché de respuestas indexada por el embedding normalizado de la pregunta.
+
+    Una búsqueda es un producto matriz-vector sobre los embeddings guardados;
+    si la similitud coseno del mejor candidato supera el umbral se devuelve su
+    respuesta. Sin embedder disponible se degrada a coincidencia exacta sobre
+    la pregunta normalizada. Las entradas expiran por TTL, se desalojan por LRU
+    al llenarse y se descartan todas cuando cambia la versión del corpus.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Callable[[str], Any]] = None,
+        threshold: float = 0.92,
+        ttl: float = 600.0,
+        max_entries: int = 512,
+        corpus_version: Optional[Callable[[], Any]] = None,
+        corpus_check_interval: float = 5.0,
+        nombre: str = "consulta_bancaria_rag",
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.corpus_version = corpus_version
+        self.corpus_check_interval = corpus_check_interval
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._vectores: Optional[np.ndarray] = None   # (max_entries, dim) float32
+        self._expira = np.zeros(max_entries, dtype=np.float64)
+        self._ultimo_uso = np.zeros(max_entries, dtype=np.float64)
+        self._ocupado = np.zeros(max_entries, dtype=bool)
+        self._valores: List[Any] = [None] * max_entries
+        self._costos = np.zeros(max_entries, dtype=np.float64)
+        self._por_texto: Dict[str, int] = {}
+        self._texto_de: List[Optional[str]] = [None] * max_entries
+        self._version_actual = corpus_version() if corpus_version else None
+        self._ultima_revision = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.corpus_invalidations = 0
+        self.latency_saved = 0.0
+        self.lookup_time = 0.0
+        self.embedder_errors = 0
+
+    # ------------------------------------------------------------------
+    # Internos (con el lock tomado)
+    # ------------------------------------------------------------------
+
+    def _vectorizar(self, pregunta: str) -> Optional[np.ndarray]:
+        if self.embedder is None:
+            return None
+        try:
+            vector = np.asarray(self.embedder(pregunta), dtype=np.float32).ravel()
+        except Exception as e:
+            # Un embedder caído no tumba la consulta: se busca solo por coincidencia exacta
+            logger.warning("Embedder de la caché %s falló (%s); coincidencia exacta", self.nombre, e)
+            with self._lock:
+                self.embedder_errors += 1
+            return None
+        norma = float(np.linalg.norm(vector))
+        return vector / norma if norma else None
+
+    def _revisar_corpus(self):
+        if self.corpus_version is None:
+            return
+        ahora = time.monotonic()
+        if ahora - self._ultima_revision < self.corpus_check_interval:
+            return
+        self._ultima_revision = ahora
+        version = self.corpus_version()
+        if version != self._version_actual:
+            self._version_actual = version
+            self._vaciar()
+            self.corpus_invalidations += 1
+
+    def _vaciar(self):
+        self._ocupado[:] = False
+        self._valores = [None] * self.max_entries
+        self._texto_de = [None] * self.max_entries
+        self._por_texto.clear()
+
+    def _liberar(self, slot: int):
+        self._ocupado[slot] = False
+        self._valores[slot] = None
+        texto = self._texto_de[slot]
+        if texto is not None and self._por_texto.get(texto) == slot:
+            del self._por_texto[texto]
+        self._texto_de[slot] = None
+
+    def _buscar(self, texto: str, vector: Optional[np.ndarray], ahora: float) -> Optional[int]:
+        slot = self._por_texto.get(texto)
+        if slot is None and vector is not None and self._vectores is not None and self._ocupado.any():
+            similitudes = self._vectores @ vector
+            similitudes[~self._ocupado] = -np.inf
+            candidato = int(np.argmax(similitudes))
+            if similitudes[candidato] >= self.threshold:
+                slot = candidato
+        if slot is None:
+            return None
+        if self._expira[slot] <= ahora:
+            self._liberar(slot)
+            self.expirations += 1
+            return None
+        return slot
+
+    def _slot_libre(self, ahora: float) -> int:
+        libres = np.flatnonzero(~self._ocupado)
+        if libres.size:
+            return int(libres[0])
+        vencidos = np.flatnonzero(self._expira <= ahora)
+        if vencidos.size:
+            self.expirations += 1
+            slot = int(vencidos[0])
+        else:
+            slot = int(np.argmin(self._ultimo_uso))
+            self.evictions += 1
+        self._liberar(slot)
+        return slot
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def get_or_compute(self, pregunta: str, calcular: Callable[[], Any]) -> Any:
+        """Devuelve una respuesta cacheada equivalente o calcula y guarda una nueva"""
+        inicio = time.perf_counter()
+        texto = normalizar_pregunta(pregunta)
+        vector = self._vectorizar(pregunta)
+        with self._lock:
+            self._revisar_corpus()
+            ahora = time.monotonic()
+            slot = self._buscar(texto, vector, ahora)
+            self.lookup_time += time.perf_counter() - inicio
+            if slot is not None:
+                self.hits += 1
+                self._ultimo_uso[slot] = ahora
+                self.latency_saved += self._costos[slot]
+                return self._valores[slot]
+            self.misses += 1
+            version = self._version_actual
+
+        inicio = time.perf_counter()
+        valor = calcular()
+        costo = time.perf_counter() - inicio
+
+        with self._lock:
+            # Si el corpus cambió mientras se generaba, la respuesta ya no es fiable
+            if version != self._version_actual:
+                return valor
+            ahora = time.monotonic()
+            slot = self._slot_libre(ahora)
+            if vector is not None:
+                if self._vectores is None or self._vectores.shape[1] != vector.shape[0]:
+                    self._vectores = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                    self._vaciar()
+                self._vectores[slot] = vector
+            elif self._vectores is not None:
+                self._vectores[slot] = 0.0
+            self._ocupado[slot] = True
+            self._valores[slot] = valor
+            self._costos[slot] = costo
+            self._expira[slot] = ahora + self.ttl
+            self._ultimo_uso[slot] = ahora
+            self._texto_de[slot] = texto
+            self._por_texto[texto] = slot
+        return valor
+
+    def invalidate_corpus(self):
+        """Descarta todas las respuestas (llamar tras reindexar documentos)"""
+        with self._lock:
+            self._vaciar()
+            self.corpus_invalidations += 1
+            if self.corpus_version is not None:
+                self._version_actual = self.corpus_version()
+
+    def clear(self):
+        with self._lock:
+            self._vaciar()
+
+    def __len__(self) -> int:
+        return int(self._ocupado.sum())
+
+    def stats(self) -> Dict[str, Any]:
+        """Tasa de aciertos y latencia ahorrada por la caché"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "nombre": self.nombre,
+                "entries": int(self._ocupado.sum()),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "corpus_invalidations": self.corpus_invalidations,
+                "latency_saved_s": self.latency_saved,
+                "avg_lookup_ms": self.lookup_time / consultas * 1000 if consultas else 0.0,
+                "semantic": self.embedder is not None,
+                "embedder_errors": self.embedder_errors,
+            }
+
+# ============================================================================
+# 3. UNA CACHÉ POR SISTEMA RAG
+# ============================================================================
+
+RAG_CORPUS_DIR = os.getenv(
+    "RAG_CORPUS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "demos", "banking-rag"),
+)
+
+_caches: "weakref.WeakKeyDictionary[Any, SemanticCache]" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def _version_corpus(rag_system) -> Callable[[], Any]:
+    """Versión del corpus: la que exponga el sistema RAG o la huella del directorio"""
+    propia = getattr(rag_system, "corpus_version", None)
+    if callable(propia):
+        return propia
+    return lambda: huella_directorio(RAG_CORPUS_DIR)
+
+
+def get_semantic_cache(rag_system) -> SemanticCache:
+    """Caché compartida por todas las herramientas que usan el mismo sistema RAG"""
+    with _caches_lock:
+        try:
+            cache = _caches.get(rag_system)
+        except TypeError:
+            cache = None  # Objeto sin weakref/hash: caché no compartida
+        if cache is None:
+            cache = SemanticCache(
+                embedder=resolver_embedder(rag_system),
+                threshold=float(os.getenv("RAG_CACHE_THRESHOLD", "0.92")),
+                ttl=float(os.getenv("RAG_CACHE_TTL", "600")),
+                max_entries=int(os.getenv("RAG_CACHE_SIZE", "512")),
+                corpus_version=_version_corpus(rag_system),
+            )
+            try:
+                _caches[rag_system] = cache
+            except TypeError:
+                pass
+        return cache
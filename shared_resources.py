@@ -0,0 +1,178 @@
+"""
+Registro de recursos compartidos del proceso
+Un solo sistema RAG (modelo de embeddings + cliente vectorial) y un solo juego de herramientas para todas las sesiones
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Llamadas simultáneas permitidas contra el modelo/cliente compartido
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "4"))
+# Agrupar embeddings/generaciones concurrentes en micro-lotes (ver micro_batcher)
+RAG_MICRO_BATCH = os.getenv("RAG_MICRO_BATCH", "false").lower() == "true"
+
+# ============================================================================
+# 1. REGISTRO
+# ============================================================================
+
+
+class ResourceRegistry:
+    """Construye cada recurso una sola vez aunque varias sesiones lo pidan a la vez.
+
+    Cada nombre tiene su propio lock de construcción: un recurso lento (el
+    modelo de embeddings) no bloquea la obtención de los que ya existen.
+    """
+
+    def __init__(self):
+        self._recursos: Dict[Hashable, Any] = {}
+        self._construccion: Dict[Hashable, threading.Lock] = {}
+        self._tiempos: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, nombre: Hashable, fabrica: Callable[[], Any]) -> Any:
+        try:
+            return self._recursos[nombre]
+        except KeyError:
+            pass
+        with self._lock:
+            lock = self._construccion.setdefault(nombre, threading.Lock())
+        with lock:
+            if nombre not in self._recursos:
+                inicio = time.perf_counter()
+                self._recursos[nombre] = fabrica()
+                self._tiempos[nombre] = time.perf_counter() - inicio
+                logger.info("Recurso compartido '%s' listo en %.2fs", nombre, self._tiempos[nombre])
+            return self._recursos[nombre]
+
+    def peek(self, nombre: Hashable) -> Optional[Any]:
+        return self._recursos.get(nombre)
+
+    def discard(self, nombre: Hashable) -> Optional[Any]:
+        """Quita un recurso (p. ej. para recargarlo); la próxima llamada a get lo reconstruye"""
+        with self._lock:
+            self._tiempos.pop(nombre, None)
+            return self._recursos.pop(nombre, None)
+
+    def stats(self) -> Dict[str, float]:
+        """Segundos que tomó construir cada recurso"""
+        return {str(nombre): segundos for nombre, segundos in self._tiempos.items()}
+
+
+class LazyToolRegistry(Mapping):
+    """Nombre -> herramienta; cada una se importa y construye en su primer uso.
+
+    Consultar nombres (in, iteración) no construye nada; la mayoría de las
+    sesiones solo llegan a instanciar una o dos herramientas.
+    """
+
+    def __init__(self, fabricas: Dict[str, Callable[[], Any]]):
+        self._fabricas = dict(fabricas)
+        self._instancias: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, nombre: str) -> Any:
+        try:
+            return self._instancias[nombre]
+        except KeyError:
+            fabrica = self._fabricas[nombre]
+        with self._lock:
+            if nombre not in self._instancias:
+                self._instancias[nombre] = fabrica()
+            return self._instancias[nombre]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fabricas)
+
+    def __len__(self) -> int:
+        return len(self._fabricas)
+
+    def __contains__(self, nombre: object) -> bool:
+        return nombre in self._fabricas
+
+    def instanciadas(self) -> List[Any]:
+        """Herramientas ya construidas, sin forzar las demás"""
+        return [self._instancias[n] for n in self._fabricas if n in self._instancias]
+
+    def todas(self) -> List[Any]:
+        """Construye las que falten (el agente LLM necesita la lista completa)"""
+        return [self[n] for n in self._fabricas]
+
+
+_registry = ResourceRegistry()
+
+
+def get_registry() -> ResourceRegistry:
+    return _registry
+
+# ============================================================================
+# 2. SISTEMA RAG COMPARTIDO
+# ============================================================================
+
+
+class SharedRAGSystem:
+    """Envoltura del sistema RAG compartido entre sesiones.
+
+    Delega todo al sistema real, pero las llamadas que usan el modelo de
+    embeddings, Weaviate o DeepSeek pasan por un semáforo para que N sesiones
+    no saturen el modelo ni el pool de conexiones.
+    """
+
+    # Los métodos por lotes también: un lote completo ocupa un solo cupo
+    METODOS_ACOTADOS = frozenset({
+        "rag_query", "query_deepseek", "embed_query",
+        "rag_query_batch", "query_deepseek_batch", "embed_documents",
+    })
+
+    def __init__(self, rag_system, max_concurrencia: int = RAG_MAX_CONCURRENCY):
+        self._rag_system = rag_system
+        self._acceso = threading.BoundedSemaphore(max_concurrencia)
+
+    @property
+    def sistema(self):
+        return self._rag_system
+
+    @property
+    def acceso(self) -> threading.BoundedSemaphore:
+        """El mismo semáforo para los streams de DeepSeek (query_deepseek_stream, Ollama directo),
+        que no son llamadas únicas: se toma hasta el último fragmento (ver deepseek_llm)"""
+        return self._acceso
+
+    def __getattr__(self, nombre: str):
+        atributo = getattr(self._rag_system, nombre)
+        if nombre not in self.METODOS_ACOTADOS or not callable(atributo):
+            return atributo
+
+        def acotado(*args, **kwargs):
+            with self._acceso:
+                return atributo(*args, **kwargs)
+
+        return acotado
+
+
+def _crear_rag_system():
+    from banking_rag_configurable import BankingRAGConfigurable
+    return BankingRAGConfigurable()
+
+
+def _envolver_rag_system(rag_system):
+    compartido = SharedRAGSystem(rag_system)
+    if not RAG_MICRO_BATCH:
+        return compartido
+    from micro_batcher import BatchingRAGSystem
+    # Los lotes se forman antes del semáforo; si no, solo N llamadores llegarían a encolarse
+    envuelto = BatchingRAGSystem(compartido)
+    if not envuelto.lotes:
+        logger.warning("RAG_MICRO_BATCH ignorado: el sistema RAG no tiene métodos por lotes")
+        return compartido
+    return envuelto
+
+
+def get_shared_rag_system(fabrica: Optional[Callable[[], Any]] = None) -> Any:
+    """Sistema RAG del proceso; se construye en la primera sesión que lo pide"""
+    fabrica = fabrica or _crear_rag_system
+    return _registry.get("rag_system", lambda: _envolver_rag_system(fabrica()))
@@ -0,0 +1,262 @@
+"""
+Instrumentación de latencia del agente
+Spans por herramienta y por llamada al LLM, trazas por petición y percentiles exportables (Prometheus / JSON)
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+# Muestras por operación para los percentiles y trazas completas que se conservan
+TELEMETRY_WINDOW = int(os.getenv("TELEMETRY_WINDOW", "1000"))
+TELEMETRY_TRACES = int(os.getenv("TELEMETRY_TRACES", "200"))
+
+CUANTILES = (0.5, 0.95, 0.99)
+
+# ============================================================================
+# 1. SPANS Y TRAZAS
+# ============================================================================
+
+
+@dataclass
+class Span:
+    nombre: str
+    inicio: float                  # segundos desde el inicio de la traza
+    duracion: float = 0.0
+    error: Optional[str] = None
+    atributos: Dict[str, Any] = field(default_factory=dict)
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    def transcurrido(self) -> float:
+        return time.perf_counter() - self._t0
+
+
+@dataclass
+class Trace:
+    """Una petición de chat: ruta elegida, spans de herramientas/LLM y tiempos"""
+    id: int
+    mensaje: str
+    ruta: str = ""
+    inicio: float = field(default_factory=time.time)
+    duracion: float = 0.0
+    ttft: Optional[float] = None
+    error: Optional[str] = None
+    spans: List[Span] = field(default_factory=list)
+    _t0: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def iteraciones(self) -> int:
+        """Llamadas al LLM dentro de la petición (pasos del agente ReAct)"""
+        return sum(1 for s in self.spans if s.nombre.startswith("llm."))
+
+    def to_dict(self) -> Dict[str, Any]:
+        datos = asdict(self)
+        datos.pop("_t0")
+        for span in datos["spans"]:
+            span.pop("_t0")
+        datos["iteraciones"] = self.iteraciones
+        return datos
+
+
+_traza_actual: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("traza_actual", default=None)
+
+
+def traza_actual() -> Optional[Trace]:
+    return _traza_actual.get()
+
+
+def en_contexto(func: Callable) -> Callable:
+    """Liga func al contexto actual para correrla en otro hilo sin perder la traza"""
+    return functools.partial(contextvars.copy_context().run, func)
+
+# ============================================================================
+# 2. REGISTRO DE MÉTRICAS
+# ============================================================================
+
+
+def _percentil(ordenadas: List[float], q: float) -> float:
+    """Percentil por rango más cercano (sin NumPy: este módulo se importa al arrancar)"""
+    return ordenadas[max(0, math.ceil(q * len(ordenadas)) - 1)]
+
+
+class Telemetry:
+    """Ventanas móviles de duraciones por operación y las últimas trazas.
+
+    Las operaciones se nombran por capa: "request", "tool.<nombre>",
+    "llm.deepseek", "rag.query", "myrlux.http". Los contadores _count/_sum
+    son acumulados desde el arranque; los percentiles, de las últimas
+    `ventana` muestras.
+    """
+
+    def __init__(self, ventana: int = TELEMETRY_WINDOW, max_trazas: int = TELEMETRY_TRACES):
+        self.ventana = ventana
+        self._muestras: Dict[str, Deque[float]] = {}
+        self._conteo: Dict[str, int] = {}
+        self._suma: Dict[str, float] = {}
+        self._errores: Dict[str, int] = {}
+        self._trazas: Deque[Trace] = deque(maxlen=max_trazas)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def observar(self, nombre: str, segundos: float, error: bool = False):
+        with self._lock:
+            muestras = self._muestras.get(nombre)
+            if muestras is None:
+                muestras = self._muestras[nombre] = deque(maxlen=self.ventana)
+            muestras.append(segundos)
+            self._conteo[nombre] = self._conteo.get(nombre, 0) + 1
+            self._suma[nombre] = self._suma.get(nombre, 0.0) + segundos
+            if error:
+                self._errores[nombre] = self._errores.get(nombre, 0) + 1
+
+    @contextmanager
+    def span(self, nombre: str, **atributos) -> Iterator[Span]:
+        traza = _traza_actual.get()
+        span = Span(nombre, 0.0, atributos=atributos)
+        if traza is not None:
+            span.inicio = span._t0 - traza._t0
+        try:
+            yield span
+        except Exception as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duracion = span.transcurrido()
+            self.observar(nombre, span.duracion, error=span.error is not None)
+            if traza is not None:
+                traza.spans.append(span)
+
+    @contextmanager
+    def traza(self, mensaje: str) -> Iterator[Trace]:
+        """Abre la traza de una petición; los spans de este contexto (y de los hilos
+        lanzados con en_contexto) quedan registrados en ella"""
+        traza = Trace(next(self._ids), mensaje[:200])
+        token = _traza_actual.set(traza)
+        try:
+            yield traza
+        except Exception as e:
+            traza.error = type(e).__name__
+            raise
+        finally:
+            _traza_actual.reset(token)
+            traza.duracion = time.perf_counter() - traza._t0
+            self.observar("request", traza.duracion, error=traza.error is not None)
+            if traza.ruta:
+                self.observar(f"request.{traza.ruta}", traza.duracion)
+            with self._lock:
+                self._trazas.append(traza)
+
+    def medir(self, nombre: str) -> Callable[[Callable], Callable]:
+        """Decorador: cada llamada a la función es un span"""
+        def decorador(func):
+            @functools.wraps(func)
+            def envoltura(*args, **kwargs):
+                with self.span(nombre):
+                    return func(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    # ---- consultas ----
+
+    def percentiles(self, nombre: str) -> Dict[str, float]:
+        with self._lock:
+            ordenadas = sorted(self._muestras.get(nombre, ()))
+        if not ordenadas:
+            return {}
+        return {f"p{round(q * 100)}": _percentil(ordenadas, q) for q in CUANTILES}
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        """Operación -> conteo, errores, media y p50/p95/p99 (segundos)"""
+        with self._lock:
+            nombres = sorted(self._muestras)
+        return {
+            nombre: {
+                "conteo": self._conteo[nombre],
+                "errores": self._errores.get(nombre, 0),
+                "media": self._suma[nombre] / self._conteo[nombre],
+                **self.percentiles(nombre),
+            }
+            for nombre in nombres
+        }
+
+    def trazas(self) -> List[Trace]:
+        with self._lock:
+            return list(self._trazas)
+
+    def lentas(self, n: int = 10) -> List[Trace]:
+        """Las n peticiones más lentas entre las recientes"""
+        return sorted(self.trazas(), key=lambda t: t.duracion, reverse=True)[:n]
+
+    # ---- exportación ----
+
+    def exportar_prometheus(self, prefijo: str = "banking_agent") -> str:
+        """Formato de texto de Prometheus (summary por operación + contador de errores)"""
+        lineas = [
+            f"# HELP {prefijo}_latency_seconds Latencia por operación (ventana móvil)",
+            f"# TYPE {prefijo}_latency_seconds summary",
+        ]
+        for nombre, datos in self.resumen().items():
+            etiqueta = f'operacion="{nombre}"'
+            for q in CUANTILES:
+                valor = datos[f"p{round(q * 100)}"]
+                lineas.append(f'{prefijo}_latency_seconds{{{etiqueta},quantile="{q}"}} {valor:.6f}')
+            lineas.append(f"{prefijo}_latency_seconds_sum{{{etiqueta}}} {self._suma[nombre]:.6f}")
+            lineas.append(f"{prefijo}_latency_seconds_count{{{etiqueta}}} {datos['conteo']}")
+        lineas += [
+            f"# HELP {prefijo}_errors_total Operaciones que terminaron en excepción",
+            f"# TYPE {prefijo}_errors_total counter",
+        ]
+        with self._lock:
+            errores = sorted(self._errores.items())
+        lineas += [f'{prefijo}_errors_total{{operacion="{nombre}"}} {total}' for nombre, total in errores]
+        return "\n".join(lineas) + "\n"
+
+    def exportar_json(self, trazas: int = 20) -> str:
+        return json.dumps({
+            "operaciones": self.resumen(),
+            "lentas": [t.to_dict() for t in self.lentas(trazas)],
+        }, ensure_ascii=False, indent=2)
+
+
+_telemetria = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetria
+
+# ============================================================================
+# 3. INSTRUMENTACIÓN DE HERRAMIENTAS
+# ============================================================================
+
+
+def instrumentar_herramienta(cls):
+    """Decorador de clase: _run/_arun de la herramienta quedan dentro de un span "tool.<name>".
+
+    Cubre todas las rutas (agente, ruta rápida, plan paralelo y respaldo), que
+    llaman a _run directamente sin pasar por los callbacks de LangChain.
+    """
+    run, arun = cls._run, cls.__dict__.get("_arun")
+
+    @functools.wraps(run)
+    def _run(self, *args, **kwargs):
+        with _telemetria.span(f"tool.{self.name}"):
+            return run(self, *args, **kwargs)
+
+    cls._run = _run
+    if arun is not None:
+        @functools.wraps(arun)
+        async def _arun(self, *args, **kwargs):
+            with _telemetria.span(f"tool.{self.name}"):
+                return await arun(self, *args, **kwargs)
+
+        cls._arun = _arun
+    return cls
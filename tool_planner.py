@@ -0,0 +1,196 @@
+"""
+Planificador de consultas compuestas
+Divide un mensaje en llamadas independientes a herramientas y las ejecuta en paralelo
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from intent_router import IntentRouter, quitar_acentos
+from telemetry import en_contexto
+
+# ============================================================================
+# 1. PLAN
+# ============================================================================
+
+# Conectores que separan peticiones independientes ("500 USD a MXN y el clima en Cancún")
+_SEPARADORES = re.compile(
+    r"\s*(?:[;,](?:\s*(?:y|e|and)\s)?(?!\d)|\s(?:y|e|and|ademas|tambien|luego)\s)\s*",
+    re.IGNORECASE,
+)
+
+# Términos que indican una pregunta para el RAG bancario
+PALABRAS_BANCARIAS = re.compile(
+    r"\b(?:banco|cuenta|cuentas|tarjeta|tarjetas|credito|creditos|prestamo|prestamos|comision"
+    r"|comisiones|cat|tasa|anualidad|requisitos|sucursal|sucursales|horario|horarios|oro"
+    r"|ahorro|ahorros|deposito|card|cards|fee|fees|account|accounts|loan|loans|branch)\b"
+)
+
+RAG_TOOL = "consulta_bancaria_rag"
+
+# Timeouts por herramienta (segundos); el resto usa DEFAULT_TOOL_TIMEOUT
+TOOL_TIMEOUTS: Dict[str, float] = {
+    RAG_TOOL: float(os.getenv("RAG_TOOL_TIMEOUT", "45")),
+    "consultar_estudiante": float(os.getenv("MYRLUX_TOOL_TIMEOUT", "12")),
+}
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("DEFAULT_TOOL_TIMEOUT", "5"))
+# Llamadas de un mismo plan en vuelo a la vez: sus rezagados no pueden ocupar todo el pool compartido
+PARALLEL_TOOL_PER_PLAN = int(os.getenv("PARALLEL_TOOL_PER_PLAN", "4"))
+
+
+@dataclass(frozen=True)
+class PlannedCall:
+    """Una llamada a herramienta derivada de un fragmento del mensaje"""
+    tool: str
+    tool_input: str
+    fragmento: str
+
+
+def planificar(texto: str, router: IntentRouter) -> Optional[List[PlannedCall]]:
+    """Plan de 2+ llamadas independientes, o None si el mensaje no es compuesto.
+
+    Cada fragmento debe resolverse con confianza por el router o ser una
+    pregunta bancaria (va al RAG); fragmentos bancarios consecutivos se
+    vuelven a unir en una sola pregunta. Si algún fragmento no encaja, el
+    mensaje completo se deja al agente.
+    """
+    fragmentos = [f.strip(" ¿?¡!.") for f in _SEPARADORES.split(texto)]
+    fragmentos = [f for f in fragmentos if f]
+    if len(fragmentos) < 2:
+        return None
+
+    plan: List[PlannedCall] = []
+    pendientes_rag: List[str] = []
+
+    def cerrar_rag():
+        if pendientes_rag:
+            pregunta = " y ".join(pendientes_rag)
+            plan.append(PlannedCall(RAG_TOOL, pregunta, pregunta))
+            pendientes_rag.clear()
+
+    for fragmento in fragmentos:
+        decision = router.route_confident(fragmento)
+        if decision is not None:
+            cerrar_rag()
+            plan.append(PlannedCall(decision.tool, decision.tool_input, fragmento))
+        elif PALABRAS_BANCARIAS.search(quitar_acentos(fragmento.lower())):
+            pendientes_rag.append(fragmento)
+        elif pendientes_rag:
+            # Continuación de la pregunta bancaria anterior ("... y qué requisitos piden")
+            pendientes_rag.append(fragmento)
+        else:
+            return None
+    cerrar_rag()
+    return plan if len(plan) >= 2 else None
+
+# ============================================================================
+# 2. EJECUCIÓN CONCURRENTE
+# ============================================================================
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Pool de hilos compartido para llamadas a herramientas (I/O: RAG, HTTP)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("PARALLEL_TOOL_WORKERS", "8")),
+                thread_name_prefix="tool-call",
+            )
+        return _executor
+
+
+class _Llamada:
+    """Una llamada del plan; su plazo corre desde que un hilo la empieza, no desde que se encola"""
+
+    def __init__(self, funcion, entrada: str):
+        self.funcion, self.entrada = funcion, entrada
+        self.futuro: Future = Future()
+        self.empezo = threading.Event()
+        self.inicio = 0.0
+
+    def correr(self):
+        # inicio antes de marcarla en curso: quien no logre cancelarla ya lo ve asignado
+        self.inicio = time.monotonic()
+        if not self.futuro.set_running_or_notify_cancel():
+            return
+        self.empezo.set()
+        try:
+            self.futuro.set_result(self.funcion(self.entrada))
+        except BaseException as e:
+            self.futuro.set_exception(e)
+
+
+@dataclass
+class CallResult:
+    call: PlannedCall
+    respuesta: Optional[str]
+    estado: str          # "ok" | "timeout" | "error"
+    duracion: float
+
+
+def ejecutar_plan(plan: List[PlannedCall], tools: Dict[str, object],
+                  executor: Optional[ThreadPoolExecutor] = None,
+                  timeouts: Optional[Dict[str, float]] = None) -> List[CallResult]:
+    """Lanza hasta PARALLEL_TOOL_PER_PLAN llamadas a la vez y espera cada una hasta su propio timeout.
+
+    El timeout de cada llamada cuenta desde que empieza a correr; la espera
+    en cola (pool ocupado o tope del plan) también se acota a ese timeout y
+    una llamada que no llegó a empezar se cancela. Una llamada que excede su
+    timeout se reporta como parcial; su hilo no se puede interrumpir y
+    termina en segundo plano sin bloquear la respuesta.
+    """
+    executor = executor or get_tool_executor()
+    timeouts = {**TOOL_TIMEOUTS, **(timeouts or {})}
+    inicio = time.monotonic()
+    llamadas = [_Llamada(en_contexto(tools[c.tool]._run), c.tool_input) for c in plan]
+    pendientes = deque(llamadas)
+    pendientes_lock = threading.Lock()
+
+    def despachar(_=None):
+        # Cada llamada que termina (o se cancela) deja entrar a la siguiente del plan
+        with pendientes_lock:
+            if not pendientes:
+                return
+            llamada = pendientes.popleft()
+        llamada.futuro.add_done_callback(despachar)
+        executor.submit(llamada.correr)
+
+    for _ in range(min(PARALLEL_TOOL_PER_PLAN, len(llamadas))):
+        despachar()
+
+    resultados = []
+    for call, llamada in zip(plan, llamadas):
+        plazo = timeouts.get(call.tool, DEFAULT_TOOL_TIMEOUT)
+        try:
+            if not llamada.empezo.wait(max(0.0, inicio + plazo - time.monotonic())) and llamada.futuro.cancel():
+                raise FutureTimeoutError()
+            respuesta = llamada.futuro.result(timeout=max(0.0, llamada.inicio + plazo - time.monotonic()))
+            estado = "ok"
+        except FutureTimeoutError:
+            respuesta, estado = None, "timeout"
+        except Exception as e:
+            respuesta, estado = f"Error en {call.tool}: {e}", "error"
+        resultados.append(CallResult(call, respuesta, estado, time.monotonic() - inicio))
+    return resultados
+
+
+def combinar_resultados(resultados: List[CallResult]) -> str:
+    """Une las respuestas en orden del mensaje, señalando las que no llegaron"""
+    secciones = []
+    for r in resultados:
+        if r.estado == "timeout":
+            secciones.append(f"⏱️ No obtuve respuesta a tiempo para: \"{r.call.fragmento}\"")
+        else:
+            secciones.append(r.respuesta)
+    return "\n\n---\n\n".join(secciones)